@@ -0,0 +1,197 @@
+import os
+import shutil
+import struct
+import subprocess
+import tempfile
+import threading
+from array import array
+from operator import mul
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# File layout: magic | base bucket (ms) | level count | per level: length, mins (uint16), maxs (uint16)
+ENVELOPE_MAGIC = b"VAE1"
+_HEADER = struct.Struct("<II")
+_LEVEL = struct.Struct("<Q")
+
+SAMPLE_RATE = 8000   # plenty for a loudness envelope, and cheap to decode
+BASE_MS = 10         # RMS window of the finest level
+
+
+class EnvelopePyramid:
+    """Audio RMS envelope at several resolutions, for drawing at any zoom.
+
+    Level 0 holds the RMS of every BASE_MS window (0..32767); each higher
+    level halves the resolution and keeps the min and max of the two
+    buckets below it. Drawing picks the level whose buckets are just finer
+    than a pixel, so a column reads at most a few buckets whatever the
+    zoom and the video length.
+    """
+
+    def __init__(self, levels, base_ms=BASE_MS):
+        self.levels = levels      # [(mins, maxs)] from finest to coarsest
+        self.base_ms = base_ms
+        top = levels[-1][1] if levels else ()
+        self.peak = max(top) if top else 0
+
+    @classmethod
+    def from_rms(cls, rms, base_ms=BASE_MS):
+        levels = [(rms, rms)]
+        mins, maxs = rms, rms
+        while len(mins) > 1:
+            n = len(mins) // 2 * 2
+            # Pair up neighbours; an odd last bucket is carried over on its own
+            new_mins = array("H", map(min, mins[0:n:2], mins[1:n:2]))
+            new_maxs = array("H", map(max, maxs[0:n:2], maxs[1:n:2]))
+            if n < len(mins):
+                new_mins.append(mins[-1])
+                new_maxs.append(maxs[-1])
+            mins, maxs = new_mins, new_maxs
+            levels.append((mins, maxs))
+        return cls(levels, base_ms)
+
+    @property
+    def duration_ms(self):
+        return len(self.levels[0][0]) * self.base_ms if self.levels else 0
+
+    def columns(self, start_ms, end_ms, width):
+        """[(min, max)] RMS for each of `width` pixel columns spanning start_ms..end_ms."""
+        if not self.levels or width <= 0 or end_ms <= start_ms:
+            return []
+        ms_per_px = (end_ms - start_ms) / width
+        level = 0
+        while level + 1 < len(self.levels) and self.base_ms * 2 ** (level + 1) <= ms_per_px:
+            level += 1
+        mins, maxs = self.levels[level]
+        bucket_ms = self.base_ms * 2 ** level
+        n = len(mins)
+        out = []
+        for x in range(width):
+            i0 = int((start_ms + x * ms_per_px) // bucket_ms)
+            i1 = max(i0 + 1, int(-(-(start_ms + (x + 1) * ms_per_px) // bucket_ms)))
+            i0, i1 = max(0, i0), min(n, i1)
+            if i0 >= i1:
+                out.append((0, 0))
+            else:
+                out.append((min(mins[i0:i1]), max(maxs[i0:i1])))
+        return out
+
+    def save(self, path):
+        outdir = os.path.dirname(path) or "."
+        os.makedirs(outdir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".envelope_", suffix=".tmp", dir=outdir)
+        with os.fdopen(fd, "wb") as f:
+            f.write(ENVELOPE_MAGIC + _HEADER.pack(self.base_ms, len(self.levels)))
+            for mins, maxs in self.levels:
+                f.write(_LEVEL.pack(len(mins)))
+                mins.tofile(f)
+                maxs.tofile(f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            if f.read(4) != ENVELOPE_MAGIC:
+                raise ValueError(f"Not an audio envelope: {path}")
+            base_ms, n_levels = _HEADER.unpack(f.read(_HEADER.size))
+            levels = []
+            for _ in range(n_levels):
+                (n,) = _LEVEL.unpack(f.read(_LEVEL.size))
+                mins, maxs = array("H"), array("H")
+                mins.fromfile(f, n)
+                maxs.fromfile(f, n)
+                levels.append((mins, maxs))
+        return cls(levels, base_ms)
+
+
+def _block_rms(samples, window):
+    """RMS (0..32767) of each full `window` of int16 `samples`."""
+    n = len(samples) // window
+    if np is not None:
+        blocks = np.frombuffer(samples, dtype=np.int16)[:n * window].astype(np.float64).reshape(n, window)
+        return array("H", np.sqrt((blocks * blocks).mean(axis=1)).astype(np.uint16).tobytes())
+    out = array("H")
+    for i in range(0, n * window, window):
+        block = samples[i:i + window]
+        out.append(int((sum(map(mul, block, block)) / window) ** 0.5))
+    return out
+
+
+def scan_with_ffmpeg(path, ffmpeg="ffmpeg", cancel=None):
+    """Build an EnvelopePyramid by streaming the first audio track through ffmpeg.
+
+    Audio is decoded as mono 16-bit at SAMPLE_RATE and reduced to RMS
+    windows as it arrives, so memory doesn't depend on the video length.
+    Returns None if there is no audio track or `cancel` gets set.
+    """
+    window = SAMPLE_RATE * BASE_MS // 1000
+    cmd = [ffmpeg, "-v", "error", "-i", path, "-map", "0:a:0", "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE),
+           "-f", "s16le", "-acodec", "pcm_s16le", "-"]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    rms = array("H")
+    carry = b""
+    try:
+        while True:
+            if cancel is not None and cancel.is_set():
+                proc.kill()
+                return None
+            data = proc.stdout.read(window * 2 * 512)
+            if not data:
+                break
+            data = carry + data
+            usable = len(data) // (window * 2) * (window * 2)
+            carry = data[usable:]
+            samples = array("h", data[:usable])
+            rms.extend(_block_rms(samples, window))
+    finally:
+        proc.stdout.close()
+        proc.wait()
+    if proc.returncode != 0 or not rms:
+        return None
+    return EnvelopePyramid.from_rms(rms)
+
+
+class EnvelopeBuilder:
+    """Loads a video's audio envelope from the cache, or computes and caches it, off the UI thread.
+
+    `on_ready(pyramid)` is called from the worker thread. Nothing happens
+    if ffmpeg isn't installed or the video has no audio.
+    """
+
+    def __init__(self, video_path, cache_path, on_ready):
+        self.video_path = video_path
+        self.cache_path = cache_path
+        self.on_ready = on_ready
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="audio-envelope", daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _run(self):
+        pyramid = None
+        if os.path.exists(self.cache_path):
+            try:
+                pyramid = EnvelopePyramid.load(self.cache_path)
+            except (OSError, ValueError, EOFError, struct.error):
+                pyramid = None
+        if pyramid is None:
+            ffmpeg = shutil.which("ffmpeg")
+            if ffmpeg is None:
+                return
+            try:
+                pyramid = scan_with_ffmpeg(self.video_path, ffmpeg, self._cancel)
+            except (OSError, ValueError):
+                pyramid = None
+            if pyramid is None:
+                return
+            try:
+                pyramid.save(self.cache_path)
+            except OSError:
+                pass
+        if not self._cancel.is_set():
+            self.on_ready(pyramid)
@@ -0,0 +1,306 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from categories import default_categories
+from mark_columns import write_marks_columns
+from mark_csv import write_marks_csv
+from mark_store import MarkStore
+from marking import MarkingEngine
+
+# Benchmarks of the app's hot paths. The ones that need Tk drive the real
+# VideoMarkerApp with the simulated player backend, so they run without
+# libVLC; on a machine without a display, run them under Xvfb
+# (`xvfb-run python app/benchmarks.py`). Results are written as JSON so runs
+# can be compared over time (`--compare previous.json`).
+
+SAVE_SIZES = (10, 10_000, 1_000_000)
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _percentiles(samples_us):
+    samples_us = sorted(samples_us)
+    return {
+        "mean_us": sum(samples_us) / len(samples_us),
+        "p50_us": samples_us[len(samples_us) // 2],
+        "p99_us": samples_us[int(0.99 * (len(samples_us) - 1))],
+    }
+
+
+def _marks(n, seed=0):
+    rng = random.Random(seed)
+    store = MarkStore()
+    for t in sorted(rng.randrange(0, 3_600_000) for _ in range(n)):
+        store.add(t, t, 0, 0)
+    return store
+
+
+def bench_import():
+    """Time to import the app module in a fresh interpreter (no window)."""
+    code = "import time; t = time.perf_counter(); import video_mark; print(time.perf_counter() - t)"
+    samples = []
+    for _ in range(3):
+        out = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True, check=True)
+        samples.append(float(out.stdout.strip()) * 1000.0)
+    return {"import_ms": min(samples)}
+
+
+def bench_marking_engine(n=20_000):
+    """Cost of the marking rules alone (debounce + insert + journal op) per key press."""
+    engine = MarkingEngine(default_categories(250), on_op=lambda *op: None)
+    rng = random.Random(1)
+    samples = []
+    for _ in range(n):
+        stamp = (rng.randrange(0, 3_600_000), 0)
+        t0 = time.perf_counter_ns()
+        engine.press("m", stamp, t0)
+        samples.append((time.perf_counter_ns() - t0) / 1000.0)
+    return {"engine_press": _percentiles(samples), "engine_marks": len(engine.marks)}
+
+
+def bench_save(tmpdir):
+    """Time to write CSV and binary output at several mark counts."""
+    results = {}
+    for n in SAVE_SIZES:
+        store = _marks(n)
+        for fmt, write in (("csv", lambda p: write_marks_csv(p, store, {0: "event"}, 30.0)),
+                           ("binary", lambda p: write_marks_columns(p, store, {0: "event"}))):
+            path = os.path.join(tmpdir, f"save_{n}.{fmt}")
+            t0 = time.perf_counter()
+            write(path)
+            results[f"save_{fmt}_{n}_ms"] = (time.perf_counter() - t0) * 1000.0
+            results[f"save_{fmt}_{n}_bytes"] = os.path.getsize(path)
+    return results
+
+
+def bench_aggregation(tmpdir, clients=40, marks=200):
+    """Aggregation server on localhost with `clients` annotators streaming marks at once.
+
+    Measures what posting a mark costs the UI thread and how long until
+    every mark is acknowledged, then restarts the server and checks that
+    its log replays to the same marks.
+    """
+    import asyncio
+    import threading
+
+    from mark_client import MarkStreamer
+    from mark_journal import OP_ADD
+    from mark_server import AggregationServer
+
+    def start_server(data_dir, port=0):
+        server = AggregationServer(data_dir)
+        loop = asyncio.new_event_loop()
+        listening = threading.Event()
+        bound = []
+
+        def ready(s):
+            bound.append(s.sockets[0].getsockname()[1])
+            listening.set()
+
+        task = loop.create_task(server.serve("127.0.0.1", port, ready))
+        thread = threading.Thread(target=lambda: loop.run_until_complete(asyncio.gather(task, return_exceptions=True)),
+                                  daemon=True)
+        thread.start()
+        listening.wait(10)
+
+        def stop():
+            loop.call_soon_threadsafe(task.cancel)
+            thread.join(10)
+            loop.close()
+
+        return server, bound[0], stop
+
+    data_dir = os.path.join(tmpdir, "aggregation")
+    server, port, stop = start_server(data_dir)
+    streamers = [MarkStreamer("127.0.0.1", port, f"annotator{i}", os.path.join(tmpdir, f"spool{i}"), batch_ms=50)
+                 for i in range(clients)]
+    rng = random.Random(2)
+    samples = []
+    t_start = time.perf_counter()
+    for k in range(marks):
+        for streamer in streamers:
+            t = k * 1000 + rng.randrange(0, 300)
+            t0 = time.perf_counter_ns()
+            streamer.post_op("video", OP_ADD, t, t, 0, 0, 0)
+            samples.append((time.perf_counter_ns() - t0) / 1000.0)
+        time.sleep(0.001)
+    while any(s.stats()["unacked"] or s.acked == 0 for s in streamers) and time.perf_counter() - t_start < 30:
+        time.sleep(0.01)
+    delivered_ms = (time.perf_counter() - t_start) * 1000.0
+    for streamer in streamers:
+        streamer.close()
+    counts = [a["marks"] for a in server.status()["videos"][0]["annotators"]]
+    stop()
+    replayed, _, stop = start_server(data_dir)
+    stop()
+    if [a["marks"] for a in replayed.status()["videos"][0]["annotators"]] != counts or sum(counts) != clients * marks:
+        raise RuntimeError("aggregation server lost or duplicated marks")
+    return {"aggregation_post": _percentiles(samples), "aggregation_delivered_ms": delivered_ms,
+            "aggregation_batches": server.batches}
+
+
+def _pump(root, seconds=None, until=None, timeout=10.0):
+    """Run the Tk loop for `seconds`, or until `until()` is true."""
+    end = time.perf_counter() + (seconds if seconds is not None else timeout)
+    while time.perf_counter() < end:
+        root.update()
+        if until is not None and until():
+            return True
+        time.sleep(0.001)
+    return until is None
+
+
+def bench_app(tmpdir):
+    """Startup, key-press-to-mark latency and redraw cost of the real app (needs a display)."""
+    import tkinter as tk
+
+    import video_mark
+    from players import SimulatedBackend
+    from video_cache import VideoCache
+
+    # Keep outputs (CSV, input log) out of the user's Desktop
+    video_mark.get_desktop_path = lambda: tmpdir
+    video = os.path.join(tmpdir, "clip.mp4")
+    with open(video, "wb") as f:
+        f.write(os.urandom(1 << 20))
+
+    results = {}
+    t0 = time.perf_counter()
+    root = tk.Tk()
+    app = video_mark.VideoMarkerApp(root, video_path=video, min_gap_ms=0,
+                                    cache=VideoCache(root=os.path.join(tmpdir, "cache")),
+                                    backend=SimulatedBackend(duration_ms=3_600_000))
+    root.geometry("1100x800")
+    started = _pump(root, until=lambda: app._is_playing)
+    results["startup_ms"] = (time.perf_counter() - t0) * 1000.0 if started else None
+
+    # Key press to mark, including the list/status redraw it triggers
+    samples = []
+    for i in range(500):
+        app.seek_to(1000 + i * 1000)
+        before = len(app.marks)
+        t0 = time.perf_counter_ns()
+        root.event_generate("<KeyPress>", keysym="m")
+        root.update_idletasks()
+        if len(app.marks) > before:
+            samples.append((time.perf_counter_ns() - t0) / 1000.0)
+        root.event_generate("<KeyRelease>", keysym="m")
+    results["keypress_to_mark"] = _percentiles(samples) if samples else None
+
+    # Playback: event pump and time label over two seconds
+    app.play()
+    _pump(root, seconds=2.0)
+    stats = app.ui_stats()
+    results["playback_avg_dispatch_us"] = stats["avg_dispatch_us"]
+    results["playback_time_redraws_per_s"] = stats["time_redraws"] / 2.0
+    app.pause()
+
+    # Redraw of the mark list with a large session loaded
+    app.engine.reset(_marks(1_000_000))
+    samples = []
+    for i in range(200):
+        t0 = time.perf_counter_ns()
+        app.mark_list.scroll_to(i * 5000)
+        root.update_idletasks()
+        samples.append((time.perf_counter_ns() - t0) / 1000.0)
+    results["mark_list_redraw_1m"] = _percentiles(samples)
+    samples = []
+    for _ in range(200):
+        app._time_text = ""  # force a redraw
+        t0 = time.perf_counter_ns()
+        app.update_time_display()
+        root.update_idletasks()
+        samples.append((time.perf_counter_ns() - t0) / 1000.0)
+    results["time_label_redraw"] = _percentiles(samples)
+
+    app._close_journal(remove=True)
+    app._close_input_log()
+    root.destroy()
+    return results
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True, text=True)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_all():
+    results = {}
+    skipped = {}
+    with tempfile.TemporaryDirectory(prefix="vm_bench_") as tmpdir:
+        for name, fn in (("import", bench_import), ("marking_engine", bench_marking_engine),
+                         ("save", lambda: bench_save(tmpdir)), ("aggregation", lambda: bench_aggregation(tmpdir)),
+                         ("app", lambda: bench_app(tmpdir))):
+            try:
+                results.update(fn())
+            except Exception as e:  # one broken benchmark shouldn't lose the others
+                skipped[name] = f"{type(e).__name__}: {e}"
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+        "skipped": skipped,
+    }
+
+
+def _flatten(results, prefix=""):
+    for key, value in results.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{prefix}{key}.")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield f"{prefix}{key}", value
+
+
+def compare(previous, current, threshold=0.2):
+    """Print metrics that changed; returns names of timings that got slower by more than `threshold`."""
+    before = dict(_flatten(previous["results"]))
+    regressions = []
+    for name, value in _flatten(current["results"]):
+        old = before.get(name)
+        if not old or name.endswith("_bytes") or name == "engine_marks":
+            continue
+        change = (value - old) / old
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:40s} {old:12.2f} -> {value:12.2f}  {change:+7.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the video marker (simulated player, no libVLC)")
+    parser.add_argument("--out", default="bench_results", help="Directory for the JSON results")
+    parser.add_argument("--compare", default=None, help="Earlier results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    report = run_all()
+    os.makedirs(args.out, exist_ok=True)
+    path = os.path.join(args.out, f"bench-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    for name, value in _flatten(report["results"]):
+        print(f"{name:40s} {value:12.2f}")
+    for name, reason in report["skipped"].items():
+        print(f"skipped {name}: {reason}")
+    print(f"-> {path}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            return 1 if compare(json.load(f), report) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
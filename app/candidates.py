@@ -0,0 +1,254 @@
+import json
+import multiprocessing
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from array import array
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from operator import sub
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Analysis runs on tiny grayscale frames at a low rate; that's plenty to find
+# "something happens here" and keeps decoding + scoring cheap.
+ANALYSIS_FPS = 10
+FRAME_W, FRAME_H = 64, 36
+CHUNK_S = 60
+CACHE_DIR = f"candidates_v1_{ANALYSIS_FPS}fps_{FRAME_W}x{FRAME_H}"
+
+# 16-bin luma histogram: translate each pixel to its bin, then count
+_BIN_TABLE = bytes(v // 16 for v in range(256))
+_BINS = [bytes([b]) for b in range(16)]
+
+
+def decode_gray_frames(path, start_s, duration_s, ffmpeg="ffmpeg"):
+    """Yield downscaled grayscale frames (FRAME_W*FRAME_H bytes) of one stretch of the video.
+
+    Frames are streamed from ffmpeg one at a time, so memory doesn't depend
+    on the chunk length.
+    """
+    size = FRAME_W * FRAME_H
+    cmd = [ffmpeg, "-v", "error", "-ss", f"{start_s:.3f}", "-i", path, "-t", f"{duration_s:.3f}",
+           "-map", "0:v:0", "-an", "-vf", f"fps={ANALYSIS_FPS},scale={FRAME_W}:{FRAME_H},format=gray",
+           "-f", "rawvideo", "-pix_fmt", "gray", "-"]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=size * 16)
+    try:
+        while True:
+            frame = proc.stdout.read(size)
+            if len(frame) < size:
+                break
+            yield frame
+    finally:
+        proc.kill()
+        proc.stdout.close()
+        proc.wait()
+
+
+def frame_scores(prev, frame):
+    """(motion energy, scene-change score) between two frames, both in 0..1.
+
+    Motion energy is the mean absolute pixel difference; the scene score is
+    half the L1 distance between the frames' luma histograms (1 = no overlap).
+    """
+    n = len(frame)
+    if np is not None:
+        a = np.frombuffer(prev, dtype=np.uint8)
+        b = np.frombuffer(frame, dtype=np.uint8)
+        motion = float(np.abs(a.astype(np.int16) - b).sum()) / (n * 255)
+        ha = np.bincount(a >> 4, minlength=16)
+        hb = np.bincount(b >> 4, minlength=16)
+        return motion, float(np.abs(ha - hb).sum()) / (2 * n)
+    motion = sum(map(abs, map(sub, prev, frame))) / (n * 255)
+    pa, pb = prev.translate(_BIN_TABLE), frame.translate(_BIN_TABLE)
+    scene = sum(abs(pa.count(b) - pb.count(b)) for b in _BINS) / (2 * n)
+    return motion, scene
+
+
+def analyze_chunk(job):
+    """Worker: scores for every analysis frame of chunk `index`.
+
+    Returns (index, motion array, scene array); frame k is at
+    index * CHUNK_S + k / ANALYSIS_FPS seconds.
+    """
+    path, index, ffmpeg = job
+    start_s = index * CHUNK_S
+    # Decode one frame of the previous chunk too, so the first frame has something to compare to
+    lead_s = 1.0 / ANALYSIS_FPS if index else 0.0
+    motion, scene = array("f"), array("f")
+    prev = None
+    for frame in decode_gray_frames(path, start_s - lead_s, CHUNK_S + lead_s, ffmpeg):
+        if prev is None:
+            prev = frame
+            if lead_s:
+                continue
+        m, s = frame_scores(prev, frame)
+        motion.append(m)
+        scene.append(s)
+        prev = frame
+    return index, motion, scene
+
+
+def _chunk_path(cache_dir, index):
+    return os.path.join(cache_dir, f"chunk_{index:05d}.bin")
+
+
+def save_chunk(cache_dir, index, motion, scene):
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".chunk_", suffix=".tmp", dir=cache_dir)
+    with os.fdopen(fd, "wb") as f:
+        array("I", [len(motion)]).tofile(f)
+        motion.tofile(f)
+        scene.tofile(f)
+    os.replace(tmp_path, _chunk_path(cache_dir, index))
+
+
+def load_chunk(cache_dir, index):
+    """(motion, scene) arrays of a finished chunk, or None."""
+    try:
+        with open(_chunk_path(cache_dir, index), "rb") as f:
+            n = array("I")
+            n.fromfile(f, 1)
+            motion, scene = array("f"), array("f")
+            motion.fromfile(f, n[0])
+            scene.fromfile(f, n[0])
+        return motion, scene
+    except (OSError, EOFError):
+        return None
+
+
+def pick_candidates(motion, scene, min_gap_ms=2000, scene_threshold=0.3, k=6.0):
+    """Candidate event times from per-frame scores. Returns [(t_ms, score, kind)] sorted by time.
+
+    A scene change is a frame whose histogram differs by more than
+    `scene_threshold`. A motion onset is where motion energy rises above
+    median + k * MAD of the whole video (so static footage with sensor
+    noise doesn't trigger). Within `min_gap_ms` only the strongest is kept.
+    """
+    if not motion:
+        return []
+    ordered = sorted(motion)
+    median = ordered[len(ordered) // 2]
+    mad = sorted(abs(m - median) for m in motion)[len(motion) // 2]
+    threshold = median + k * max(mad, 1e-4)
+    raw = []
+    above = False
+    for i, (m, s) in enumerate(zip(motion, scene)):
+        t_ms = int(round(i * 1000 / ANALYSIS_FPS))
+        if s > scene_threshold:
+            raw.append((t_ms, min(1.0, s), "scene"))
+        elif m > threshold and not above:
+            # 0.5 right at the threshold, 1.0 at twice its distance from the median
+            raw.append((t_ms, min(1.0, 0.5 * (m - median) / (threshold - median)), "motion"))
+        above = m > threshold
+    picked = []
+    for cand in raw:
+        if picked and cand[0] - picked[-1][0] < min_gap_ms:
+            if cand[1] > picked[-1][1]:
+                picked[-1] = cand
+            continue
+        picked.append(cand)
+    return picked
+
+
+def load_candidates(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, "candidates.json"), "r", encoding="utf-8") as f:
+            return [tuple(c) for c in json.load(f)]
+    except (OSError, ValueError):
+        return None
+
+
+def _store_candidates(cache_dir, candidates):
+    fd, tmp_path = tempfile.mkstemp(prefix=".candidates_", suffix=".tmp", dir=cache_dir)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(candidates, f)
+    os.replace(tmp_path, os.path.join(cache_dir, "candidates.json"))
+
+
+class CandidateDetector:
+    """Finds candidate events in a video in the background, resumably.
+
+    The video is split into CHUNK_S chunks that are decoded and scored on a
+    process pool; each finished chunk is saved to `cache_dir` straight away,
+    so after the window closes only the missing chunks are redone next
+    time. `on_progress(done, total)` and `on_done(candidates)` are called
+    from the detector thread.
+    """
+
+    def __init__(self, video_path, duration_ms, cache_dir, on_progress, on_done, jobs=None):
+        self.video_path = video_path
+        self.duration_ms = duration_ms
+        self.cache_dir = cache_dir
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.jobs = jobs or max(1, (os.cpu_count() or 2) - 1)  # leave a core for playback
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="candidates", daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _run(self):
+        candidates = load_candidates(self.cache_dir)
+        if candidates is not None:
+            self.on_done(candidates)
+            return
+        ffmpeg = shutil.which("ffmpeg")
+        if ffmpeg is None:
+            return
+        total = max(1, -(-self.duration_ms // (CHUNK_S * 1000)))
+        results = {}
+        for i in range(total):
+            chunk = load_chunk(self.cache_dir, i)
+            if chunk is not None:
+                results[i] = chunk
+        self.on_progress(len(results), total)
+        todo = [i for i in range(total) if i not in results]
+        if todo:
+            # Not fork: this runs on a thread of a process that has Tk and libVLC threads
+            pool = ProcessPoolExecutor(max_workers=self.jobs, mp_context=multiprocessing.get_context("spawn"))
+            try:
+                # Keep only a few chunks queued so cancelling doesn't wait for the whole video
+                pending = set()
+                jobs = iter(todo)
+                while True:
+                    while len(pending) < self.jobs * 2 and not self._cancel.is_set():
+                        i = next(jobs, None)
+                        if i is None:
+                            break
+                        pending.add(pool.submit(analyze_chunk, (self.video_path, i, ffmpeg)))
+                    if not pending:
+                        break
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        i, motion, scene = future.result()
+                        save_chunk(self.cache_dir, i, motion, scene)
+                        results[i] = (motion, scene)
+                    self.on_progress(len(results), total)
+            except (OSError, RuntimeError):
+                return
+            finally:
+                pool.shutdown(wait=False, cancel_futures=True)
+        if self._cancel.is_set() or len(results) < total:
+            return
+        # Chunks may decode a frame more or less than nominal; keep frame times aligned
+        per_chunk = CHUNK_S * ANALYSIS_FPS
+        motion, scene = array("f"), array("f")
+        for i in range(total):
+            m, s = results[i]
+            if i < total - 1:
+                m, s = m[:per_chunk], s[:per_chunk]
+                pad = per_chunk - len(m)
+                m.extend([0.0] * pad)
+                s.extend([0.0] * pad)
+            motion.extend(m)
+            scene.extend(s)
+        candidates = pick_candidates(motion, scene)
+        _store_candidates(self.cache_dir, candidates)
+        self.on_done(candidates)
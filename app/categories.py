@@ -0,0 +1,85 @@
+import json
+import os
+
+# Mark flags (stored per mark in MarkStore)
+FLAG_POINT = 0
+FLAG_BEGIN = 1
+FLAG_END = 2
+
+FLAG_NAMES = {FLAG_POINT: "point", FLAG_BEGIN: "begin", FLAG_END: "end"}
+FLAG_BY_NAME = {name: flag for flag, name in FLAG_NAMES.items()}
+
+# Keys the app itself uses; categories can't be bound to these
+RESERVED_KEYS = {"space", "u", "delete", "backspace", "bracketleft", "bracketright", "next",
+                 "left", "right", "return", "f12", "period", "comma", "insert",
+                 "tab", "minus", "equal", "underscore", "plus"}
+
+
+class Category:
+    """An event type the annotator can mark, bound to one key.
+
+    Point categories record a single mark per key press. Interval categories
+    record a begin mark on key press and an end mark on key release.
+    """
+
+    def __init__(self, cid, name, key, debounce_ms=250, interval=False):
+        self.cid = cid
+        self.name = name
+        self.key = key.lower()
+        self.debounce_ms = debounce_ms
+        self.interval = interval
+
+    def __repr__(self):
+        kind = "interval" if self.interval else "point"
+        return f"Category({self.cid}, {self.name!r}, key={self.key!r}, {kind}, {self.debounce_ms} ms)"
+
+
+def default_categories(min_gap_ms=250):
+    """The single event type the app always had: M marks a point."""
+    return [Category(0, "event", "m", debounce_ms=min_gap_ms)]
+
+
+def parse_categories(spec, min_gap_ms=250):
+    """Build categories from a JSON file path or an inline spec.
+
+    Inline spec: comma-separated `key:name[:interval][:gap=MS]`, e.g.
+    `1:reach,2:grasp:gap=100,3:groom:interval`. JSON file: a list of objects
+    with `key`, `name`, and optional `interval` and `debounce_ms`.
+    `min_gap_ms` is the debounce for categories that don't set their own.
+    """
+    if os.path.isfile(spec):
+        with open(spec, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+        items = [
+            (e["key"], e["name"], bool(e.get("interval", False)), int(e.get("debounce_ms", min_gap_ms)))
+            for e in entries
+        ]
+    else:
+        items = []
+        for part in spec.split(","):
+            fields = [x.strip() for x in part.strip().split(":")]
+            if len(fields) < 2 or not fields[0] or not fields[1]:
+                raise ValueError(f"Invalid category spec: {part!r} (expected key:name[:interval][:gap=MS])")
+            interval, gap = False, min_gap_ms
+            for opt in fields[2:]:
+                if opt == "interval":
+                    interval = True
+                elif opt.startswith("gap="):
+                    gap = int(opt[4:])
+                else:
+                    raise ValueError(f"Unknown category option {opt!r} in {part!r}")
+            items.append((fields[0], fields[1], interval, gap))
+
+    categories = []
+    seen_keys = set()
+    for cid, (key, name, interval, gap) in enumerate(items):
+        key = key.lower()
+        if key in RESERVED_KEYS:
+            raise ValueError(f"Key {key!r} is reserved and can't be used for category {name!r}")
+        if key in seen_keys:
+            raise ValueError(f"Key {key!r} is bound to more than one category")
+        seen_keys.add(key)
+        categories.append(Category(cid, name, key, debounce_ms=gap, interval=interval))
+    if not categories:
+        raise ValueError("No categories defined")
+    return categories
@@ -0,0 +1,184 @@
+import subprocess
+import threading
+from collections import OrderedDict
+
+
+class FrameRing:
+    """Memory-capped store of decoded, downscaled frames around the playhead.
+
+    Frames are keyed by frame index and held as PPM bytes (which Tk's
+    PhotoImage reads directly). When the total size exceeds `max_bytes`,
+    the frames farthest from the current position are dropped first.
+    Safe to fill from a decoder thread while the Tk thread reads.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+        self.position = 0
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._frames)
+
+    def __contains__(self, index):
+        return index in self._frames
+
+    def get(self, index):
+        """PPM bytes of frame `index`, or None. Counts towards the hit rate."""
+        with self._lock:
+            data = self._frames.get(index)
+        if data is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return data
+
+    def put(self, index, data):
+        with self._lock:
+            old = self._frames.pop(index, None)
+            if old is not None:
+                self.bytes -= len(old)
+            self._frames[index] = data
+            self.bytes += len(data)
+            self._evict()
+
+    def set_position(self, index):
+        self.position = index
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self.bytes = 0
+
+    def _evict(self):
+        while self.bytes > self.max_bytes and len(self._frames) > 1:
+            farthest = max(self._frames, key=lambda i: abs(i - self.position))
+            self.bytes -= len(self._frames.pop(farthest))
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "frames": len(self._frames),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def _read_ppm(stream):
+    """Read one binary PPM image from `stream`; returns bytes or None at EOF."""
+    header = []
+    while len(header) < 4:
+        line = stream.readline()
+        if not line:
+            return None
+        header.extend(line.split())
+    if header[0] != b"P6":
+        raise ValueError("Unexpected frame format from ffmpeg")
+    width, height = int(header[1]), int(header[2])
+    pixels = stream.read(width * height * 3)
+    if len(pixels) < width * height * 3:
+        return None
+    return b"P6\n%d %d\n255\n" % (width, height) + pixels
+
+
+def decode_frames(path, start_s, count, width=480, ffmpeg="ffmpeg", cancel=None, height=None):
+    """Yield up to `count` consecutive frames as PPM bytes, starting at `start_s`.
+
+    ffmpeg seeks accurately (decoding from the preceding keyframe) and
+    scales before handing frames over, so memory per frame stays small.
+    Frames are `width` wide, or with `height` too, fit inside width x height
+    keeping the aspect ratio (like the player's own letterboxing).
+    """
+    if height is None:
+        scale = f"scale={width}:-2"
+    else:
+        scale = f"scale={width}:{height}:force_original_aspect_ratio=decrease:force_divisible_by=2"
+    cmd = [ffmpeg, "-v", "error", "-ss", f"{start_s:.6f}", "-i", path, "-map", "0:v:0",
+           "-frames:v", str(count), "-vsync", "passthrough", "-vf", scale,
+           "-f", "image2pipe", "-vcodec", "ppm", "-"]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=1 << 20)
+    try:
+        for _ in range(count):
+            if cancel is not None and cancel.is_set():
+                break
+            frame = _read_ppm(proc.stdout)
+            if frame is None:
+                break
+            yield frame
+    finally:
+        proc.kill()
+        proc.stdout.close()
+        proc.wait()
+
+
+class FrameWindowLoader:
+    """Keeps a FrameRing filled with the frames around a requested position.
+
+    `request(first, last)` asks for frames first..last (indices into the
+    seek index); a newer request cancels the one in progress. Decoding runs
+    on one background thread with ffmpeg, at `width` (x `height`, see
+    decode_frames).
+    """
+
+    def __init__(self, video_path, seek_index, ring, ffmpeg="ffmpeg", width=480, height=None):
+        self.video_path = video_path
+        self.seek_index = seek_index
+        self.ring = ring
+        self.ffmpeg = ffmpeg
+        self.width = width
+        self.height = height
+        self._lock = threading.Lock()
+        self._wanted = None
+        self._cancel = threading.Event()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="frame-loader", daemon=True)
+        self._thread.start()
+
+    def request(self, first, last):
+        first = max(0, first)
+        last = min(len(self.seek_index) - 1, last)
+        with self._lock:
+            self._wanted = (first, last)
+            # Under the lock: the worker clears it when it takes `_wanted`
+            self._cancel.set()
+        self._wake.set()
+
+    def close(self):
+        self._closed = True
+        self._cancel.set()
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            if self._closed:
+                return
+            with self._lock:
+                wanted, self._wanted = self._wanted, None
+                self._cancel.clear()
+            if wanted is None:
+                continue
+            first, last = wanted
+            # Skip frames already held at the start of the window
+            while first <= last and first in self.ring:
+                first += 1
+            if first > last:
+                continue
+            # Start half a millisecond early so rounding can't make ffmpeg skip the first frame
+            start_s = max(0.0, self.seek_index.frame_time_ms(first) - 0.5) / 1000.0
+            try:
+                frames = decode_frames(self.video_path, start_s, last - first + 1,
+                                       self.width, self.ffmpeg, self._cancel, self.height)
+                for offset, frame in enumerate(frames):
+                    self.ring.put(first + offset, frame)
+            except (OSError, ValueError):
+                pass
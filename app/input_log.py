@@ -0,0 +1,219 @@
+import argparse
+import json
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from categories import FLAG_POINT, Category, parse_categories
+from mark_csv import write_marks_csv
+from mark_store import MarkStore
+from marking import MarkingEngine
+
+# Input log layout:
+#   magic (4 bytes) | fixed-size records...
+# A session record (IN_SESSION) is followed by its JSON header (categories,
+# debounce, video, ...) padded to a whole number of records, so one file can
+# hold several sessions (e.g. a resumed one). A resumed session's header
+# holds the marks it started from (`resumed_marks`, in the order they were
+# added, so undo replays the same way). A torn record at the tail is
+# dropped on read, like in the mark journal.
+INPUT_LOG_MAGIC = b"VIL1"
+INPUT_LOG_SUFFIX = ".vml"
+_RECORD = struct.Struct("<BBH?B2xqqq16s")  # kind, flags, category, playing, source stream, monotonic_ns, a_ms, b_ms, key
+
+IN_SESSION = 0       # a_ms = length of the JSON header that follows
+IN_PRESS = 1         # key went down at media time a_ms (raw VLC time b_ms)
+IN_RELEASE = 2       # key went up
+IN_CLICK = 3         # double-click on the mark button
+IN_DELETE = 4        # delete the mark at a_ms with this category/flags
+IN_DELETE_RANGE = 5  # delete the marks with a_ms <= t <= b_ms
+IN_MOVE = 6          # move the mark at a_ms with this category/flags to b_ms
+IN_ACCEPT = 7        # accept the detected candidate event at a_ms as a mark
+IN_UNDO = 8          # undo the last mark (U key or Undo button)
+IN_FPS = 9           # the video's frame rate became known after the header: a_ms = fps * 1000
+
+
+def input_log_path(csv_path):
+    """Path of the input log written next to a marks CSV."""
+    return os.path.splitext(csv_path)[0] + INPUT_LOG_SUFFIX
+
+
+def categories_to_json(categories):
+    return [{"key": c.key, "name": c.name, "interval": c.interval, "debounce_ms": c.debounce_ms}
+            for c in categories]
+
+
+def categories_from_json(entries):
+    return [Category(cid, e["name"], e["key"], debounce_ms=e["debounce_ms"], interval=e["interval"])
+            for cid, e in enumerate(entries)]
+
+
+class InputLog:
+    """Appends every raw marking input of a session to a compact binary log.
+
+    Records are 48 bytes and go through a 64 KiB write buffer, so logging a
+    key press costs a struct pack; the file is only written when the buffer
+    fills or the log is closed.
+    """
+
+    def __init__(self, path, header):
+        self.path = path
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._f = open(path, "ab", buffering=64 * 1024)
+        if new:
+            self._f.write(INPUT_LOG_MAGIC)
+        else:
+            # Drop a torn record left by a crash so new records stay aligned
+            body = os.path.getsize(path) - len(INPUT_LOG_MAGIC)
+            self._f.truncate(len(INPUT_LOG_MAGIC) + body // _RECORD.size * _RECORD.size)
+        blob = json.dumps(header).encode("utf-8")
+        self.append(IN_SESSION, a_ms=len(blob))
+        self._f.write(blob + b"\0" * (-len(blob) % _RECORD.size))
+
+    def append(self, kind, a_ms=0, b_ms=0, category=0, flags=0, key="", playing=False, now_ns=None, source=0):
+        if now_ns is None:
+            now_ns = time.monotonic_ns()
+        self._f.write(_RECORD.pack(kind, flags, category, playing, source, now_ns, a_ms, b_ms,
+                                   key.encode("utf-8")[:16]))
+
+    def close(self):
+        self._f.close()
+
+
+def read_input_log(path):
+    """Yield (header, records) for each session in an input log.
+
+    Records are (kind, flags, category, playing, source, monotonic_ns, a_ms, b_ms, key).
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:4] != INPUT_LOG_MAGIC:
+        raise ValueError(f"Not an input log: {path}")
+    pos = 4
+    end = pos + (len(data) - pos) // _RECORD.size * _RECORD.size
+    header, records = None, []
+    while pos < end:
+        kind, flags, category, playing, source, now_ns, a_ms, b_ms, key = _RECORD.unpack_from(data, pos)
+        pos += _RECORD.size
+        if kind == IN_SESSION:
+            if header is not None:
+                yield header, records
+            blob = data[pos:pos + a_ms]
+            pos += a_ms + (-a_ms % _RECORD.size)
+            header, records = json.loads(blob.decode("utf-8")), []
+            continue
+        records.append((kind, flags, category, playing, source, now_ns, a_ms, b_ms,
+                        key.rstrip(b"\0").decode("utf-8")))
+    if header is not None:
+        yield header, records
+
+
+def replay_input_log(path, categories=None, min_gap_ms=None, marks=None):
+    """Re-run the marking rules over a recorded session, without Tk or VLC.
+
+    Uses the categories recorded with each session unless `categories` is
+    given; `min_gap_ms` overrides every category's debounce. A resumed
+    session starts from the marks recorded in its header (from the previous
+    session's marks in logs without them). Returns (last header,
+    MarkingEngine); the header's `fps` is filled in from IN_FPS records.
+    """
+    engine = None
+    header = {}
+    for header, records in read_input_log(path):
+        if header.get("resumed_marks") is not None:
+            marks = MarkStore()
+            for t_ms, raw_ms, category, flags, source in header["resumed_marks"]:
+                marks.add(t_ms, raw_ms, category, flags, source)
+        elif engine is not None and not header.get("resumed", True):
+            marks = None  # the annotator started this session from scratch
+        elif engine is not None:
+            marks = engine.marks
+        session_categories = categories or categories_from_json(header.get("categories", []))
+        if min_gap_ms is not None:
+            session_categories = [Category(c.cid, c.name, c.key, debounce_ms=min_gap_ms, interval=c.interval)
+                                  for c in session_categories]
+        engine = MarkingEngine(session_categories, marks)
+        for kind, flags, category, _, source, now_ns, a_ms, b_ms, key in records:
+            engine.commit_due(now_ns)
+            engine.source = source
+            if kind == IN_PRESS:
+                engine.press(key, (a_ms, b_ms), now_ns)
+            elif kind == IN_RELEASE:
+                engine.release(key, (a_ms, b_ms), now_ns)
+            elif kind in (IN_CLICK, IN_ACCEPT):
+                if engine.categories:
+                    engine.mark(engine.categories[0], FLAG_POINT, (a_ms, b_ms))
+            elif kind == IN_DELETE:
+                engine.delete_one(a_ms, category, flags)
+            elif kind == IN_DELETE_RANGE:
+                engine.delete_range(a_ms, b_ms)
+            elif kind == IN_MOVE:
+                engine.move(a_ms, category, flags, b_ms)
+            elif kind == IN_UNDO:
+                engine.undo()
+            elif kind == IN_FPS:
+                header["fps"] = a_ms / 1000.0
+        # Releases still waiting at the end of a session did happen
+        engine.commit_due(float("inf"))
+    if engine is None:
+        engine = MarkingEngine(categories or [], marks)
+    return header, engine
+
+
+def _replay_to_csv(job):
+    """Worker: replay one log and write its marks as CSV. Returns (log, out_csv, mark count, error)."""
+    log_path, out_csv, spec, min_gap_ms = job
+    try:
+        categories = parse_categories(spec, min_gap_ms or 250) if spec else None
+        header, engine = replay_input_log(log_path, categories, min_gap_ms)
+        metadata = {k: header[k] for k in ("video", "video_fingerprint", "annotator") if k in header}
+        metadata["replayed_from"] = os.path.basename(log_path)
+        names = {c.cid: c.name for c in engine.categories}
+        write_marks_csv(out_csv, engine.marks, names, header.get("fps") or 0.0, metadata, header.get("streams"))
+        return log_path, out_csv, len(engine.marks), None
+    except (OSError, ValueError, KeyError) as e:
+        return log_path, out_csv, 0, str(e)
+
+
+def _iter_logs(paths):
+    for root in paths:
+        if os.path.isfile(root):
+            yield root
+            continue
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            for name in sorted(filenames):
+                if name.endswith(INPUT_LOG_SUFFIX):
+                    yield os.path.join(dirpath, name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-derive marks from recorded input logs (.vml)")
+    parser.add_argument("logs", nargs="+", help="Input logs or directories containing them")
+    parser.add_argument("--out-dir", default="replayed", help="Where to write the CSVs (default: ./replayed)")
+    parser.add_argument("--mingap", type=int, default=None, help="Override the debounce of every category (ms)")
+    parser.add_argument("--categories", default=None,
+                        help="Replace the recorded categories (same syntax as the app's --categories)")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    jobs = ((log, os.path.join(args.out_dir, os.path.splitext(os.path.basename(log))[0] + ".csv"),
+             args.categories, args.mingap) for log in _iter_logs(args.logs))
+    t0 = time.perf_counter()
+    n_logs = n_marks = 0
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        for log, out_csv, count, error in pool.map(_replay_to_csv, jobs, chunksize=16):
+            if error:
+                print(f"skipped {log}: {error}", file=sys.stderr)
+                continue
+            n_logs += 1
+            n_marks += count
+    print(f"{n_logs} logs, {n_marks} marks in {time.perf_counter() - t0:.2f} s -> {args.out_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+import json
+import os
+import platform
+import tempfile
+import time
+from array import array
+from bisect import bisect_left
+
+# Bucket upper bounds in microseconds: 4 per doubling from 1 us to ~2 minutes,
+# so any recorded value is off by at most ~19%.
+_BOUNDS = [2 ** (i / 4) for i in range(4 * 27)]
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (microseconds).
+
+    `record` is a bisect and an array increment, cheap enough for every key
+    press or event. Writes from several threads can at worst lose a count.
+    """
+
+    def __init__(self, name, description=""):
+        self.name = name
+        self.description = description
+        self.counts = array("Q", bytes(8 * (len(_BOUNDS) + 1)))
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value_us):
+        self.counts[bisect_left(_BOUNDS, value_us)] += 1
+        self.count += 1
+        self.total += value_us
+        if value_us > self.max:
+            self.max = value_us
+
+    def record_ns(self, start_ns, end_ns=None):
+        if end_ns is None:
+            end_ns = time.perf_counter_ns()
+        self.record((end_ns - start_ns) / 1000.0)
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-th percentile (0 if empty)."""
+        if not self.count:
+            return 0.0
+        rank = p / 100.0 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(_BOUNDS[i] if i < len(_BOUNDS) else self.max, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_us": self.total / self.count if self.count else 0.0,
+            "p50_us": self.percentile(50),
+            "p95_us": self.percentile(95),
+            "p99_us": self.percentile(99),
+            "max_us": self.max,
+        }
+
+    def to_dict(self):
+        # Only non-empty buckets, as [upper bound us, count]
+        buckets = [[_BOUNDS[i] if i < len(_BOUNDS) else None, n] for i, n in enumerate(self.counts) if n]
+        return dict(self.summary(), description=self.description, buckets=buckets)
+
+
+class Instruments:
+    """The app's named histograms."""
+
+    def __init__(self):
+        self.histograms = {}
+
+    def histogram(self, name, description=""):
+        if name not in self.histograms:
+            self.histograms[name] = Histogram(name, description)
+        return self.histograms[name]
+
+    def format_table(self):
+        lines = [f"{'':28s} {'count':>7s} {'p50':>9s} {'p95':>9s} {'p99':>9s} {'max':>9s}  (ms)"]
+        for name, h in self.histograms.items():
+            s = h.summary()
+            lines.append(f"{name:28s} {s['count']:7d} {s['p50_us']/1000:9.2f} {s['p95_us']/1000:9.2f} "
+                         f"{s['p99_us']/1000:9.2f} {s['max_us']/1000:9.2f}")
+        return "\n".join(lines)
+
+    def dump(self, path, context=None):
+        """Write all histograms plus machine info and `context` (video, codec, ...) as JSON, atomically."""
+        report = {
+            "written": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "machine": {
+                "platform": platform.platform(),
+                "processor": platform.processor() or platform.machine(),
+                "cpus": os.cpu_count(),
+                "python": platform.python_version(),
+            },
+            "context": context or {},
+            "histograms": {name: h.to_dict() for name, h in self.histograms.items()},
+        }
+        outdir = os.path.dirname(path) or "."
+        os.makedirs(outdir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".timing_", suffix=".json.tmp", dir=outdir)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+        os.replace(tmp_path, path)
+
+
+class PlaybackStats:
+    """CPU use of the app and the player's decoded/dropped frames.
+
+    libVLC decodes inside this process, so process CPU time covers
+    decoding and rendering. `sample(player_stats)` returns rates since the
+    previous sample; `summary()` gives averages since the first one, to
+    compare performance profiles on a station.
+    """
+
+    def __init__(self):
+        self._first = None
+        self._last = None
+        self.latest = {}
+        self.decoded = self.displayed = self.lost = 0
+
+    def sample(self, player_stats):
+        now, cpu = time.perf_counter(), time.process_time()
+        counters = player_stats or {"decoded": 0, "displayed": 0, "lost": 0}
+        if self._first is None:
+            self._first = (now, cpu)
+        if self._last is not None:
+            last_now, last_cpu, last = self._last
+            dt = max(now - last_now, 1e-6)
+            # Counters start over with each loaded media
+            delta = {k: counters[k] - last[k] if counters[k] >= last[k] else counters[k] for k in counters}
+            self.decoded += delta["decoded"]
+            self.displayed += delta["displayed"]
+            self.lost += delta["lost"]
+            self.latest = {
+                "cpu_percent": (cpu - last_cpu) / dt * 100.0,
+                "decoded_fps": delta["decoded"] / dt,
+                "displayed_fps": delta["displayed"] / dt,
+                "lost_per_s": delta["lost"] / dt,
+            }
+        self._last = (now, cpu, counters)
+        return self.latest
+
+    def summary(self):
+        if self._first is None:
+            return {}
+        elapsed = max(self._last[0] - self._first[0], 1e-6)
+        shown = self.displayed + self.lost
+        return {
+            "seconds": elapsed,
+            "cpu_percent": (self._last[1] - self._first[1]) / elapsed * 100.0,
+            "decoded_frames": self.decoded,
+            "displayed_frames": self.displayed,
+            "lost_frames": self.lost,
+            "lost_fraction": self.lost / shown if shown else 0.0,
+        }
+
+    def format_line(self):
+        r = self.latest
+        if not r:
+            return "playback: (no samples yet)"
+        return (f"cpu {r['cpu_percent']:.0f}%  decoded {r['decoded_fps']:.1f}/s  displayed "
+                f"{r['displayed_fps']:.1f}/s  dropped {r['lost_per_s']:.1f}/s  (session: {self.lost} dropped)")
+
+
+class Heartbeat:
+    """Measures Tk event-loop lag: how late a periodic `after()` callback fires."""
+
+    def __init__(self, master, histogram, period_ms=100):
+        self.master = master
+        self.histogram = histogram
+        self.period_ms = period_ms
+        self._due_ns = None
+        self._after_id = None
+
+    def start(self):
+        if self._after_id is None:
+            self._due_ns = time.perf_counter_ns() + self.period_ms * 1_000_000
+            self._after_id = self.master.after(self.period_ms, self._beat)
+
+    def stop(self):
+        if self._after_id is not None:
+            self.master.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _beat(self):
+        now = time.perf_counter_ns()
+        self.histogram.record(max(0, now - self._due_ns) / 1000.0)
+        self._due_ns = now + self.period_ms * 1_000_000
+        self._after_id = self.master.after(self.period_ms, self._beat)
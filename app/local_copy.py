@@ -0,0 +1,275 @@
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from video_cache import VideoCache, get_user_cache_dir
+
+# Large sequential reads are what SMB/NFS servers serve fastest
+CHUNK_BYTES = 8 * 1024 * 1024
+
+
+def copy_key(path):
+    """(cache key, size) of a file from its location, size and modification time.
+
+    Costs one stat on the share and no reads, so looking up a copy is cheap;
+    a video that changed on the share gets a new key and is copied again.
+    """
+    st = os.stat(path)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}".encode("utf-8"))
+    return h.hexdigest(), st.st_size
+
+
+def _copy_name(path):
+    # Keep the extension: libVLC picks the demuxer by it
+    return "video" + os.path.splitext(path)[1].lower()
+
+
+def _open_source(path):
+    return open(path, "rb", buffering=0)
+
+
+class ThrottledFile:
+    """Read-only file served like a busy file server would: `latency_s` per request, `bytes_per_s` throughput.
+
+    Stand-in for a network share when testing LocalCopies on a local disk.
+    """
+
+    def __init__(self, path, bytes_per_s, latency_s):
+        self._f = open(path, "rb", buffering=0)
+        self.bytes_per_s = bytes_per_s
+        self.latency_s = latency_s
+
+    def read(self, n=-1):
+        data = self._f.read(n)
+        time.sleep(self.latency_s + len(data) / self.bytes_per_s)
+        return data
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        time.sleep(self.latency_s)
+        return self._f.seek(offset, whence)
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def throttled_opener(mbps, latency_ms):
+    """`open_source` for LocalCopies that reads like a share with `mbps` Mbit/s and `latency_ms` per request."""
+    return lambda path: ThrottledFile(path, mbps * 1e6 / 8, latency_ms / 1000.0)
+
+
+class LocalCopies:
+    """Local copies of videos on network shares, so playback and seeks don't wait on the network.
+
+    Copies are made one at a time by a background thread, in CHUNK_BYTES
+    sequential reads, into a VideoCache of their own: capped at `max_bytes`
+    and evicted least-recently-used (room is made before a copy starts).
+    A copy is written to a `.part` file and renamed when complete, so an
+    interrupted copy resumes where it stopped next time.
+
+    `request(path, on_done, first=True)` is for the video being watched: it
+    goes to the front of the queue, and a prefetch being copied yields to
+    it. `on_progress(path, done, total)` and `on_done(path, local_path)`
+    are called from the copy thread.
+    """
+
+    def __init__(self, root=None, max_bytes=20 * 1024 ** 3, chunk_bytes=CHUNK_BYTES, open_source=None,
+                 on_progress=None):
+        # Not inside the main cache root: its eviction would count (and drop) the copies
+        self.cache = VideoCache(root or get_user_cache_dir() + "-copies", max_bytes, pinned_suffixes=())
+        self.chunk_bytes = chunk_bytes
+        self.open_source = open_source or _open_source
+        self.on_progress = on_progress
+        self.copied_bytes = 0
+        self._cond = threading.Condition()
+        self._queue = []              # [(path, on_done)], next copy first
+        self._active = None           # [path, on_done] being copied
+        self._preempt = False         # the active copy should make way for the queue's head
+        self._in_use = []             # keys of recently looked-up copies (never evicted)
+        self._watched = None          # path last requested with first=True (never evicted either)
+        self._closed = False
+        self._thread = None
+
+    def lookup(self, path):
+        """Path of the complete local copy of `path`, or None."""
+        try:
+            key, _ = copy_key(path)
+        except OSError:
+            return None
+        local = self.cache.find(key, _copy_name(path))
+        if local is not None:
+            with self._cond:
+                self._in_use = [k for k in self._in_use if k != key][-1:] + [key]
+        return local
+
+    def request(self, path, on_done=None, first=False):
+        """Queue a copy of `path` (nothing happens if it's already queued, copying or copied)."""
+        with self._cond:
+            if self._closed:
+                return
+            if first:
+                self._watched = path
+            if self._active is not None and self._active[0] == path:
+                self._active[1] = on_done or self._active[1]
+                return
+            for i, (queued, cb) in enumerate(self._queue):
+                if queued == path:
+                    del self._queue[i]
+                    on_done = on_done or cb
+                    if not first:
+                        self._queue.insert(i, (path, on_done))
+                        return
+                    break
+            if first:
+                self._queue.insert(0, (path, on_done))
+                self._preempt = self._active is not None
+            else:
+                self._queue.append((path, on_done))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="local-copy", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    @property
+    def busy(self):
+        """True while copies are queued or running."""
+        with self._cond:
+            return bool(self._queue) or self._active is not None
+
+    def prefetch(self, paths):
+        for path in paths:
+            self.request(path)
+
+    def close(self):
+        """Stop copying (the current copy keeps its `.part` to resume later)."""
+        with self._cond:
+            self._closed = True
+            self._queue = []
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                path, on_done = self._queue.pop(0)
+                self._active = [path, on_done]
+                self._preempt = False
+            try:
+                local = self._copy(path)
+            except OSError:
+                local = None
+            with self._cond:
+                active, self._active = self._active, None
+                if local is None and self._preempt and not self._closed:
+                    # Made way for the video being watched; carry on after it
+                    self._queue.insert(1, (path, active[1]))
+            if local is not None and active[1] is not None:
+                active[1](path, local)
+
+    def _copy(self, path):
+        key, size = copy_key(path)
+        name = _copy_name(path)
+        local = self.cache.find(key, name)
+        if local is not None:
+            return local
+        if size > self.cache.max_bytes:
+            return None  # would never fit
+        final = self.cache.path(key, name)
+        part = final + ".part"
+        try:
+            done = os.path.getsize(part)
+        except OSError:
+            done = 0
+        if done > size:
+            done = 0
+        with self._cond:
+            keep = [key] + self._in_use
+            watched = self._watched
+        if watched is not None and watched != path:
+            try:
+                keep.append(copy_key(watched)[0])
+            except OSError:
+                pass
+        self.cache.evict(keep=keep, reserve_bytes=size - done)
+        with self.open_source(path) as src, open(part, "r+b" if done else "wb") as dst:
+            if done:
+                src.seek(done)
+                dst.seek(done)
+            while done < size:
+                if self._closed or self._preempt:
+                    return None
+                data = src.read(min(self.chunk_bytes, size - done))
+                if not data:
+                    break
+                dst.write(data)
+                done += len(data)
+                self.copied_bytes += len(data)
+                if self.on_progress is not None:
+                    self.on_progress(path, done, size)
+        if done != size:
+            # Shorter than when we started: the video changed on the share
+            os.remove(part)
+            return None
+        os.replace(part, final)
+        return final
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Copy videos into a local cache the way --local-cache-gb does, optionally from a "
+                    "simulated slow share, and report the throughput")
+    parser.add_argument("videos", nargs="+")
+    parser.add_argument("--cache-dir", type=str, default=None,
+                        help="Cache directory (default: a temporary one; the app's is next to its cache folder)")
+    parser.add_argument("--cap-mb", type=int, default=20 * 1024, help="Size limit of the cache (MB)")
+    parser.add_argument("--mbps", type=float, default=0, help="Simulated share throughput in Mbit/s (0 = no throttling)")
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="Simulated per-request latency (ms)")
+    args = parser.parse_args(argv)
+
+    root = args.cache_dir or tempfile.mkdtemp(prefix="local_copies_")
+    opener = throttled_opener(args.mbps, args.latency_ms) if args.mbps > 0 else None
+    finished = threading.Event()
+    remaining = set(os.path.abspath(v) for v in args.videos)
+    t0 = time.perf_counter()
+
+    def on_progress(path, done, total):
+        print(f"\r{os.path.basename(path)}  {done * 100 // total:3d}%", end="", flush=True)
+
+    def on_done(path, local):
+        print(f"\r{os.path.basename(path)} -> {local}  {time.perf_counter() - t0:.1f} s")
+        remaining.discard(path)
+        if not remaining:
+            finished.set()
+
+    copies = LocalCopies(root, args.cap_mb * 1024 * 1024, open_source=opener, on_progress=on_progress)
+    for path in sorted(remaining):
+        copies.request(path, on_done)
+    try:
+        # Videos that can't be copied (too big, vanished) never report; stop once the queue is idle
+        while not finished.wait(0.5) and copies.busy:
+            pass
+    except KeyboardInterrupt:
+        copies.close()
+        print("\ninterrupted; run again with the same --cache-dir to resume")
+        return 1
+    elapsed = time.perf_counter() - t0
+    print(f"{copies.copied_bytes / 1e6:.0f} MB copied in {elapsed:.1f} s "
+          f"({copies.copied_bytes * 8 / 1e6 / max(elapsed, 1e-9):.0f} Mbit/s) into {root}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+import asyncio
+import json
+import os
+import queue
+import re
+import tempfile
+import threading
+import time
+import uuid
+
+from mark_server import DEFAULT_PORT, LINE_LIMIT
+from video_cache import get_user_cache_dir
+
+
+def parse_server_arg(value):
+    """'HOST[:PORT]' -> (host, port)."""
+    host, sep, port = value.rpartition(":")
+    if sep and port.isdigit():
+        return host, int(port)
+    return value, DEFAULT_PORT
+
+
+def default_spool_path(annotator):
+    """Offline queue of an annotator's unsent marks, in the app's cache folder."""
+    safe = re.sub(r"[^\w.-]+", "_", annotator)
+    return os.path.join(get_user_cache_dir(), f"mark_stream_{safe}.spool")
+
+
+class MarkStreamer:
+    """Streams this annotator's marks to an aggregation server (mark_server.py) as they are made.
+
+    The `post_*` methods only put the change on a queue, so the Tk thread
+    never waits for the network or the disk. A thread running an asyncio
+    loop gathers what was queued every `batch_ms` into one numbered batch,
+    appends it to the spool file (the offline queue, fsynced) and sends it;
+    up to `window` batches are in flight before the server's acks. Batches
+    stay spooled until acked: after a lost connection, an ack timeout or an
+    app restart they are re-sent, and the server skips the ones it already
+    has. Reconnects back off from 0.5 s up to 30 s.
+    """
+
+    def __init__(self, host, port, annotator, spool_path, batch_ms=250, window=16, ack_timeout=10.0):
+        self.host = host
+        self.port = port
+        self.annotator = annotator
+        self.spool_path = spool_path
+        self.batch_ms = batch_ms
+        self.window = window
+        self.ack_timeout = ack_timeout
+        self.client_id = None
+        self.connected = False
+        self.sent = 0                 # batch transmissions, including re-sends
+        self.acked = 0
+        self.reconnects = 0
+        self._queue = queue.Queue()
+        self._position = None         # latest (video, t_ms, duration_ms); sent without acks
+        self._unacked = {}            # seq -> encoded batch line, in seq order
+        self._next_seq = 1
+        self._acked_seq = 0
+        self._spooled = 0             # batches in the spool file
+        self._spool = None
+        self._loop = None
+        self._stop = None
+        self._thread = threading.Thread(target=self._run, name="mark-streamer", daemon=True)
+        self._thread.start()
+
+    # --- Tk thread ---
+    def post_reset(self, video, label, category_names, marks):
+        """All marks of `video` (a MarkStore copy), replacing what the server has from this annotator."""
+        self._queue.put(("reset", video, label, category_names, marks))
+
+    def post_op(self, video, op, time_ms, arg_ms, category, flags, source):
+        self._queue.put(("op", video, op, time_ms, arg_ms, category, flags, source))
+
+    def post_position(self, video, t_ms, duration_ms):
+        self._position = (video, t_ms, duration_ms)
+
+    def stats(self):
+        return {"connected": self.connected, "unacked": len(self._unacked), "sent": self.sent,
+                "acked": self.acked, "reconnects": self.reconnects}
+
+    def close(self, timeout=2.0):
+        """Spool what is still queued, try to deliver it for up to `timeout` s, and stop."""
+        loop, stop = self._loop, self._stop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(stop.set)
+            except RuntimeError:
+                pass  # loop already closed
+        self._thread.join(timeout)
+
+    # --- Streamer thread ---
+    def _run(self):
+        asyncio.run(self._main())
+
+    async def _main(self):
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        self._wake = asyncio.Event()
+        self._open_spool()
+        connection = asyncio.ensure_future(self._connect_loop())
+        try:
+            while not self._stop.is_set():
+                try:
+                    await asyncio.wait_for(self._stop.wait(), self.batch_ms / 1000.0)
+                except asyncio.TimeoutError:
+                    pass
+                self._collect()
+            if self._unacked and self.connected:
+                # Last chance to deliver before the app exits; the spool keeps the rest
+                deadline = time.monotonic() + 1.0
+                while self._unacked and self.connected and time.monotonic() < deadline:
+                    await asyncio.sleep(0.05)
+        finally:
+            connection.cancel()
+            self._compact_spool()
+            self._spool.close()
+
+    def _collect(self):
+        items = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item[0] == "reset":
+                kind, video, label, names, marks = item
+                item = (kind, video, label, names, marks.in_added_order())
+            items.append(item)
+        if not items:
+            if self._position is not None:
+                self._wake.set()  # the connection sends the position
+            return
+        # Stay under the server's line limit: split into several batches if needed
+        batches, size = [[]], 0
+        for item in items:
+            n = len(json.dumps(item, separators=(",", ":"))) + 1
+            if batches[-1] and size + n > LINE_LIMIT - 64:
+                batches.append([])
+                size = 0
+            batches[-1].append(item)
+            size += n
+        for part in batches:
+            seq = self._next_seq
+            self._next_seq += 1
+            line = json.dumps({"batch": seq, "items": part}, separators=(",", ":")) + "\n"
+            self._spool.write(line)
+            self._unacked[seq] = line.encode("utf-8")
+            self._spooled += 1
+        self._spool.flush()
+        os.fsync(self._spool.fileno())
+        self._wake.set()
+
+    # --- Offline queue ---
+    def _open_spool(self):
+        """Load unacked batches left by an earlier run, then append to the spool."""
+        os.makedirs(os.path.dirname(self.spool_path) or ".", exist_ok=True)
+        try:
+            with open(self.spool_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        msg = json.loads(line)
+                    except ValueError:
+                        continue  # torn tail after a crash
+                    if "client" in msg:
+                        self.client_id, self._acked_seq = msg["client"], msg.get("acked", 0)
+                    elif msg.get("batch", 0) > self._acked_seq:
+                        self._unacked[msg["batch"]] = line.encode("utf-8")
+        except FileNotFoundError:
+            pass
+        if self.client_id is None:
+            self.client_id = uuid.uuid4().hex
+        self._next_seq = max([self._acked_seq, *self._unacked]) + 1
+        self._compact_spool()
+
+    def _compact_spool(self):
+        """Rewrite the spool with only the unacked batches (atomic rename)."""
+        if self._spool is not None:
+            self._spool.close()
+        outdir = os.path.dirname(self.spool_path) or "."
+        fd, tmp_path = tempfile.mkstemp(prefix=".spool_", suffix=".tmp", dir=outdir)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"client": self.client_id, "acked": self._acked_seq}) + "\n")
+            for line in self._unacked.values():
+                f.write(line.decode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.spool_path)
+        self._spool = open(self.spool_path, "a", encoding="utf-8")
+        self._spooled = len(self._unacked)
+
+    def _on_ack(self, seq):
+        for s in [s for s in self._unacked if s <= seq]:
+            del self._unacked[s]
+            self.acked += 1
+        self._acked_seq = max(self._acked_seq, seq)
+        if not self._unacked and self._spooled >= 64:
+            self._compact_spool()
+
+    # --- Connection ---
+    async def _connect_loop(self):
+        delay = 0.5
+        while True:
+            try:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port, limit=LINE_LIMIT), 5.0)
+            except (OSError, asyncio.TimeoutError):
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+                continue
+            delay = 0.5
+            try:
+                await self._session(reader, writer)
+            except (OSError, ValueError, KeyError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                pass
+            finally:
+                self.connected = False
+                writer.close()
+            self.reconnects += 1
+            await asyncio.sleep(delay)
+
+    async def _session(self, reader, writer):
+        writer.write(json.dumps({"hello": {"client": self.client_id, "annotator": self.annotator}}).encode("utf-8")
+                     + b"\n")
+        await writer.drain()
+        welcome = json.loads(await asyncio.wait_for(reader.readline(), self.ack_timeout))
+        self._on_ack(welcome["welcome"])   # already applied by the server before we lost it
+        self.connected = True
+        acks = asyncio.ensure_future(self._read_acks(reader))
+        sent_upto = self._acked_seq
+        sent_at = {}                  # seq -> monotonic time sent
+        last_position = None
+        try:
+            while not acks.done():
+                for seq, line in list(self._unacked.items()):
+                    if seq <= sent_upto:
+                        continue
+                    if sum(1 for s in sent_at if s in self._unacked) >= self.window:
+                        break
+                    writer.write(line)
+                    sent_upto = seq
+                    sent_at[seq] = time.monotonic()
+                    self.sent += 1
+                position = self._position
+                if position is not None and position != last_position:
+                    last_position = position
+                    writer.write(json.dumps({"pos": position}).encode("utf-8") + b"\n")
+                await writer.drain()
+                oldest = min((sent_at[s] for s in self._unacked if s in sent_at), default=None)
+                if oldest is not None and time.monotonic() - oldest > self.ack_timeout:
+                    raise asyncio.TimeoutError  # reconnect and re-send
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), 1.0)
+                except asyncio.TimeoutError:
+                    pass
+                sent_at = {s: t for s, t in sent_at.items() if s in self._unacked}
+        finally:
+            acks.cancel()
+
+    async def _read_acks(self, reader):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                self._on_ack(json.loads(line)["ack"])
+                self._wake.set()
+        except (OSError, ValueError, KeyError, asyncio.IncompleteReadError):
+            pass  # ends the session; the connect loop reconnects
@@ -0,0 +1,247 @@
+import csv
+import json
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from itertools import repeat
+
+from categories import FLAG_BY_NAME, FLAG_NAMES
+
+# File layout:
+#   magic | uint32 header length | uint64 data offset | JSON header | zero padding | columns
+# Each column is a contiguous little-endian array at `data offset + column
+# offset` (64/8-byte aligned), so it can be memory-mapped as is.
+COLUMNS_MAGIC = b"VMC1"
+COLUMNS_SUFFIX = ".vmc"
+_PREFIX = struct.Struct("<4sIQ")
+_ALIGN = 64
+
+# name, array typecode, numpy dtype. Times are whole milliseconds, the
+# resolution marks are stamped and stored with.
+COLUMNS = (
+    ("time_ms", "q", "<i8"),
+    ("vlc_time_ms", "q", "<i8"),
+    ("category", "H", "<u2"),
+    ("flags", "B", "u1"),
+    ("stream", "B", "u1"),
+)
+
+
+def columns_path(csv_path):
+    """Path of the binary export written next to a CSV."""
+    return os.path.splitext(csv_path)[0] + COLUMNS_SUFFIX
+
+
+def _pad(n, align):
+    return -n % align
+
+
+def _write_columns(path, columns, category_names, metadata, stream_names=None):
+    """Write arrays keyed by column name (all the same length), replacing `path` atomically.
+
+    Columns are written in COLUMNS order; any of them but `time_ms` may be left out.
+    """
+    count = len(columns["time_ms"])
+    layout = []
+    offset = 0
+    for name, _, dtype in COLUMNS:
+        if name not in columns:
+            continue
+        layout.append({"name": name, "dtype": dtype, "offset": offset})
+        offset += count * columns[name].itemsize
+        offset += _pad(offset, 8)
+    header = {
+        "count": count,
+        "columns": layout,
+        "category_names": {str(cid): name for cid, name in category_names.items()},
+        "metadata": metadata or {},
+    }
+    if stream_names:
+        header["stream_names"] = list(stream_names)
+    blob = json.dumps(header).encode("utf-8")
+    data_start = _PREFIX.size + len(blob)
+    data_start += _pad(data_start, _ALIGN)
+
+    outdir = os.path.dirname(path) or "."
+    os.makedirs(outdir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".marks_", suffix=".vmc.tmp", dir=outdir)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_PREFIX.pack(COLUMNS_MAGIC, len(blob), data_start) + blob)
+            f.write(b"\0" * (data_start - f.tell()))
+            for name in (col["name"] for col in layout):
+                values = columns[name]
+                if sys.byteorder == "big":
+                    values = array(values.typecode, values)
+                    values.byteswap()
+                values.tofile(f)
+                f.write(b"\0" * _pad(f.tell(), 8))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def write_marks_columns(path, marks, category_names, metadata=None, stream_names=None):
+    """Write a MarkStore as a columnar binary file (times in milliseconds).
+
+    The `stream` column and the header's `stream_names` are only written for multi-camera sessions.
+    """
+    columns = {
+        "time_ms": array("q", marks.times),
+        "vlc_time_ms": array("q", marks.raw_times),
+        "category": array("H", marks.categories),
+        "flags": array("B", marks.flags),
+    }
+    if stream_names:
+        columns["stream"] = array("B", marks.sources)
+    _write_columns(path, columns, category_names, metadata, stream_names)
+
+
+def read_columns_header(path):
+    """The JSON header, with `data_offset` added and column offsets made absolute."""
+    with open(path, "rb") as f:
+        magic, size, data_start = _PREFIX.unpack(f.read(_PREFIX.size))
+        if magic != COLUMNS_MAGIC:
+            raise ValueError(f"Not a marks column file: {path}")
+        header = json.loads(f.read(size).decode("utf-8"))
+    header["data_offset"] = data_start
+    for col in header["columns"]:
+        col["offset"] += data_start
+    return header
+
+
+def read_marks_columns(path):
+    """Return (header, {column name: array}) without NumPy."""
+    header = read_columns_header(path)
+    codes = {name: code for name, code, _ in COLUMNS}
+    columns = {}
+    with open(path, "rb") as f:
+        for col in header["columns"]:
+            values = array(codes[col["name"]])
+            f.seek(col["offset"])
+            values.fromfile(f, header["count"])
+            if sys.byteorder == "big":
+                values.byteswap()
+            columns[col["name"]] = values
+    return header, columns
+
+
+def memmap_marks_columns(path):
+    """Return (header, {column name: numpy.memmap}); the data is not copied or parsed.
+
+    Needs NumPy, which the app itself doesn't depend on.
+    """
+    import numpy as np
+
+    header = read_columns_header(path)
+    return header, {
+        col["name"]: np.memmap(path, dtype=col["dtype"], mode="r", offset=col["offset"], shape=(header["count"],))
+        for col in header["columns"]
+    }
+
+
+def csv_to_columns(csv_path, out_path):
+    """Convert a marks CSV (any version) to the binary format. Returns the mark count.
+
+    Rows are streamed into compact arrays, so memory stays at ~20 bytes per mark.
+    """
+    metadata = {}
+    category_ids = {}
+    columns = {name: array(code) for name, code, _ in COLUMNS}
+    stream_ids = {}
+    with open(csv_path, "r", newline="", encoding="utf-8-sig") as f:
+        lines = iter(f)
+        header = None
+        for line in lines:
+            if line.startswith("#"):
+                key, sep, value = line[1:].partition(":")
+                if sep:
+                    metadata[key.strip()] = value.strip()
+                continue
+            header = next(csv.reader([line]))
+            break
+        if header is None or "timestamp_seconds" not in header:
+            raise ValueError(f"Not a marks CSV: {csv_path}")
+        col = {name: i for i, name in enumerate(header)}
+
+        def field(name):
+            i = col.get(name)
+            return row[i] if i is not None and i < len(row) else ""
+
+        for row in csv.reader(lines):
+            if not field("timestamp_seconds"):
+                continue
+            t_ms = int(round(float(row[col["timestamp_seconds"]]) * 1000))
+            raw = field("vlc_time_seconds")
+            name = field("category") or "event"
+            columns["time_ms"].append(t_ms)
+            columns["vlc_time_ms"].append(int(round(float(raw) * 1000)) if raw else t_ms)
+            columns["category"].append(category_ids.setdefault(name, len(category_ids)))
+            columns["flags"].append(FLAG_BY_NAME.get(field("kind"), 0))
+            columns["stream"].append(stream_ids.setdefault(field("stream"), len(stream_ids)))
+    if "stream" not in col:
+        del columns["stream"]
+    _write_columns(out_path, columns, {cid: name for name, cid in category_ids.items()}, metadata,
+                   list(stream_ids) if "stream" in col else None)
+    return len(columns["time_ms"])
+
+
+def columns_to_csv(path, out_csv, chunk=65536):
+    """Convert a binary marks file back to the app's CSV format, `chunk` marks at a time."""
+    header = read_columns_header(path)
+    names = {int(cid): name for cid, name in header["category_names"].items()}
+    metadata = header["metadata"]
+    fps = float(metadata.get("fps") or 0.0)
+    offsets = {col["name"]: col["offset"] for col in header["columns"]}
+    codes = {name: code for name, code, _ in COLUMNS if name in offsets}
+    streams = header.get("stream_names")
+    count = header["count"]
+    with open(path, "rb") as src, open(out_csv, "w", newline="") as f:
+        for key, value in metadata.items():
+            f.write(f"# {key}: {value}\n")
+        writer = csv.writer(f)
+        writer.writerow(["timestamp_seconds", "category", "kind", "vlc_time_seconds", "frame_index"]
+                        + (["stream"] if streams else []))
+        for start in range(0, count, chunk):
+            n = min(chunk, count - start)
+            part = {}
+            for name, code in codes.items():
+                values = array(code)
+                src.seek(offsets[name] + start * values.itemsize)
+                values.fromfile(src, n)
+                if sys.byteorder == "big":
+                    values.byteswap()
+                part[name] = values
+            # Only time_ms is required; missing columns are filled in the way csv_to_columns does
+            times = part["time_ms"]
+            rows = (
+                [f"{t/1000.0:.3f}", names.get(cid, str(cid)), FLAG_NAMES.get(flags, ""), f"{raw/1000.0:.3f}",
+                 int(t * fps / 1000.0) if fps else ""]
+                for t, raw, cid, flags in zip(times, part.get("vlc_time_ms", times),
+                                              part.get("category", repeat(0, n)), part.get("flags", repeat(0, n)))
+            )
+            if streams:
+                rows = (row + [streams[src] if src < len(streams) else src]
+                        for row, src in zip(rows, part.get("stream", repeat(0, n))))
+            writer.writerows(rows)
+    return count
+
+
+if __name__ == "__main__":
+    # Converter: python mark_columns.py IN OUT (direction chosen by the input's extension)
+    if len(sys.argv) != 3:
+        print("usage: mark_columns.py marks.csv marks.vmc | marks.vmc marks.csv")
+        sys.exit(2)
+    src, dst = sys.argv[1:]
+    if src.lower().endswith(COLUMNS_SUFFIX):
+        print(f"{columns_to_csv(src, dst)} marks -> {dst}")
+    else:
+        print(f"{csv_to_columns(src, dst)} marks -> {dst}")
@@ -0,0 +1,58 @@
+import csv
+import os
+import tempfile
+
+from categories import FLAG_NAMES
+
+
+def read_csv_metadata(path):
+    """The `# key: value` lines at the top of a marks CSV, as a dict (raises OSError if unreadable)."""
+    metadata = {}
+    with open(path, "r", newline="", encoding="utf-8-sig") as f:
+        for line in f:
+            if not line.startswith("#"):
+                break
+            key, sep, value = line[1:].partition(":")
+            if sep:
+                metadata[key.strip()] = value.strip()
+    return metadata
+
+
+def write_marks_csv(path, marks, category_names, fps=0.0, metadata=None, stream_names=None):
+    """Write a MarkStore as CSV (one row per mark), replacing `path` atomically.
+
+    With a known `fps`, each mark also gets the index of the frame shown at that time.
+    `metadata` (e.g. the video fingerprint) is written first as `# key: value` lines.
+    With `stream_names` (multi-camera view), a `stream` column names the stream each mark was made on.
+    """
+    outdir = os.path.dirname(path) or "."
+    os.makedirs(outdir, exist_ok=True)
+    # Write to a temp file in the same directory, then rename over the target so
+    # a crash mid-save never leaves a truncated CSV behind.
+    fd, tmp_path = tempfile.mkstemp(prefix=".marks_", suffix=".csv.tmp", dir=outdir)
+    try:
+        with os.fdopen(fd, "w", newline="") as f:
+            for key, value in (metadata or {}).items():
+                f.write(f"# {key}: {value}\n")
+            writer = csv.writer(f)
+            header = ["timestamp_seconds", "category", "kind", "vlc_time_seconds", "frame_index"]
+            rows = (
+                [f"{ms/1000.0:.3f}", category_names.get(cid, str(cid)), FLAG_NAMES.get(flags, ""), f"{raw/1000.0:.3f}",
+                 int(ms * fps / 1000.0) if fps else ""]
+                for ms, raw, cid, flags in zip(marks.times, marks.raw_times, marks.categories, marks.flags)
+            )
+            if stream_names:
+                header.append("stream")
+                rows = (row + [stream_names[src] if src < len(stream_names) else src]
+                        for row, src in zip(rows, marks.sources))
+            writer.writerow(header)
+            writer.writerows(rows)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,201 @@
+import json
+import os
+import queue
+import struct
+import threading
+import time
+
+from mark_store import MarkStore
+
+# Journal file layout:
+#   magic (4 bytes) | header length (uint32) | JSON header | fixed-size records...
+# Records are fixed size so a torn write at the tail (crash mid-append) is
+# detected and dropped on replay instead of corrupting the session.
+JOURNAL_MAGIC = b"VMJ4"
+_HEADER_LEN = struct.Struct("<I")
+_RECORD = struct.Struct("<BBHB3xqqq")  # op, flags, category, source stream, time_ms, arg_ms, monotonic_ns
+
+OP_ADD = 1           # add mark at time_ms; arg_ms = raw VLC time
+OP_UNDO = 2          # remove the most recently added mark
+OP_DELETE = 3        # remove one mark at time_ms with this category/flags
+OP_DELETE_RANGE = 4  # remove marks with time_ms <= t <= arg_ms
+OP_MOVE = 5          # move the mark at time_ms with this category/flags to arg_ms
+
+
+def replay_records(records, store=None):
+    """Apply journal records to `store` (a new MarkStore by default) and return it."""
+    if store is None:
+        store = MarkStore()
+    for op, flags, category, source, time_ms, arg_ms, _ in records:
+        if op == OP_ADD:
+            store.add(time_ms, arg_ms, category, flags, source)
+        elif op == OP_UNDO:
+            store.undo_last()
+        elif op == OP_DELETE:
+            store.remove(time_ms, category, flags)
+        elif op == OP_DELETE_RANGE:
+            store.delete_range(time_ms, arg_ms)
+        elif op == OP_MOVE:
+            i = store.index_of(time_ms, category, flags)
+            if i >= 0:
+                store.move(i, arg_ms)
+    return store
+
+
+def read_journal(path):
+    """Read a journal file and return (header dict, list of (op, flags, category, source, time_ms, arg_ms, monotonic_ns))."""
+    header, records, _ = _read_journal(path)
+    return header, records
+
+
+def _read_journal(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:4] != JOURNAL_MAGIC:
+        raise ValueError(f"Not a mark journal: {path}")
+    (header_len,) = _HEADER_LEN.unpack_from(data, 4)
+    body_start = 4 + _HEADER_LEN.size + header_len
+    header = json.loads(data[4 + _HEADER_LEN.size:body_start].decode("utf-8"))
+    # Ignore a partial record left by a crash mid-write
+    body_end = body_start + (len(data) - body_start) // _RECORD.size * _RECORD.size
+    records = list(_RECORD.iter_unpack(data[body_start:body_end]))
+    return header, records, body_start
+
+
+class MarkJournal:
+    """Append-only, crash-safe log of mark operations for one session.
+
+    `append` only enqueues a record, so the caller (the Tk thread) never
+    touches the disk. A writer thread flushes queued records in batches,
+    fsyncs them, and calls `compact_fn(store)` with a MarkStore replayed
+    from the log so the CSV can be rewritten off the UI thread.
+
+    A compaction rewrites every mark, so while marks keep arriving it runs
+    at most every `compact_interval` s per `compact_scale` marks (a 20000
+    mark session compacts every 50 s, not every 5 s); once no record has
+    arrived for `compact_interval` s the session is idle and it compacts
+    right away. The journal, not the CSV, is what makes marks crash-safe.
+
+    A failed compaction (full disk, read-only folder...) is retried with
+    the next one; `on_compact_error(exc)` is called from the writer thread
+    so the app can tell the user, and `stats()` counts the failures.
+    """
+
+    def __init__(self, path, header=None, compact_fn=None, compact_interval=5.0, compact_scale=2000,
+                 on_compact_error=None):
+        self.path = path
+        self.compact_fn = compact_fn
+        self.compact_interval = compact_interval
+        self.compact_scale = compact_scale
+        self.on_compact_error = on_compact_error
+        self.compactions = 0
+        self.compact_errors = 0
+        self.last_error = None    # str of the last failed compaction, None once one succeeds again
+        self._queue = queue.Queue()
+        self._store = MarkStore()
+        self._dirty = False
+        self._last_compact = time.monotonic()
+
+        if os.path.exists(path):
+            # Resume: keep existing records, drop any torn tail record
+            header, records, body_start = _read_journal(path)
+            self.header = header
+            self._store = replay_records(records)
+            self._file = open(path, "r+b")
+            self._file.seek(body_start + len(records) * _RECORD.size)
+            self._file.truncate()
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self.header = dict(header or {})
+            self.header.setdefault("created", time.time())
+            header_bytes = json.dumps(self.header).encode("utf-8")
+            self._file = open(path, "wb")
+            self._file.write(JOURNAL_MAGIC + _HEADER_LEN.pack(len(header_bytes)) + header_bytes)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+        self._thread = threading.Thread(target=self._run, name="mark-journal", daemon=True)
+        self._thread.start()
+
+    @property
+    def marks(self):
+        """MarkStore replayed from the journal at open time (for resuming)."""
+        return self._store.copy()
+
+    def append(self, op, time_ms=0, arg_ms=0, category=0, flags=0, source=0):
+        self._queue.put((op, flags, category, source, time_ms, arg_ms, time.monotonic_ns()))
+
+    def stats(self):
+        return {"compactions": self.compactions, "compact_errors": self.compact_errors,
+                "last_compact_error": self.last_error}
+
+    def request_compact(self):
+        self._queue.put("compact")
+
+    def close(self, remove=False):
+        """Flush pending records, stop the writer, optionally delete the journal."""
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
+        if remove:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+    def _run(self):
+        stop = False
+        while not stop:
+            try:
+                items = [self._queue.get(timeout=self.compact_interval)]
+                idle = False
+            except queue.Empty:
+                items = []
+                idle = True
+            # Drain whatever else is already queued into the same batch
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            records = []
+            force_compact = False
+            for item in items:
+                if item is None:
+                    stop = True
+                elif item == "compact":
+                    force_compact = True
+                else:
+                    records.append(item)
+
+            if records:
+                self._file.write(b"".join(_RECORD.pack(*r) for r in records))
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                replay_records(records, self._store)
+                self._dirty = True
+
+            due = time.monotonic() - self._last_compact >= self.compact_due_after()
+            if self._dirty and (force_compact or idle or due or stop):
+                self._compact()
+
+    def compact_due_after(self):
+        """Seconds between compactions while marks keep arriving; grows with the session."""
+        return self.compact_interval * max(1.0, len(self._store) / self.compact_scale)
+
+    def _compact(self):
+        if self.compact_fn is None:
+            return
+        try:
+            self.compact_fn(self._store.copy())
+            self._dirty = False
+            self.compactions += 1
+            self.last_error = None
+        except Exception as e:
+            # Keep the journal dirty; the next compaction retries. The marks are safe in the journal.
+            self.compact_errors += 1
+            self.last_error = str(e)
+            if self.on_compact_error is not None:
+                self.on_compact_error(e)
+        self._last_compact = time.monotonic()
@@ -0,0 +1,309 @@
+import argparse
+import csv
+import heapq
+import os
+import re
+import sys
+import time
+from array import array
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice, repeat
+
+# Default output name: <date>[_<video name>]_marks_<username>.csv (older versions cut the video name to 12 chars)
+_DEFAULT_NAME = re.compile(r"^\d{4}-\d{2}-\d{2}(?:_(?P<video>.*?))?_marks_(?P<annotator>.+)\.csv$")
+
+
+def iter_marks_files(root, exclude=()):
+    """Yield every marks CSV under `root` (a directory tree or a single file), in sorted order.
+
+    Directories in `exclude` (e.g. the merge's own output directory) are not entered.
+    """
+    if os.path.isfile(root):
+        yield root
+        return
+    excluded = {os.path.realpath(path) for path in exclude}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if os.path.realpath(os.path.join(dirpath, d)) not in excluded)
+        for name in sorted(filenames):
+            if name.lower().endswith(".csv") and not name.startswith("."):
+                yield os.path.join(dirpath, name)
+
+
+def read_marks_csv(path):
+    """Read a marks CSV written by any version of the app.
+
+    Returns (metadata, {event_key: sorted array of ms}). Files from before
+    categories existed only have `timestamp_seconds`; their marks go to the
+    default "event" category. Interval marks are keyed `category/begin` and
+    `category/end` so begins are only matched against begins. Every version
+    writes `timestamp_seconds` as the first column, which tells marks files
+    apart from other CSVs such as a merge's consensus.csv.
+    """
+    metadata = {}
+    events = defaultdict(list)
+    with open(path, "r", newline="", encoding="utf-8-sig") as f:
+        lines = iter(f)
+        header = None
+        for line in lines:
+            if line.startswith("#"):
+                key, sep, value = line[1:].partition(":")
+                if sep:
+                    metadata[key.strip()] = value.strip()
+                continue
+            header = next(csv.reader([line]))
+            break
+        if not header or header[0] != "timestamp_seconds":
+            raise ValueError(f"Not a marks CSV: {path}")
+        col_t = header.index("timestamp_seconds")
+        col_cat = header.index("category") if "category" in header else None
+        col_kind = header.index("kind") if "kind" in header else None
+        for row in csv.reader(lines):
+            if len(row) <= col_t or not row[col_t]:
+                continue
+            key = row[col_cat] if col_cat is not None and len(row) > col_cat and row[col_cat] else "event"
+            kind = row[col_kind] if col_kind is not None and len(row) > col_kind else ""
+            if kind and kind != "point":
+                key = f"{key}/{kind}"
+            events[key].append(int(round(float(row[col_t]) * 1000)))
+    return metadata, {key: array("q", sorted(times)) for key, times in events.items()}
+
+
+def identify(path, metadata):
+    """(video_key, video_label, annotator) for a marks file.
+
+    The video is identified by the content fingerprint only; video_key is
+    None for files without one (names are not unique enough to merge by).
+    """
+    match = _DEFAULT_NAME.match(os.path.basename(path))
+    video = metadata.get("video") or (match and match.group("video")) or os.path.basename(os.path.dirname(path))
+    annotator = metadata.get("annotator") or (match and match.group("annotator")) \
+        or os.path.splitext(os.path.basename(path))[0]
+    return metadata.get("video_fingerprint"), video, annotator
+
+
+def _load(path):
+    """Worker: parse one file. Returns (video_key, video_label, annotator, events), or (None, path, reason, events)
+    for a file that can't be merged: events is None if it couldn't be read, the marks if it has no fingerprint.
+    """
+    try:
+        metadata, events = read_marks_csv(path)
+    except (OSError, ValueError, csv.Error) as e:
+        return None, path, str(e), None
+    key, video, annotator = identify(path, metadata)
+    if key is None:
+        return None, path, "no video fingerprint", events
+    return key, video, annotator, events
+
+
+def match_count(a, b, tolerance_ms):
+    """Number of one-to-one matches between sorted times `a` and `b` within `tolerance_ms`.
+
+    A single two-pointer sweep over both lists (O(len(a) + len(b))): each
+    mark is paired with the earliest unpaired mark of the other list that
+    lies within the tolerance.
+    """
+    i = j = matched = 0
+    n, m = len(a), len(b)
+    while i < n and j < m:
+        d = a[i] - b[j]
+        if d < -tolerance_ms:
+            i += 1
+        elif d > tolerance_ms:
+            j += 1
+        else:
+            matched += 1
+            i += 1
+            j += 1
+    return matched
+
+
+def consensus_events(marks_by_annotator, tolerance_ms, min_votes):
+    """Cluster all annotators' marks into consensus events.
+
+    The annotators' sorted lists are k-way merged into one time-ordered
+    stream. A cluster starts at a mark and takes following marks up to
+    `tolerance_ms` later, at most one per annotator. Clusters marked by at
+    least `min_votes` annotators become consensus events, placed at the
+    median of their marks. Returns [(time_ms, votes)].
+    """
+    streams = [zip(times, repeat(who)) for who, times in enumerate(marks_by_annotator.values())]
+    events = []
+    cluster = []
+    voters = set()
+
+    def close():
+        if len(voters) >= min_votes:
+            mid = len(cluster) // 2
+            median = cluster[mid] if len(cluster) % 2 else (cluster[mid - 1] + cluster[mid]) // 2
+            events.append((median, len(voters)))
+
+    for t, who in heapq.merge(*streams):
+        if cluster and (t - cluster[0] > tolerance_ms or who in voters):
+            close()
+            cluster = []
+            voters = set()
+        cluster.append(t)
+        voters.add(who)
+    if cluster:
+        close()
+    return events
+
+
+def _f1(matched, n_a, n_b):
+    return 2.0 * matched / (n_a + n_b) if n_a + n_b else 1.0
+
+
+def analyze_video(job):
+    """Worker: consensus and agreement for one video.
+
+    `job` is (video_key, video_label, {annotator: {event_key: times}},
+    tolerance_ms, min_votes). Returns (consensus_rows, annotator_rows,
+    agreement_rows) ready for CSV output.
+    """
+    key, video, annotators, tolerance_ms, min_votes = job
+    consensus_rows, annotator_rows, agreement_rows = [], [], []
+    n_annotators = len(annotators)
+    votes_needed = min_votes or n_annotators // 2 + 1
+    event_keys = sorted({k for events in annotators.values() for k in events})
+    names = sorted(annotators)
+    for event_key in event_keys:
+        marks = {who: annotators[who].get(event_key, array("q")) for who in names}
+        consensus = consensus_events(marks, tolerance_ms, votes_needed)
+        consensus_t = array("q", (t for t, _ in consensus))
+        for t, votes in consensus:
+            consensus_rows.append([key, video, event_key, f"{t/1000.0:.3f}", votes, n_annotators])
+        for who in names:
+            times = marks[who]
+            matched = match_count(times, consensus_t, tolerance_ms)
+            precision = matched / len(times) if times else ""
+            recall = matched / len(consensus_t) if consensus_t else ""
+            annotator_rows.append([key, video, event_key, who, len(times), matched,
+                                   _fmt(precision), _fmt(recall), _fmt(_f1(matched, len(times), len(consensus_t)))])
+        pair_f1 = [_f1(match_count(marks[a], marks[b], tolerance_ms), len(marks[a]), len(marks[b]))
+                   for i, a in enumerate(names) for b in names[i + 1:]]
+        unanimous = sum(1 for _, votes in consensus if votes == n_annotators)
+        agreement_rows.append([key, video, event_key, n_annotators, len(consensus),
+                               _fmt(sum(pair_f1) / len(pair_f1)) if pair_f1 else "",
+                               _fmt(unanimous / len(consensus)) if consensus else ""])
+    return consensus_rows, annotator_rows, agreement_rows
+
+
+def _fmt(x):
+    return f"{x:.4f}" if isinstance(x, float) else x
+
+
+def _apply_all(fn, items):
+    return [fn(item) for item in items]
+
+
+def _map_bounded(pool, fn, items, chunksize, window):
+    """Results of fn(item) for each item, in order, like pool.map.
+
+    pool.map submits every chunk up front. Here `items` is read lazily, and at
+    most `window` chunks are in flight or waiting to be yielded at any time.
+    """
+    items = iter(items)
+    pending, ready = {}, {}
+    submitted = emitted = 0
+    exhausted = False
+    while True:
+        while not exhausted and len(pending) + len(ready) < window:
+            chunk = list(islice(items, chunksize))
+            if not chunk:
+                exhausted = True
+                break
+            pending[pool.submit(_apply_all, fn, chunk)] = submitted
+            submitted += 1
+        while emitted in ready:
+            yield from ready.pop(emitted)
+            emitted += 1
+        if not pending:
+            return
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            ready[pending.pop(future)] = future.result()
+
+
+CONSENSUS_HEADER = ["video_key", "video", "category", "timestamp_seconds", "votes", "annotators"]
+ANNOTATOR_HEADER = ["video_key", "video", "category", "annotator", "marks", "matched", "precision", "recall", "f1"]
+AGREEMENT_HEADER = ["video_key", "video", "category", "annotators", "consensus_events",
+                    "mean_pairwise_f1", "unanimous_fraction"]
+
+
+def merge_marks(root, out_dir, tolerance_ms=500, min_votes=0, jobs=None, progress=None):
+    """Merge every marks CSV under `root` and write the results to `out_dir`.
+
+    Files are parsed and videos analysed on a process pool of `jobs`
+    workers (default: one per CPU). Writes consensus.csv, annotators.csv and
+    agreement.csv. `min_votes=0` means a majority of the video's annotators.
+    Files without a video fingerprint (from older versions) are reported and
+    counted as `unidentified` instead of being merged. Returns a dict of counts.
+    """
+    videos = {}
+    annotations = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
+    stats = {"files": 0, "skipped": 0, "unidentified": 0, "videos": 0}
+    window = 4 * (jobs or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        paths = iter_marks_files(root, exclude=[out_dir])
+        for key, video, annotator, events in _map_bounded(pool, _load, paths, 64, window):
+            if events is None:
+                stats["skipped"] += 1
+                if progress:
+                    progress(f"skipped {video}: {annotator}")
+                continue
+            if key is None:
+                stats["unidentified"] += 1
+                if progress:
+                    progress(f"not merged {video}: {annotator}")
+                continue
+            stats["files"] += 1
+            videos.setdefault(key, video)
+            # Several files from one annotator for one video are pooled
+            for event_key, times in events.items():
+                annotations[key][annotator][event_key].append(times)
+
+        def video_jobs():
+            for key in sorted(annotations):
+                merged = {who: {k: array("q", sorted(t for part in parts for t in part)) if len(parts) > 1 else parts[0]
+                                for k, parts in events.items()}
+                          for who, events in annotations[key].items()}
+                yield key, videos[key], merged, tolerance_ms, min_votes
+
+        os.makedirs(out_dir, exist_ok=True)
+        with open(os.path.join(out_dir, "consensus.csv"), "w", newline="") as f_cons, \
+                open(os.path.join(out_dir, "annotators.csv"), "w", newline="") as f_ann, \
+                open(os.path.join(out_dir, "agreement.csv"), "w", newline="") as f_agr:
+            writers = [csv.writer(f) for f in (f_cons, f_ann, f_agr)]
+            for writer, header in zip(writers, (CONSENSUS_HEADER, ANNOTATOR_HEADER, AGREEMENT_HEADER)):
+                writer.writerow(header)
+            for rows in _map_bounded(pool, analyze_video, video_jobs(), 16, window):
+                stats["videos"] += 1
+                for writer, part in zip(writers, rows):
+                    writer.writerows(part)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="video_mark.py merge",
+                                     description="Merge marks CSVs from many annotators into consensus events")
+    parser.add_argument("root", help="Directory tree of marks CSVs (or a single CSV)")
+    parser.add_argument("--out", default="merged", help="Output directory (default: ./merged)")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="Marks within this many seconds count as the same event (default 0.5)")
+    parser.add_argument("--min-votes", type=int, default=0,
+                        help="Annotators needed for a consensus event (default: majority)")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    stats = merge_marks(args.root, args.out, int(round(args.tolerance * 1000)), args.min_votes, args.jobs,
+                        progress=lambda msg: print(msg, file=sys.stderr))
+    print(f"{stats['files']} files ({stats['skipped']} skipped, {stats['unidentified']} without fingerprint), "
+          f"{stats['videos']} videos "
+          f"in {time.perf_counter() - t0:.1f} s -> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
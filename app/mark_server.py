@@ -0,0 +1,383 @@
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+from array import array
+from collections import defaultdict
+
+from categories import FLAG_NAMES, FLAG_POINT
+from mark_csv import write_marks_csv
+from mark_journal import replay_records
+from mark_merge import match_count
+from mark_store import MarkStore
+
+# Wire protocol: one JSON object per line, both ways.
+#   client -> {"hello": {"client": id, "annotator": name}}
+#   server -> {"welcome": last batch seq applied for this client (0 = none)}
+#   client -> {"batch": seq, "items": [item, ...]}     (seq increases by 1 per batch, per client)
+#   server -> {"ack": seq}                             once the batch is in the server's log
+#   client -> {"pos": [video, t_ms, duration_ms]}      playhead, fire-and-forget
+#   client -> {"status": 1}  /  server -> {"status": {...}}
+# Items:
+#   ["reset", video, label, {category id: name}, [[t_ms, raw_ms, category, flags, source], ...]]
+#       all of this annotator's marks of a video, e.g. when a video is opened or a session resumed
+#   ["op", video, op, time_ms, arg_ms, category, flags, source]
+#       one mark journal operation (mark_journal.OP_*)
+# `video` is the content fingerprint (or the file name when unknown). A plain
+# HTTP GET on the same port returns the status as JSON.
+DEFAULT_PORT = 8765
+# The longest line is a reset: ~25 bytes per mark, so 4 MB is a ~150 000-mark session
+LINE_LIMIT = 4 * 1024 * 1024
+
+
+class AnnotatorState:
+    def __init__(self):
+        self.store = MarkStore()
+        self.categories = {}      # category id -> name
+        self.position_ms = 0
+        self.updated = 0.0        # time.time() of the last change
+
+    def event_times(self):
+        """{event key: sorted times}, keyed like mark_merge (`category` or `category/begin|end`)."""
+        events = defaultdict(lambda: array("q"))
+        store = self.store
+        for t, cid, flags in zip(store.times, store.categories, store.flags):
+            name = self.categories.get(cid, str(cid))
+            events[name if flags == FLAG_POINT else f"{name}/{FLAG_NAMES.get(flags, flags)}"].append(t)
+        return events
+
+
+class VideoState:
+    def __init__(self, label):
+        self.label = label
+        self.duration_ms = 0
+        self.annotators = defaultdict(AnnotatorState)
+        self.version = 0          # bumped on every mark change (agreement is cached per version)
+        self._agreement = (-1, None)
+
+    def agreement(self, tolerance_ms):
+        """{event key: mean pairwise F1 between this video's annotators}."""
+        version, cached = self._agreement
+        if version == self.version:
+            return cached
+        events = {who: a.event_times() for who, a in self.annotators.items()}
+        names = sorted(events)
+        result = {}
+        for key in sorted({k for e in events.values() for k in e}):
+            marks = [events[who].get(key, array("q")) for who in names]
+            pairs = [2.0 * match_count(a, b, tolerance_ms) / (len(a) + len(b)) if len(a) + len(b) else 1.0
+                     for i, a in enumerate(marks) for b in marks[i + 1:]]
+            result[key] = round(sum(pairs) / len(pairs), 4) if pairs else None
+        self._agreement = (self.version, result)
+        return result
+
+
+def _safe_name(text):
+    return re.sub(r"[^\w.-]+", "_", text).strip("._") or "_"
+
+
+class AggregationServer:
+    """Collects the marks of many annotators live, per video and per annotator.
+
+    Every accepted batch is appended to `<data_dir>/batches.jsonl` and
+    fsynced before it is applied and acknowledged, and replayed from there
+    on start, so nothing acked is lost when the server restarts. Batches
+    arriving together share one fsync. Batches a client re-sends after a
+    reconnect are recognised by their sequence number and only acked. The
+    marks are also written as ordinary marks CSVs under `out_dir`
+    (`<annotator>/<video>.csv`, every `export_interval` seconds), ready for
+    `video_mark.py merge`. Everything runs on one asyncio loop; file
+    syncing and CSV writing happen on the default executor.
+    """
+
+    def __init__(self, data_dir, out_dir=None, tolerance_ms=500, export_interval=5.0):
+        self.data_dir = data_dir
+        self.out_dir = out_dir
+        self.tolerance_ms = tolerance_ms
+        self.export_interval = export_interval
+        self.videos = {}          # video key -> VideoState
+        self.last_seq = {}        # client id -> last applied batch seq
+        self.connected = {}       # client id -> annotator, while connected
+        self.batches = 0
+        self.items = 0
+        self.started = time.time()
+        self._dirty = set()       # (video key, annotator) not yet exported
+        self._log = None
+        self._log_written = 0     # batches appended to the log
+        self._log_synced = 0      # of those, fsynced
+        self._syncing = None      # fsync in progress
+        self._handlers = {}       # connection task -> its writer, closed on shutdown
+
+    # --- State ---
+    def _video(self, key, label=None):
+        video = self.videos.get(key)
+        if video is None:
+            video = self.videos[key] = VideoState(label or key)
+        elif label:
+            video.label = label
+        return video
+
+    def is_new(self, client, seq):
+        return seq > self.last_seq.get(client, 0)
+
+    def apply(self, client, annotator, seq, items):
+        """Apply one batch; returns False if it was already applied."""
+        if not self.is_new(client, seq):
+            return False
+        now = time.time()
+        for item in items:
+            kind = item[0]
+            if kind == "reset":
+                _, key, label, categories, marks = item
+                video = self._video(key, label)
+                state = video.annotators[annotator]
+                state.categories = {int(cid): name for cid, name in categories.items()}
+                state.store = MarkStore()
+                for t_ms, raw_ms, category, flags, source in marks:
+                    state.store.add(t_ms, raw_ms, category, flags, source)
+            elif kind == "op":
+                _, key, op, time_ms, arg_ms, category, flags, source = item
+                video = self._video(key)
+                state = video.annotators[annotator]
+                replay_records([(op, flags, category, source, time_ms, arg_ms, 0)], state.store)
+            else:
+                continue  # from a newer client
+            state.updated = now
+            video.version += 1
+            self._dirty.add((key, annotator))
+        self.last_seq[client] = seq
+        self.batches += 1
+        self.items += len(items)
+        return True
+
+    def set_position(self, annotator, key, t_ms, duration_ms):
+        video = self._video(key)
+        if duration_ms > 0:
+            video.duration_ms = duration_ms
+        video.annotators[annotator].position_ms = t_ms
+
+    def status(self):
+        """Live progress and agreement of every video, as a JSON-ready dict."""
+        now = time.time()
+        online = set(self.connected.values())
+        videos = []
+        for key, video in sorted(self.videos.items(), key=lambda kv: kv[1].label):
+            annotators = []
+            for name, state in sorted(video.annotators.items()):
+                annotators.append({
+                    "annotator": name,
+                    "marks": len(state.store),
+                    "position_ms": state.position_ms,
+                    "progress": round(state.position_ms / video.duration_ms, 3) if video.duration_ms else None,
+                    "online": name in online,
+                    "idle_s": round(now - state.updated, 1) if state.updated else None,
+                })
+            videos.append({"video": key, "label": video.label, "duration_ms": video.duration_ms,
+                           "annotators": annotators, "agreement": video.agreement(self.tolerance_ms)})
+        return {"clients": len(self.connected), "batches": self.batches, "items": self.items,
+                "uptime_s": round(now - self.started), "tolerance_ms": self.tolerance_ms, "videos": videos}
+
+    # --- Persistence ---
+    def _log_path(self):
+        return os.path.join(self.data_dir, "batches.jsonl")
+
+    def load(self):
+        """Replay the batch log (a torn last line from a crash is skipped)."""
+        os.makedirs(self.data_dir, exist_ok=True)
+        try:
+            with open(self._log_path(), "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        self.apply(entry["client"], entry["annotator"], entry["seq"], entry["items"])
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        except FileNotFoundError:
+            pass
+        self._log = open(self._log_path(), "a", encoding="utf-8")
+
+    def _append_log(self, client, annotator, seq, items):
+        self._log.write(json.dumps({"client": client, "annotator": annotator, "seq": seq, "items": items},
+                                   separators=(",", ":")) + "\n")
+        self._log.flush()
+        self._log_written += 1
+
+    async def _sync_log(self):
+        """Return once everything appended to the log so far is on disk."""
+        target = self._log_written
+        while self._log_synced < target:
+            if self._syncing is None:
+                self._syncing = asyncio.ensure_future(self._fsync_log())
+            # Shielded: one connection going away must not cancel the others' fsync
+            await asyncio.shield(self._syncing)
+
+    async def _fsync_log(self):
+        written = self._log_written
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, os.fsync, self._log.fileno())
+            self._log_synced = written
+        finally:
+            self._syncing = None
+
+    def _take_exports(self):
+        """(path, marks, category names, metadata) of each (video, annotator) changed since the last export."""
+        dirty, self._dirty = self._dirty, set()
+        jobs = []
+        for key, annotator in dirty:
+            video = self.videos[key]
+            state = video.annotators[annotator]
+            path = os.path.join(self.out_dir, _safe_name(annotator),
+                                f"{_safe_name(os.path.splitext(video.label)[0])}_{key[:8]}.csv")
+            metadata = {"video": video.label, "annotator": annotator}
+            if key != video.label:
+                metadata["video_fingerprint"] = key
+            jobs.append((path, state.store.copy(), dict(state.categories), metadata))
+        return jobs
+
+    @staticmethod
+    def _write_exports(jobs):
+        for path, marks, categories, metadata in jobs:
+            write_marks_csv(path, marks, categories, 0.0, metadata)
+
+    async def _housekeeping(self):
+        loop = asyncio.get_running_loop()
+        last_export = time.monotonic()
+        while True:
+            await asyncio.sleep(1.0)
+            if self.out_dir and self._dirty and time.monotonic() - last_export >= self.export_interval:
+                last_export = time.monotonic()
+                try:
+                    await loop.run_in_executor(None, self._write_exports, self._take_exports())
+                except OSError as e:
+                    print(f"export failed: {e}", file=sys.stderr)
+
+    # --- Connections ---
+    async def handle(self, reader, writer):
+        task = asyncio.current_task()
+        self._handlers[task] = writer
+        client = annotator = None
+        try:
+            first = await reader.readline()
+            if first.startswith(b"GET "):
+                await self._http_status(reader, writer)
+                return
+            line = first
+            while line:
+                msg = json.loads(line)
+                if "batch" in msg and client is not None:
+                    seq = msg["batch"]
+                    if self.is_new(client, seq):
+                        # Logged first: if the write fails nothing changes, and the client re-sends
+                        self._append_log(client, annotator, seq, msg["items"])
+                        self.apply(client, annotator, seq, msg["items"])
+                    # Also for a re-sent batch, whose first copy may still be waiting for its fsync
+                    await self._sync_log()
+                    writer.write(b'{"ack":%d}\n' % seq)
+                elif "pos" in msg and client is not None:
+                    self.set_position(annotator, *msg["pos"])
+                elif "hello" in msg:
+                    client, annotator = msg["hello"]["client"], msg["hello"]["annotator"]
+                    self.connected[client] = annotator
+                    writer.write(b'{"welcome":%d}\n' % self.last_seq.get(client, 0))
+                elif "status" in msg:
+                    writer.write(json.dumps({"status": self.status()}).encode("utf-8") + b"\n")
+                await writer.drain()
+                line = await reader.readline()
+        except (OSError, ValueError, KeyError, TypeError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            if client is not None and self.connected.get(client) == annotator:
+                del self.connected[client]
+            writer.close()
+            self._handlers.pop(task, None)
+
+    async def _http_status(self, reader, writer):
+        while (await reader.readline()).strip():
+            pass  # skip the request headers
+        body = json.dumps(self.status(), indent=1).encode("utf-8")
+        writer.write(b"HTTP/1.0 200 OK\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n" % len(body))
+        writer.write(body)
+        await writer.drain()
+
+    async def serve(self, host="127.0.0.1", port=DEFAULT_PORT, ready=None):
+        """Run until cancelled. `ready(server)` is called once listening (e.g. to learn the port)."""
+        self.load()
+        server = await asyncio.start_server(self.handle, host, port, limit=LINE_LIMIT)
+        housekeeping = asyncio.ensure_future(self._housekeeping())
+        if ready is not None:
+            ready(server)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            housekeeping.cancel()
+            for writer in list(self._handlers.values()):
+                writer.close()  # the handlers then see the end of the stream and finish
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+            if self._syncing is not None:
+                await asyncio.gather(self._syncing, return_exceptions=True)
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            self._log.close()
+            if self.out_dir and self._dirty:
+                self._write_exports(self._take_exports())
+
+
+def print_status(status):
+    print(f"{status['clients']} clients connected, {status['batches']} batches")
+    for video in status["videos"]:
+        print(f"\n{video['label']}  ({video['video']})")
+        for a in video["annotators"]:
+            progress = f"{a['progress']:6.1%}" if a["progress"] is not None else "     ?"
+            print(f"  {a['annotator']:20s} {a['marks']:6d} marks  {progress}  {'online' if a['online'] else ''}")
+        for key, f1 in video["agreement"].items():
+            print(f"  agreement {key:20s} {'-' if f1 is None else f'{f1:.3f}'}")
+
+
+async def fetch_status(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(b'{"status":1}\n')
+        await writer.drain()
+        return json.loads(await reader.readline())["status"]
+    finally:
+        writer.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Collect marks from annotators running `video_mark.py --server HOST:PORT`; shows live progress "
+                    "and agreement (also as JSON at http://HOST:PORT/)")
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="Address to listen on (default: this machine only; 0.0.0.0 accepts the stations on "
+                             "the network, without authentication, so only on a trusted network)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--data", default="mark_server_data", help="Directory for the server's batch log")
+    parser.add_argument("--out", default=None, help="Also write each annotator's marks CSVs here (for `merge`)")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Agreement match tolerance (s)")
+    parser.add_argument("--status", action="store_true", help="Print the status of a running server and exit")
+    args = parser.parse_args(argv)
+
+    if args.status:
+        host = "127.0.0.1" if args.host == "0.0.0.0" else args.host
+        try:
+            print_status(asyncio.run(fetch_status(host, args.port)))
+        except (OSError, ValueError) as e:
+            print(f"no server at {host}:{args.port}: {e}")
+            return 1
+        return 0
+
+    server = AggregationServer(args.data, args.out, int(args.tolerance * 1000))
+    try:
+        asyncio.run(server.serve(args.host, args.port,
+                                 ready=lambda s: print(f"listening on {args.host}:{args.port}", flush=True)))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
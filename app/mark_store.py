@@ -0,0 +1,208 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+from itertools import compress
+
+
+class MarkStore:
+    """Marks kept sorted by time in compact, column-wise arrays.
+
+    Each mark is one row across parallel arrays: time (ms), raw VLC time
+    (ms), category id, flags (point/begin/end) and the camera stream it was
+    marked on (0 unless several streams are shown). Marks can arrive in any
+    order (e.g. after seeking backwards); `add` finds the slot by binary
+    search and inserts there, so the store is always in time order and
+    neighbour lookups are O(log n). `undo_last` removes the most recently
+    *added* mark, wherever it sits in time.
+
+    The columns are plain `array.array`s, so they can be handed to
+    `numpy.frombuffer` without copying where NumPy is available.
+    """
+
+    def __init__(self):
+        self._t = array("q")     # mark times (ms), sorted
+        self._raw = array("q")   # raw VLC get_time() (ms) for each mark
+        self._cat = array("H")   # category id
+        self._flags = array("B") # FLAG_POINT / FLAG_BEGIN / FLAG_END
+        self._src = array("B")   # source stream (multi-camera view)
+        self._added = []         # (time, category, flags) in insertion order, for undo
+
+    def __len__(self):
+        return len(self._t)
+
+    def __getitem__(self, i):
+        return self._t[i], self._raw[i], self._cat[i], self._flags[i]
+
+    @property
+    def times(self):
+        """Sorted mark times (ms). Treat as read-only."""
+        return self._t
+
+    @property
+    def raw_times(self):
+        return self._raw
+
+    @property
+    def categories(self):
+        return self._cat
+
+    @property
+    def flags(self):
+        return self._flags
+
+    @property
+    def sources(self):
+        return self._src
+
+    def copy(self):
+        other = MarkStore()
+        other._t = array("q", self._t)
+        other._raw = array("q", self._raw)
+        other._cat = array("H", self._cat)
+        other._flags = array("B", self._flags)
+        other._src = array("B", self._src)
+        other._added = list(self._added)
+        return other
+
+    def add(self, t_ms, raw_ms=0, category=0, flags=0, source=0):
+        """Insert a mark and return its index."""
+        i = bisect_right(self._t, t_ms)
+        self._t.insert(i, t_ms)
+        self._raw.insert(i, raw_ms)
+        self._cat.insert(i, category)
+        self._flags.insert(i, flags)
+        self._src.insert(i, source)
+        self._added.append((t_ms, category, flags))
+        return i
+
+    def index_of(self, t_ms, category=None, flags=None):
+        """Index of a mark at exactly `t_ms` (optionally matching category/flags), or -1."""
+        i = bisect_left(self._t, t_ms)
+        while i < len(self._t) and self._t[i] == t_ms:
+            if (category is None or self._cat[i] == category) and (flags is None or self._flags[i] == flags):
+                return i
+            i += 1
+        return -1
+
+    def nearest_distance(self, t_ms, category=None, within=None):
+        """Distance (ms) from `t_ms` to the closest mark on either side, or None.
+
+        With `category`, only marks of that category count. With `within`,
+        the search stops at that distance (returns None if nothing is closer),
+        which keeps per-category lookups cheap in dense sessions.
+        """
+        n = len(self._t)
+        start = bisect_left(self._t, t_ms)
+        best = None
+        i = start
+        while i < n:
+            d = self._t[i] - t_ms
+            if within is not None and d >= within:
+                break
+            if category is None or self._cat[i] == category:
+                best = d
+                break
+            i += 1
+        j = start - 1
+        while j >= 0:
+            d = t_ms - self._t[j]
+            if (within is not None and d >= within) or (best is not None and d >= best):
+                break
+            if category is None or self._cat[j] == category:
+                best = d
+                break
+            j -= 1
+        return best
+
+    def prev_mark(self, t_ms):
+        """Time of the closest mark strictly before `t_ms`, or None."""
+        i = bisect_left(self._t, t_ms)
+        return self._t[i - 1] if i > 0 else None
+
+    def next_mark(self, t_ms):
+        """Time of the closest mark strictly after `t_ms`, or None."""
+        i = bisect_right(self._t, t_ms)
+        return self._t[i] if i < len(self._t) else None
+
+    def remove_at(self, i):
+        t = self._t[i]
+        del self._t[i]
+        del self._raw[i]
+        del self._cat[i]
+        del self._flags[i]
+        del self._src[i]
+        return t
+
+    def remove(self, t_ms, category=None, flags=None):
+        """Remove one mark at exactly `t_ms`. Returns its former index or -1."""
+        i = self.index_of(t_ms, category, flags)
+        if i >= 0:
+            self.remove_at(i)
+        return i
+
+    def move(self, i, t_ms):
+        """Change the time of mark `i`, keeping the store sorted. Returns its new index."""
+        old = self._t[i]
+        cat, flags = self._cat[i], self._flags[i]
+        n = len(self._t)
+        if (i == 0 or self._t[i - 1] <= t_ms) and (i == n - 1 or t_ms <= self._t[i + 1]):
+            self._t[i] = t_ms  # order unchanged: update in place
+            j = i
+        else:
+            raw, src = self._raw[i], self._src[i]
+            self.remove_at(i)
+            j = bisect_right(self._t, t_ms)
+            self._t.insert(j, t_ms)
+            self._raw.insert(j, raw)
+            self._cat.insert(j, cat)
+            self._flags.insert(j, flags)
+            self._src.insert(j, src)
+        # Keep undo pointing at the moved mark
+        for k in range(len(self._added) - 1, -1, -1):
+            if self._added[k] == (old, cat, flags):
+                self._added[k] = (t_ms, cat, flags)
+                break
+        return j
+
+    def delete_range(self, start_ms, end_ms):
+        """Remove all marks with start_ms <= t <= end_ms. Returns how many were removed."""
+        i = bisect_left(self._t, start_ms)
+        j = bisect_right(self._t, end_ms)
+        for column in (self._t, self._raw, self._cat, self._flags, self._src):
+            del column[i:j]
+        return j - i
+
+    def undo_last(self):
+        """Remove the most recently added mark still present. Returns its former index or -1."""
+        while self._added:
+            i = self.remove(*self._added.pop())
+            if i >= 0:
+                return i
+        return -1
+
+    def in_added_order(self):
+        """[(time, raw, category, flags, source)] of the marks, oldest addition first.
+
+        Adding them to a new store in this order reproduces what `undo_last`
+        would remove next (marks missing from the undo history come first).
+        """
+        slots = defaultdict(list)
+        for i, key in enumerate(zip(self._t, self._cat, self._flags)):
+            slots[key].append(i)
+        # Newest first, so an entry left over from a mark that was since removed doesn't claim a slot
+        order = [slots[key].pop() for key in reversed(self._added) if slots.get(key)][::-1]
+        taken = set(order)
+        order = [i for i in range(len(self._t)) if i not in taken] + order
+        return [(self._t[i], self._raw[i], self._cat[i], self._flags[i], self._src[i]) for i in order]
+
+    def clear(self):
+        self.__init__()
+
+    # --- Column queries ---
+    def count_by_category(self):
+        """{category id: number of marks}."""
+        return Counter(self._cat)
+
+    def times_for(self, category):
+        """Sorted times (ms) of one category's marks, as an array."""
+        return array("q", compress(self._t, [c == category for c in self._cat]))
@@ -0,0 +1,118 @@
+import tkinter as tk
+
+
+class VirtualMarkList(tk.Frame):
+    """Listbox that only holds the rows currently visible.
+
+    The listbox always contains at most `rows` entries, filled from
+    `get_row(i)` for the visible window of a much larger sequence of
+    `count()` items; the scrollbar is driven from that window. Adding a mark
+    therefore costs one refresh of the visible rows regardless of how many
+    marks exist.
+    """
+
+    def __init__(self, master, count, get_row, rows=20, width=18, on_activate=None):
+        super().__init__(master)
+        self.count = count
+        self.get_row = get_row
+        self.rows = rows
+        self.on_activate = on_activate   # called with the absolute index on double-click
+        self.first = 0                   # absolute index of the top row
+        self._selected = None            # absolute index of the selected row
+
+        self.listbox = tk.Listbox(self, width=width, height=rows, activestyle="none",
+                                  exportselection=False, selectmode=tk.EXTENDED)
+        self.scrollbar = tk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.listbox.pack(side=tk.LEFT, fill=tk.Y)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.listbox.bind("<MouseWheel>", self._on_wheel)
+        self.listbox.bind("<Button-4>", lambda e: self.scroll_by(-3))
+        self.listbox.bind("<Button-5>", lambda e: self.scroll_by(3))
+        self.listbox.bind("<<ListboxSelect>>", self._on_select)
+        self.listbox.bind("<Double-Button-1>", self._on_double_click)
+        # Keep Up/Down working past the edges of the visible window
+        self.listbox.bind("<Up>", lambda e: self._move_selection(-1))
+        self.listbox.bind("<Down>", lambda e: self._move_selection(1))
+
+    # --- Window management ---
+    def _max_first(self):
+        return max(0, self.count() - self.rows)
+
+    def scroll_to(self, first):
+        self.first = min(max(0, int(first)), self._max_first())
+        self.refresh()
+
+    def scroll_by(self, delta):
+        self.scroll_to(self.first + delta)
+        return "break"
+
+    def see(self, index):
+        """Scroll so that `index` is visible."""
+        if index < self.first:
+            self.scroll_to(index)
+        elif index >= self.first + self.rows:
+            self.scroll_to(index - self.rows + 1)
+        else:
+            self.refresh()
+
+    def refresh(self):
+        """Re-render the visible rows (O(rows))."""
+        n = self.count()
+        self.first = min(self.first, self._max_first())
+        last = min(n, self.first + self.rows)
+        self.listbox.delete(0, tk.END)
+        if last > self.first:
+            self.listbox.insert(tk.END, *(self.get_row(i) for i in range(self.first, last)))
+        if self._selected is not None and self.first <= self._selected < last:
+            self.listbox.selection_set(self._selected - self.first)
+        if n:
+            self.scrollbar.set(self.first / n, last / n)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _on_scrollbar(self, *args):
+        if args[0] == "moveto":
+            self.scroll_to(float(args[1]) * self.count())
+        elif args[0] == "scroll":
+            step = self.rows if args[2] == "pages" else 1
+            self.scroll_by(int(args[1]) * step)
+
+    def _on_wheel(self, event):
+        return self.scroll_by(-3 if event.delta > 0 else 3)
+
+    # --- Selection ---
+    def select(self, index):
+        self._selected = index
+        self.see(index)
+
+    def clear_selection(self):
+        self._selected = None
+        self.listbox.selection_clear(0, tk.END)
+        self.refresh()
+
+    def selected_range(self):
+        """(first, last) absolute indices of the selected rows, or None."""
+        sel = self.listbox.curselection()
+        if not sel:
+            return None
+        return self.first + sel[0], self.first + sel[-1]
+
+    def _on_select(self, event=None):
+        sel = self.listbox.curselection()
+        self._selected = self.first + sel[0] if sel else None
+
+    def _move_selection(self, delta):
+        n = self.count()
+        if not n:
+            return "break"
+        current = self._selected if self._selected is not None else self.first
+        self.select(min(max(0, current + delta), n - 1))
+        return "break"
+
+    def _on_double_click(self, event):
+        row = self.listbox.nearest(event.y)
+        index = self.first + row
+        if self.on_activate is not None and index < self.count():
+            self.on_activate(index)
+        return "break"
@@ -0,0 +1,135 @@
+from categories import FLAG_BEGIN, FLAG_END, FLAG_POINT
+from mark_journal import OP_ADD, OP_DELETE, OP_DELETE_RANGE, OP_MOVE, OP_UNDO
+from mark_store import MarkStore
+
+# A key release followed by a press of the same key within this window is
+# keyboard auto-repeat (X11 sends release+press pairs while a key is held)
+REPEAT_WINDOW_NS = 30_000_000
+
+
+class MarkingEngine:
+    """The marking rules, independent of Tk and VLC.
+
+    Turns key presses/releases (with the media time they happened at) into
+    marks: per-category debounce, interval begin/end with auto-repeat
+    filtering, undo, delete and move. The app drives it live; the input-log
+    replay drives it from a recording. Every change to `marks` is reported
+    as a journal op through `on_op(op, time_ms, arg_ms, category, flags)`.
+    """
+
+    def __init__(self, categories, marks=None, on_op=None):
+        self.categories = categories
+        self.by_key = {c.key: c for c in categories}
+        self.marks = marks if marks is not None else MarkStore()
+        self.on_op = on_op
+        self.source = 0          # stream new marks are attributed to (multi-camera view)
+        self._held = set()       # interval keys currently held down
+        self._pending = {}       # key -> (release_ns, stamp) of a not-yet-confirmed release
+        self._open = {}          # category id -> begin time of an interval in progress
+
+    def reset(self, marks=None):
+        """Start over with `marks` (a new, empty store by default), e.g. for a new clip."""
+        self.marks = marks if marks is not None else MarkStore()
+        self._held.clear()
+        self._pending.clear()
+        self._open.clear()
+
+    def _emit(self, op, time_ms=0, arg_ms=0, category=0, flags=0, source=0):
+        if self.on_op is not None:
+            self.on_op(op, time_ms, arg_ms, category, flags, source)
+
+    def mark(self, category, flags, stamp):
+        """Add a mark at `stamp` = (t_ms, raw_ms). Returns its index, or -1 if debounced."""
+        t_ms, raw_ms = stamp
+        # Debounce per category against the nearest mark on either side
+        # (marks may be out of order after a seek). Interval ends always count.
+        if flags != FLAG_END and self.marks.nearest_distance(
+                t_ms, category.cid, within=category.debounce_ms) is not None:
+            return -1
+        if flags == FLAG_BEGIN:
+            self._open[category.cid] = t_ms
+        elif flags == FLAG_END:
+            self._open.pop(category.cid, None)
+        i = self.marks.add(t_ms, raw_ms, category.cid, flags, self.source)
+        self._emit(OP_ADD, t_ms, raw_ms, category.cid, flags, self.source)
+        return i
+
+    def press(self, key, stamp, now_ns):
+        """A category key went down. Returns (category, flags, index) or None if it was ignored."""
+        category = self.by_key.get(key)
+        if category is None:
+            return None
+        if not category.interval:
+            return category, FLAG_POINT, self.mark(category, FLAG_POINT, stamp)
+        pending = self._pending.get(key)
+        if pending is not None:
+            if now_ns - pending[0] <= REPEAT_WINDOW_NS:
+                # Auto-repeat: the key never really went up
+                del self._pending[key]
+                return None
+            self.commit_release(key, pending[0])
+        if key in self._held:
+            # Auto-repeat without releases (Windows/macOS)
+            return None
+        self._held.add(key)
+        return category, FLAG_BEGIN, self.mark(category, FLAG_BEGIN, stamp)
+
+    def release(self, key, stamp, now_ns):
+        """An interval key went up. The release is stamped now but only takes effect
+        once `commit_release` confirms it; returns True if such a confirmation is due."""
+        category = self.by_key.get(key)
+        if category is None or not category.interval:
+            return False
+        self._pending[key] = (now_ns, stamp)
+        return True
+
+    def commit_release(self, key, release_ns):
+        """Confirm the release of `key` recorded at `release_ns` (no-op if a press cancelled it).
+
+        Returns (category, flags, index) if an interval end was marked, else None.
+        """
+        pending = self._pending.get(key)
+        if pending is None or pending[0] != release_ns:
+            return None
+        del self._pending[key]
+        self._held.discard(key)
+        category = self.by_key[key]
+        if category.cid not in self._open:
+            return None
+        return category, FLAG_END, self.mark(category, FLAG_END, pending[1])
+
+    def commit_due(self, now_ns):
+        """Confirm every pending release older than the auto-repeat window."""
+        for key, (release_ns, _) in list(self._pending.items()):
+            if now_ns - release_ns > REPEAT_WINDOW_NS:
+                self.commit_release(key, release_ns)
+
+    def undo(self):
+        """Remove the most recently added mark; returns its former index or -1."""
+        i = self.marks.undo_last()
+        if i >= 0:
+            self._emit(OP_UNDO)
+        return i
+
+    def delete_one(self, t_ms, category, flags):
+        i = self.marks.index_of(t_ms, category, flags)
+        if i < 0:
+            return 0
+        self.marks.remove_at(i)
+        self._emit(OP_DELETE, t_ms, category=category, flags=flags)
+        return 1
+
+    def delete_range(self, start_ms, end_ms):
+        removed = self.marks.delete_range(start_ms, end_ms)
+        if removed:
+            self._emit(OP_DELETE_RANGE, start_ms, end_ms)
+        return removed
+
+    def move(self, t_ms, category, flags, new_ms):
+        """Move a mark to `new_ms`; returns its new index or -1 if there is no such mark."""
+        i = self.marks.index_of(t_ms, category, flags)
+        if i < 0:
+            return -1
+        j = self.marks.move(i, new_ms)
+        self._emit(OP_MOVE, t_ms, new_ms, category, flags)
+        return j
@@ -0,0 +1,152 @@
+import random
+import time
+
+
+class MediaClock:
+    """High-resolution playback clock interpolated between player time updates.
+
+    libVLC only refreshes `get_time()` every few hundred milliseconds on many
+    codecs. Each time the reported value changes we remember it together with
+    `time.monotonic_ns()`, and in between we extrapolate by the playback rate.
+    Call `reset()` on seek, pause/play and rate changes.
+
+    `sample` may be called from a player event thread: the anchor is replaced
+    as a single tuple so readers never see a time from one update paired with
+    the timestamp of another.
+    """
+
+    def __init__(self, max_extrapolation_ms=1000, clock_ns=time.monotonic_ns):
+        self.max_extrapolation_ms = max_extrapolation_ms
+        self.clock_ns = clock_ns
+        self.rate = 1.0
+        self.playing = False
+        self.reset()
+
+    def reset(self):
+        self._anchor = None      # (last raw player time that changed, monotonic ns when observed)
+        self._last_out_ms = 0.0  # keeps the interpolated output non-decreasing
+
+    @property
+    def ready(self):
+        """True once a player time has been sampled since the last reset."""
+        return self._anchor is not None
+
+    def set_playing(self, playing):
+        self.playing = playing
+        self.reset()
+
+    def set_rate(self, rate):
+        self.rate = rate
+        self.reset()
+
+    def sample(self, raw_ms, now_ns=None):
+        """Feed a raw player time (ms). Only changes of the value move the anchor."""
+        if raw_ms is None or raw_ms < 0:
+            return
+        anchor = self._anchor
+        if anchor is None or raw_ms != anchor[0]:
+            self._anchor = (raw_ms, self.clock_ns() if now_ns is None else now_ns)
+
+    def now_ms(self, now_ns=None):
+        """Best estimate of the current media time in (fractional) milliseconds."""
+        anchor = self._anchor
+        if anchor is None:
+            return 0.0
+        anchor_ms, anchor_ns = anchor
+        if not self.playing:
+            return float(anchor_ms)
+        if now_ns is None:
+            now_ns = self.clock_ns()
+        elapsed = (now_ns - anchor_ns) / 1e6 * self.rate
+        # Don't run away if the player stalls (buffering, end of file)
+        elapsed = min(max(elapsed, 0.0), self.max_extrapolation_ms)
+        t = max(anchor_ms + elapsed, self._last_out_ms)
+        self._last_out_ms = t
+        return t
+
+
+class SimulatedPlayer:
+    """Player stand-in whose `get_time()` advances in steps, like libVLC.
+
+    The true media position advances continuously with the (virtual) clock,
+    but the reported time only refreshes every `update_period_ms`, with some
+    jitter on when each refresh lands.
+    """
+
+    def __init__(self, clock_ns, update_period_ms=250, jitter_ms=40, rate=1.0, seed=0):
+        self.clock_ns = clock_ns
+        self.update_period_ms = update_period_ms
+        self.jitter_ms = jitter_ms
+        self.rate = rate
+        self._rng = random.Random(seed)
+        self._start_ns = clock_ns()
+        self._reported_ms = 0
+        self._next_update_ms = self._next_period(0)
+
+    def _next_period(self, after_ms):
+        return after_ms + self.update_period_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+
+    def true_time_ms(self):
+        return (self.clock_ns() - self._start_ns) / 1e6 * self.rate
+
+    def get_time(self):
+        t = self.true_time_ms()
+        while t >= self._next_update_ms:
+            self._reported_ms = int(self._next_update_ms)
+            self._next_update_ms = self._next_period(self._next_update_ms)
+        return self._reported_ms
+
+
+def measure_timestamp_error(duration_s=600, marks=2000, poll_ms=15, update_period_ms=250,
+                            jitter_ms=40, seed=0):
+    """Simulate a session and compare raw vs interpolated mark timestamps.
+
+    Runs on a virtual clock (no sleeping). The clock is sampled every
+    `poll_ms`; with player TimeChanged events the sample lands as soon as the
+    value changes, which behaves like a very small `poll_ms`. Marks land at
+    random times.
+    Returns mean/p95/max absolute error in ms for both, and how many marks
+    shared a timestamp with the previous mark (what the old debounce ate).
+    """
+    rng = random.Random(seed)
+    now = [0]
+    player = SimulatedPlayer(lambda: now[0], update_period_ms, jitter_ms, seed=seed)
+    clock = MediaClock(clock_ns=lambda: now[0])
+    clock.set_playing(True)
+
+    mark_times = sorted(rng.uniform(0, duration_s * 1000) for _ in range(marks))
+    errors = {"raw": [], "interpolated": []}
+    repeats = {"raw": 0, "interpolated": 0}
+    last = {"raw": None, "interpolated": None}
+    next_poll_ms = 0.0
+    for mark_ms in mark_times:
+        while next_poll_ms < mark_ms:
+            now[0] = int(next_poll_ms * 1e6)
+            clock.sample(player.get_time())
+            next_poll_ms += poll_ms
+        now[0] = int(mark_ms * 1e6)
+        raw = player.get_time()
+        clock.sample(raw)
+        stamps = {"raw": float(raw), "interpolated": clock.now_ms()}
+        for kind, value in stamps.items():
+            errors[kind].append(abs(value - mark_ms))
+            if last[kind] is not None and value == last[kind]:
+                repeats[kind] += 1
+            last[kind] = value
+
+    result = {}
+    for kind, errs in errors.items():
+        errs.sort()
+        result[kind] = {
+            "mean_ms": sum(errs) / len(errs),
+            "p95_ms": errs[int(0.95 * (len(errs) - 1))],
+            "max_ms": errs[-1],
+            "repeated_stamps": repeats[kind],
+        }
+    return result
+
+
+if __name__ == "__main__":
+    for kind, stats in measure_timestamp_error().items():
+        print(f"{kind:>12}: mean {stats['mean_ms']:7.2f} ms  p95 {stats['p95_ms']:7.2f} ms  "
+              f"max {stats['max_ms']:7.2f} ms  repeated {stats['repeated_stamps']}")
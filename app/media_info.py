@@ -0,0 +1,60 @@
+import json
+import os
+import tempfile
+from collections import namedtuple
+
+# Static facts about a video file, filled from libVLC's media parser
+MediaInfo = namedtuple("MediaInfo", ["duration_ms", "fps", "frame_count", "width", "height", "codec"])
+
+
+def format_media_info(info):
+    """Short human-readable summary, e.g. '1920x1080  29.97 fps  H264'."""
+    parts = []
+    if info.width and info.height:
+        parts.append(f"{info.width}x{info.height}")
+    if info.fps:
+        parts.append(f"{info.fps:.2f} fps")
+    if info.codec:
+        parts.append(info.codec)
+    return "  ".join(parts)
+
+
+def _fourcc(code):
+    return "".join(chr((code >> (8 * i)) & 0xFF) for i in range(4)).strip().upper()
+
+
+def media_info_from_vlc(vlc, media):
+    """Build a MediaInfo from a parsed `vlc.Media` (None if it has no video track)."""
+    duration_ms = max(0, media.get_duration() or 0)
+    for track in media.tracks_get() or ():
+        if track.type != vlc.TrackType.video:
+            continue
+        video = track.video.contents
+        fps = video.frame_rate_num / video.frame_rate_den if video.frame_rate_den else 0.0
+        return MediaInfo(
+            duration_ms=duration_ms,
+            fps=fps,
+            frame_count=int(round(duration_ms * fps / 1000.0)) if fps else 0,
+            width=video.width,
+            height=video.height,
+            codec=_fourcc(track.codec),
+        )
+    return None
+
+
+def load_cached_media_info(path):
+    """Read a MediaInfo stored with `store_media_info`, or None."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return MediaInfo(**json.load(f))
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def store_media_info(path, info):
+    outdir = os.path.dirname(path) or "."
+    os.makedirs(outdir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".info_", suffix=".tmp", dir=outdir)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(info._asdict(), f)
+    os.replace(tmp_path, path)
@@ -0,0 +1,173 @@
+import json
+import os
+import tempfile
+
+from media_clock import MediaClock
+
+
+class Stream:
+    """One extra camera angle of the main video.
+
+    The stream shows master time t at its own time t + `offset_ms` (a
+    positive offset means this camera started recording earlier).
+    """
+
+    def __init__(self, sid, path, offset_ms=None):
+        self.sid = sid                # 1.. (0 is the main video)
+        self.path = path
+        self.name = os.path.basename(path)
+        self.offset_ms = offset_ms    # None = not given; taken from the calibration cache
+        self.fingerprint = None
+        self.player = None
+        self.clock = MediaClock()     # interpolated time of this stream's player
+        self.rate = 1.0
+        self.started = False          # play() called at least once
+        self.running = False          # currently playing
+
+    def on_event(self, kind, value):
+        # Backend event thread
+        if kind == "time":
+            self.clock.sample(value)
+
+
+def parse_stream_arg(value):
+    """'PATH' or 'PATH@OFFSET_MS' -> (path, offset_ms or None)."""
+    path, sep, offset = value.rpartition("@")
+    if sep:
+        try:
+            return path, int(offset)
+        except ValueError:
+            pass
+    return value, None
+
+
+def load_offsets(path):
+    """Calibrated offsets {stream fingerprint: ms} stored for a main video, or {}."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return {k: int(v) for k, v in json.load(f).items()}
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+
+def store_offsets(path, offsets):
+    outdir = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(prefix=".offsets_", suffix=".tmp", dir=outdir)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(offsets, f)
+    os.replace(tmp_path, path)
+
+
+class SyncGroup:
+    """Keeps the players of extra camera streams on the main video's timeline.
+
+    Play, pause and seeks of the main player are mirrored right away. While
+    playing, every `check_ms` each stream's interpolated clock is compared
+    with the master clock (`get_master_ms()`): drift above `tolerance_ms`
+    is absorbed by running that stream slightly faster or slower for the
+    next interval (no visible jump); drift above `hard_ms`, e.g. after a
+    decoding stall, is fixed with a seek. Streams are loaded in the
+    backend's light mode (no audio, cheaper decoding) with `threads`
+    decoder threads each, so several HD streams share the CPU.
+    """
+
+    def __init__(self, master, get_master_ms, backend, drift_histogram=None, check_ms=500,
+                 tolerance_ms=20, hard_ms=250, max_rate_change=0.05):
+        self.master = master
+        self.get_master_ms = get_master_ms
+        self.backend = backend
+        self.drift_histogram = drift_histogram
+        self.check_ms = check_ms
+        self.tolerance_ms = tolerance_ms
+        self.hard_ms = hard_ms
+        self.max_rate_change = max_rate_change
+        self.streams = []
+        self.seeks = 0                # hard re-syncs
+        self.rate_nudges = 0          # soft (rate) corrections
+        self._after_id = None
+
+    def add(self, stream, window_id, threads=0):
+        stream.player = self.backend.new_player(stream.on_event)
+        stream.player.embed(window_id)
+        stream.player.load(stream.path, light=True, threads=threads, fingerprint=stream.fingerprint)
+        stream.player.set_mute(True)
+        self.streams.append(stream)
+
+    # --- Mirroring the main player ---
+    def play(self, master_ms):
+        for s in self.streams:
+            self._place(s, master_ms, True)
+        if self._after_id is None:
+            self._after_id = self.master.after(self.check_ms, self._check)
+
+    def pause(self, master_ms):
+        if self._after_id is None and not any(s.running for s in self.streams):
+            return  # already paused (e.g. the player's Paused event after pause())
+        self._stop_checks()
+        for s in self.streams:
+            self._place(s, master_ms, False)
+
+    def seek(self, master_ms, playing):
+        for s in self.streams:
+            self._place(s, master_ms, playing)
+
+    def stop(self):
+        self._stop_checks()
+        for s in self.streams:
+            try:
+                s.player.stop()
+            except Exception:
+                pass
+
+    def _stop_checks(self):
+        if self._after_id is not None:
+            self.master.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _place(self, s, master_ms, playing):
+        """Put stream `s` where master time `master_ms` is, playing or paused."""
+        target = master_ms + s.offset_ms
+        # Before this camera started recording: hold its first frame until then
+        run = playing and target >= 0
+        if run and not s.started:
+            s.player.play()
+            s.started = True
+        elif run != s.running and s.started:
+            s.player.set_pause(not run)
+        s.running = run
+        s.clock.set_playing(run)
+        if s.rate != 1.0:
+            self._set_rate(s, 1.0)
+        target = int(max(0, target))
+        s.player.set_time(target)
+        s.clock.sample(target)
+
+    def _set_rate(self, s, rate):
+        s.rate = rate
+        s.player.set_rate(rate)
+        s.clock.set_rate(rate)
+
+    # --- Drift correction ---
+    def _check(self):
+        self._after_id = self.master.after(self.check_ms, self._check)
+        master_ms = self.get_master_ms()
+        for s in self.streams:
+            target = master_ms + s.offset_ms
+            if (target >= 0) != s.running:
+                self._place(s, master_ms, True)
+                continue
+            if not s.running or not s.clock.ready:
+                continue
+            drift = s.clock.now_ms() - target
+            if self.drift_histogram is not None:
+                self.drift_histogram.record(abs(drift) * 1000.0)
+            if abs(drift) > self.hard_ms:
+                self.seeks += 1
+                self._place(s, master_ms, True)
+            elif abs(drift) > self.tolerance_ms:
+                # Run ahead/behind just enough to cancel the drift by the next check
+                change = max(-self.max_rate_change, min(self.max_rate_change, -drift / self.check_ms))
+                self.rate_nudges += 1
+                self._set_rate(s, 1.0 + change)
+            elif s.rate != 1.0:
+                self._set_rate(s, 1.0)
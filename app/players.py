@@ -0,0 +1,359 @@
+import os
+import random
+import sys
+import threading
+import time
+
+from media_info import MediaInfo, media_info_from_vlc
+
+try:
+    import vlc  # python-vlc
+except (ImportError, OSError):
+    # OSError: python-vlc is installed but libVLC itself can't be loaded
+    vlc = None
+
+
+class PlayerUnavailable(RuntimeError):
+    """The requested player backend can't run on this machine."""
+
+
+# Player interface (implemented by VlcPlayer and SimulatedPlayer):
+#   load(path, start_paused=False, light=False, threads=0, start_ms=0, fingerprint=None)
+#                                   set the media; start_paused holds on the first frame after play().
+#                                   light: no audio and cheaper decoding (extra camera streams);
+#                                   threads: cap on decoder threads (0 = decoder's choice);
+#                                   start_ms: where play() starts (reopening a video at the same spot);
+#                                   fingerprint: the video's content fingerprint if the caller has it
+#   preparse()                      start demuxing/parsing the loaded media (any thread)
+#   request_media_info(callback)    callback(MediaInfo) once the loaded media is parsed (any thread)
+#   embed(window_id)                render into a native window
+#   play() / pause() / set_pause(paused) / stop()
+#   get_time() / get_length() / set_time(ms) / next_frame() / set_mute(muted) / set_rate(rate)
+#   stats()                         {"decoded", "displayed", "lost"} frame counters of the media, or None
+# Player events are delivered by calling on_event(kind, value) from a backend
+# thread: ("time", ms), ("length", ms), ("state", "playing"|"paused"|"stopped"|"ended").
+
+
+def profile_options(profile):
+    """libVLC instance options of a performance profile.
+
+    default  libVLC's own choices.
+    low-cpu  skip the H.264/HEVC in-loop deblocking filter (the biggest cheap
+             saving, barely visible at panel size), allow fast non-spec-exact
+             decoding, fast bilinear output scaling, a larger file cache, and
+             one core left to the UI.
+    minimal  low-cpu, plus decoding at half resolution where the codec
+             supports it (MPEG-2/4, MJPEG; H.264 ignores it) and skipped IDCT
+             on non-reference frames.
+    """
+    if profile == "default":
+        return []
+    options = [
+        "--avcodec-skiploopfilter=4",
+        "--avcodec-fast",
+        f"--avcodec-threads={max(1, (os.cpu_count() or 2) - 1)}",
+        "--swscale-mode=0",
+        "--file-caching=1500",
+        "--no-video-title-show",
+        "--no-sub-autodetect-file",
+    ]
+    if profile == "minimal":
+        options += ["--avcodec-lowres=1", "--avcodec-skip-idct=1"]
+    elif profile != "low-cpu":
+        raise ValueError(f"Unknown profile: {profile}")
+    return options
+
+
+PROFILES = ("default", "low-cpu", "minimal")
+
+
+class VlcBackend:
+    """Players backed by libVLC (python-vlc)."""
+
+    name = "vlc"
+
+    def __init__(self, profile="default"):
+        if vlc is None:
+            raise PlayerUnavailable("Missing dependency: python-vlc. Install with `pip install python-vlc`.")
+        self.profile = profile
+        self.options = profile_options(profile)
+        self.instance = None  # created with the first player; loading plugins takes a while
+
+    def new_player(self, on_event):
+        if self.instance is None:
+            self.instance = vlc.Instance(self.options)
+        return VlcPlayer(self.instance, on_event)
+
+
+class VlcPlayer:
+    def __init__(self, instance, on_event):
+        self._instance = instance
+        self._player = instance.media_player_new()
+        self._media = None
+        self._on_event = on_event
+        em = self._player.event_manager()
+        for event_type in (
+            vlc.EventType.MediaPlayerTimeChanged,
+            vlc.EventType.MediaPlayerLengthChanged,
+            vlc.EventType.MediaPlayerPlaying,
+            vlc.EventType.MediaPlayerPaused,
+            vlc.EventType.MediaPlayerStopped,
+            vlc.EventType.MediaPlayerEndReached,
+        ):
+            em.event_attach(event_type, self._on_vlc_event)
+
+    def _on_vlc_event(self, event):
+        # Runs on libVLC's event thread
+        t = event.type
+        if t == vlc.EventType.MediaPlayerTimeChanged:
+            self._on_event("time", event.u.new_time)
+        elif t == vlc.EventType.MediaPlayerLengthChanged:
+            self._on_event("length", event.u.new_length)
+        elif t == vlc.EventType.MediaPlayerPlaying:
+            self._on_event("state", "playing")
+        elif t == vlc.EventType.MediaPlayerPaused:
+            self._on_event("state", "paused")
+        elif t == vlc.EventType.MediaPlayerStopped:
+            self._on_event("state", "stopped")
+        elif t == vlc.EventType.MediaPlayerEndReached:
+            self._on_event("state", "ended")
+
+    def embed(self, window_id):
+        if sys.platform.startswith('win'):
+            self._player.set_hwnd(window_id)
+        elif sys.platform == "darwin":
+            self._player.set_nsobject(window_id)
+        else:
+            self._player.set_xwindow(window_id)
+
+    def load(self, path, start_paused=False, light=False, threads=0, start_ms=0, fingerprint=None):
+        media = self._instance.media_new(path)
+        if start_ms > 0:
+            media.add_option(f":start-time={start_ms / 1000.0:.3f}")
+        if start_paused:
+            # Demux and decode the first frame on play(), then hold there
+            media.add_option(":start-paused")
+        if light:
+            # Skipping the H.264/HEVC in-loop deblocking filter is the biggest cheap CPU
+            # saving; its artefacts don't show at the size of a grid cell
+            media.add_option(":no-audio")
+            media.add_option(":avcodec-skiploopfilter=4")
+        if threads:
+            media.add_option(f":avcodec-threads={threads}")
+        self._media = media
+        self._player.set_media(media)
+
+    def preparse(self):
+        if self._media is not None:
+            self._media.parse_with_options(vlc.MediaParseFlag.local, -1)
+
+    def request_media_info(self, callback):
+        media = self._media
+        if media is None:
+            return
+
+        def on_parsed(event=None):
+            # Usually runs on libVLC's event thread
+            if media is not self._media or media.get_parsed_status() != vlc.MediaParsedStatus.done:
+                return
+            info = media_info_from_vlc(vlc, media)
+            if info is not None:
+                callback(info)
+
+        # Attach before checking the status so a parse finishing in between isn't missed
+        media.event_manager().event_attach(vlc.EventType.MediaParsedChanged, on_parsed)
+        if media.get_parsed_status() == vlc.MediaParsedStatus.done:
+            on_parsed()
+        else:
+            media.parse_with_options(vlc.MediaParseFlag.local, 10000)
+
+    def play(self):
+        self._player.play()
+
+    def pause(self):
+        self._player.pause()
+
+    def set_pause(self, paused):
+        self._player.set_pause(1 if paused else 0)
+
+    def stop(self):
+        self._player.stop()
+
+    def get_time(self):
+        return self._player.get_time()
+
+    def get_length(self):
+        return self._player.get_length()
+
+    def set_time(self, ms):
+        self._player.set_time(ms)
+
+    def next_frame(self):
+        self._player.next_frame()
+
+    def set_mute(self, muted):
+        self._player.audio_set_mute(muted)
+
+    def set_rate(self, rate):
+        self._player.set_rate(rate)
+
+    def stats(self):
+        media = self._media
+        if media is None:
+            return None
+        st = vlc.MediaStats()
+        if not media.get_stats(st):
+            return None
+        return {"decoded": st.decoded_video, "displayed": st.displayed_pictures,
+                "lost": getattr(st, "lost_pictures", 0)}
+
+
+class SimulatedBackend:
+    """Players that only run a clock: no decoding, no window, no libVLC.
+
+    Time advances with the real monotonic clock but, like libVLC, is only
+    reported every `update_period_ms` (with jitter), so the app's clock
+    interpolation, event pump and marking run exactly as with a real video.
+    Used for benchmarks and for running the app without VLC installed.
+    """
+
+    name = "sim"
+    profile = "default"
+
+    def __init__(self, duration_ms=600_000, fps=30.0, update_period_ms=250, jitter_ms=40, seed=0):
+        self.duration_ms = duration_ms
+        self.fps = fps
+        self.update_period_ms = update_period_ms
+        self.jitter_ms = jitter_ms
+        self._rng = random.Random(seed)
+
+    def new_player(self, on_event):
+        return SimulatedPlayer(self, on_event, self._rng.randrange(1 << 30))
+
+
+class SimulatedPlayer:
+    def __init__(self, backend, on_event, seed):
+        self.backend = backend
+        self._on_event = on_event
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._path = None
+        self._start_paused = False
+        self._playing = False
+        self._rate = 1.0
+        self._base_ms = 0.0        # media time at _base_ns
+        self._base_ns = time.monotonic_ns()
+        self._reported_ms = 0
+        self._thread = threading.Thread(target=self._run, name="sim-player", daemon=True)
+        self._thread.start()
+
+    def _position_ms(self, now_ns=None):
+        if not self._playing:
+            return self._base_ms
+        now_ns = time.monotonic_ns() if now_ns is None else now_ns
+        return min(self._base_ms + (now_ns - self._base_ns) / 1e6 * self._rate, self.backend.duration_ms)
+
+    def _set_position(self, ms):
+        self._base_ms = max(0.0, min(float(ms), self.backend.duration_ms))
+        self._base_ns = time.monotonic_ns()
+        self._reported_ms = int(self._base_ms)
+
+    def _run(self):
+        while True:
+            b = self.backend
+            period = b.update_period_ms + self._rng.uniform(-b.jitter_ms, b.jitter_ms)
+            self._wake.wait(max(0.001, period / 1000.0))
+            self._wake.clear()
+            with self._lock:
+                if not self._playing:
+                    continue
+                self._reported_ms = int(self._position_ms())
+                ended = self._reported_ms >= b.duration_ms
+                if ended:
+                    self._set_position(b.duration_ms)
+                    self._playing = False
+            self._on_event("time", self._reported_ms)
+            if ended:
+                self._on_event("state", "ended")
+
+    def embed(self, window_id):
+        pass
+
+    def load(self, path, start_paused=False, light=False, threads=0, start_ms=0, fingerprint=None):
+        with self._lock:
+            self._path = path
+            self._start_paused = start_paused
+            self._playing = False
+            self._set_position(max(0, start_ms))
+
+    def preparse(self):
+        pass
+
+    def request_media_info(self, callback):
+        b = self.backend
+        if self._path is not None:
+            callback(MediaInfo(duration_ms=b.duration_ms, fps=b.fps,
+                               frame_count=int(round(b.duration_ms * b.fps / 1000.0)),
+                               width=1280, height=720, codec="SIM"))
+
+    def play(self):
+        with self._lock:
+            if self._path is None:
+                return
+            start_paused, self._start_paused = self._start_paused, False
+            position = self._position_ms()
+            self._set_position(0 if position >= self.backend.duration_ms else position)
+            self._playing = not start_paused
+        self._on_event("length", self.backend.duration_ms)
+        self._on_event("state", "paused" if start_paused else "playing")
+        self._wake.set()
+
+    def set_pause(self, paused):
+        with self._lock:
+            if paused == (not self._playing):
+                return
+            self._set_position(self._position_ms())
+            self._playing = not paused
+        self._on_event("state", "paused" if paused else "playing")
+
+    def pause(self):
+        # libVLC's pause() toggles
+        self.set_pause(self._playing)
+
+    def stop(self):
+        with self._lock:
+            self._playing = False
+            self._set_position(0)
+        self._on_event("state", "stopped")
+
+    def get_time(self):
+        return self._reported_ms if self._path is not None else -1
+
+    def get_length(self):
+        return self.backend.duration_ms if self._path is not None else 0
+
+    def set_time(self, ms):
+        with self._lock:
+            self._set_position(ms)
+        self._on_event("time", self._reported_ms)
+
+    def next_frame(self):
+        with self._lock:
+            self._set_position(self._position_ms() + 1000.0 / self.backend.fps)
+            self._playing = False
+        self._on_event("time", self._reported_ms)
+
+    def set_mute(self, muted):
+        pass
+
+    def set_rate(self, rate):
+        with self._lock:
+            self._set_position(self._position_ms())
+            self._rate = rate
+
+    def stats(self):
+        return None  # nothing is decoded
+
+
+BACKENDS = {"vlc": VlcBackend, "sim": SimulatedBackend}
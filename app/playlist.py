@@ -0,0 +1,66 @@
+import os
+
+VIDEO_EXTENSIONS = {
+    ".mp4", ".m4v", ".mov", ".avi", ".mkv", ".mpg", ".mpeg", ".wmv", ".webm", ".flv", ".ts", ".mts", ".m2ts",
+}
+
+
+def collect_playlist(source):
+    """List the videos to annotate from a directory or a playlist file.
+
+    A directory is scanned recursively for known video extensions, sorted by
+    path. A file is read as one path per line (M3U-style: blank lines and
+    lines starting with '#' are skipped); relative paths are resolved
+    against the playlist file's directory.
+    """
+    if os.path.isdir(source):
+        paths = []
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if os.path.splitext(name)[1].lower() in VIDEO_EXTENSIONS:
+                    paths.append(os.path.join(root, name))
+        return paths
+
+    base = os.path.dirname(os.path.abspath(source))
+    paths = []
+    with open(source, "r", encoding="utf-8-sig") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            paths.append(line if os.path.isabs(line) else os.path.join(base, line))
+    return paths
+
+
+class Playlist:
+    """Ordered queue of videos for one annotation session."""
+
+    def __init__(self, paths):
+        self.paths = list(paths)
+        self.index = 0
+        self.load_latencies = []   # (path, ms from "next" to first frame playing)
+
+    def __len__(self):
+        return len(self.paths)
+
+    @property
+    def current(self):
+        return self.paths[self.index] if self.paths else None
+
+    def peek_next(self):
+        return self.paths[self.index + 1] if self.index + 1 < len(self.paths) else None
+
+    def upcoming(self, n):
+        """Paths of the next `n` videos after the current one."""
+        return self.paths[self.index + 1:self.index + 1 + n]
+
+    def advance(self):
+        """Move to the next video and return its path (None at the end)."""
+        if self.index + 1 >= len(self.paths):
+            return None
+        self.index += 1
+        return self.paths[self.index]
+
+    def position_text(self):
+        return f"{self.index + 1}/{len(self.paths)}"
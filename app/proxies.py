@@ -0,0 +1,267 @@
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from media_info import MediaInfo
+from playlist import VIDEO_EXTENSIONS
+from video_cache import content_fingerprint
+
+# Low-resolution proxies live next to the originals, in a `.proxies` folder, so
+# proxies generated once (e.g. on a fast machine) travel with the videos to
+# the annotation stations. Each proxy has a JSON sidecar with the original's
+# fingerprint and the proxy -> original time mapping.
+PROXY_DIR = ".proxies"
+
+
+def proxy_paths(video_path):
+    """(proxy video, sidecar) paths for an original video."""
+    folder = os.path.join(os.path.dirname(os.path.abspath(video_path)), PROXY_DIR)
+    stem = os.path.splitext(os.path.basename(video_path))[0]
+    return os.path.join(folder, stem + ".proxy.mp4"), os.path.join(folder, stem + ".proxy.json")
+
+
+class ProxyMapping:
+    """Linear map between proxy and original media time: original = offset_ms + proxy * scale."""
+
+    def __init__(self, offset_ms=0.0, scale=1.0):
+        self.offset_ms = offset_ms
+        self.scale = scale or 1.0
+
+    def to_original(self, proxy_ms):
+        return int(round(self.offset_ms + proxy_ms * self.scale))
+
+    def to_proxy(self, original_ms):
+        return int(round((original_ms - self.offset_ms) / self.scale))
+
+
+def _probe(path, ffprobe):
+    """(start ms, duration ms, width, height, fps) of the first video stream."""
+    out = subprocess.run(
+        [ffprobe, "-v", "error", "-select_streams", "v:0", "-show_entries",
+         "format=start_time,duration:stream=width,height,avg_frame_rate", "-of", "json", path],
+        capture_output=True, text=True, check=True)
+    info = json.loads(out.stdout)
+    fmt = info.get("format", {})
+    stream = (info.get("streams") or [{}])[0]
+    num, _, den = stream.get("avg_frame_rate", "0/1").partition("/")
+    fps = float(num) / float(den) if den and float(den) else 0.0
+    return (float(fmt.get("start_time") or 0.0) * 1000.0, float(fmt.get("duration") or 0.0) * 1000.0,
+            int(stream.get("width") or 0), int(stream.get("height") or 0), fps)
+
+
+def make_proxy(video_path, height=360, ffmpeg="ffmpeg", ffprobe="ffprobe"):
+    """Encode a proxy of `video_path` and write its sidecar. Returns the proxy path.
+
+    The proxy keeps every frame and the original timestamps (no frame rate
+    conversion), uses a short GOP so seeks are cheap, and is tuned for fast
+    decoding. The mapping corrects for a different container start time
+    and, should the durations differ, stretches linearly.
+    """
+    proxy, sidecar = proxy_paths(video_path)
+    os.makedirs(os.path.dirname(proxy), exist_ok=True)
+    src_start, src_duration, width, src_height, fps = _probe(video_path, ffprobe)
+    gop = max(1, int(round(fps))) if fps else 30
+    fd, tmp_path = tempfile.mkstemp(prefix=".proxy_", suffix=".mp4", dir=os.path.dirname(proxy))
+    os.close(fd)
+    try:
+        subprocess.run(
+            [ffmpeg, "-v", "error", "-y", "-i", video_path, "-map", "0:v:0", "-map", "0:a:0?",
+             "-vf", f"scale=-2:{height}", "-fps_mode", "passthrough",
+             "-c:v", "libx264", "-preset", "veryfast", "-tune", "fastdecode", "-crf", "26",
+             "-g", str(gop), "-c:a", "aac", "-b:a", "96k", tmp_path],
+            check=True)
+        proxy_start, proxy_duration, _, _, _ = _probe(tmp_path, ffprobe)
+        os.replace(tmp_path, proxy)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    scale = src_duration / proxy_duration if src_duration and proxy_duration else 1.0
+    meta = {
+        "source": os.path.basename(video_path),
+        "source_fingerprint": content_fingerprint(video_path),
+        "offset_ms": src_start - proxy_start * scale,
+        "scale": scale,
+        "source_width": width,
+        "source_height": src_height,
+        "source_fps": fps,
+        "source_duration_ms": src_duration,
+        "height": height,
+    }
+    with open(sidecar, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=1)
+    return proxy
+
+
+def find_proxy(video_path, fingerprint=None):
+    """(proxy path, ProxyMapping, sidecar dict) if a proxy of this exact video exists, else None.
+
+    Pass the video's `fingerprint` if it's already known; it's computed otherwise.
+    """
+    proxy, sidecar = proxy_paths(video_path)
+    if not os.path.exists(proxy):
+        return None
+    try:
+        with open(sidecar, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if fingerprint is None:
+            fingerprint = content_fingerprint(video_path)
+    except (OSError, ValueError):
+        return None
+    if meta.get("source_fingerprint") != fingerprint:
+        return None  # the original changed since the proxy was made
+    return proxy, ProxyMapping(meta.get("offset_ms", 0.0), meta.get("scale", 1.0)), meta
+
+
+class ProxyBackend:
+    """Wraps a backend so videos with a proxy play from the proxy instead.
+
+    Everything the app sees stays in the original's time: the wrapper maps
+    reported times, lengths and seek targets through the proxy's mapping.
+    """
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.name = inner.name
+        self.profile = getattr(inner, "profile", "default")
+
+    def new_player(self, on_event):
+        return ProxyPlayer(self.inner, on_event)
+
+
+class ProxyPlayer:
+    def __init__(self, backend, on_event):
+        self._on_event = on_event
+        self.mapping = None           # ProxyMapping while a proxy is loaded
+        self.proxy_meta = None
+        self._player = backend.new_player(self._on_inner_event)
+
+    def _on_inner_event(self, kind, value):
+        mapping = self.mapping
+        if mapping is not None and kind in ("time", "length") and value is not None and value >= 0:
+            value = mapping.to_original(value)
+        self._on_event(kind, value)
+
+    def load(self, path, start_paused=False, light=False, threads=0, start_ms=0, fingerprint=None):
+        found = find_proxy(path, fingerprint)
+        if found is None:
+            self.mapping = self.proxy_meta = None
+            self._player.load(path, start_paused, light, threads, start_ms)
+            return
+        proxy, mapping, meta = found
+        self.mapping, self.proxy_meta = mapping, meta
+        self._player.load(proxy, start_paused, light, threads, max(0, mapping.to_proxy(start_ms)) if start_ms else 0)
+
+    def request_media_info(self, callback):
+        meta = self.proxy_meta
+        if meta is None:
+            self._player.request_media_info(callback)
+            return
+
+        def on_info(info):
+            # Report the original's size and length, not the proxy's
+            duration = int(meta.get("source_duration_ms") or self.mapping.to_original(info.duration_ms))
+            fps = meta.get("source_fps") or info.fps
+            callback(MediaInfo(duration_ms=duration, fps=fps, frame_count=int(round(duration * fps / 1000.0)),
+                               width=meta.get("source_width") or info.width,
+                               height=meta.get("source_height") or info.height, codec=info.codec))
+
+        self._player.request_media_info(on_info)
+
+    def get_time(self):
+        t = self._player.get_time()
+        if self.mapping is None or t is None or t < 0:
+            return t
+        return self.mapping.to_original(t)
+
+    def get_length(self):
+        length = self._player.get_length()
+        if self.mapping is None or not length or length < 0:
+            return length
+        return self.mapping.to_original(length)
+
+    def set_time(self, ms):
+        self._player.set_time(ms if self.mapping is None else max(0, self.mapping.to_proxy(ms)))
+
+    def preparse(self):
+        self._player.preparse()
+
+    def embed(self, window_id):
+        self._player.embed(window_id)
+
+    def play(self):
+        self._player.play()
+
+    def pause(self):
+        self._player.pause()
+
+    def set_pause(self, paused):
+        self._player.set_pause(paused)
+
+    def stop(self):
+        self._player.stop()
+
+    def next_frame(self):
+        self._player.next_frame()
+
+    def set_mute(self, muted):
+        self._player.set_mute(muted)
+
+    def set_rate(self, rate):
+        self._player.set_rate(rate)
+
+    def stats(self):
+        return self._player.stats()
+
+
+def _iter_videos(paths):
+    for root in paths:
+        if os.path.isfile(root):
+            yield root
+            continue
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = sorted(d for d in dirnames if d != PROXY_DIR)
+            for name in sorted(filenames):
+                if os.path.splitext(name)[1].lower() in VIDEO_EXTENSIONS:
+                    yield os.path.join(dirpath, name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate low-resolution proxies for playback with --proxy")
+    parser.add_argument("videos", nargs="+", help="Videos or directories containing them")
+    parser.add_argument("--height", type=int, default=360, help="Proxy height in pixels (default 360)")
+    parser.add_argument("--jobs", type=int, default=1, help="Videos encoded at once (ffmpeg is multi-threaded)")
+    parser.add_argument("--force", action="store_true", help="Re-encode proxies that are already up to date")
+    args = parser.parse_args(argv)
+
+    ffmpeg, ffprobe = shutil.which("ffmpeg"), shutil.which("ffprobe")
+    if ffmpeg is None or ffprobe is None:
+        print("ffmpeg and ffprobe must be on the PATH")
+        return 1
+    videos = [v for v in _iter_videos(args.videos) if args.force or find_proxy(v) is None]
+
+    def encode(video):
+        t0 = time.perf_counter()
+        try:
+            proxy = make_proxy(video, args.height, ffmpeg, ffprobe)
+        except (OSError, ValueError, subprocess.CalledProcessError) as e:
+            return f"failed {video}: {e}"
+        return f"{proxy}  {time.perf_counter() - t0:.1f} s"
+
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        for line in pool.map(encode, videos):
+            print(line)
+    print(f"{len(videos)} proxies")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
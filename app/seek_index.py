@@ -0,0 +1,143 @@
+import os
+import shutil
+import struct
+import subprocess
+import tempfile
+import threading
+from array import array
+from bisect import bisect_right
+
+# File layout: magic | frame count | keyframe count | frame pts (int64 us) | keyframe pts (int64 us)
+INDEX_MAGIC = b"VSI1"
+_COUNTS = struct.Struct("<QQ")
+
+
+class SeekIndex:
+    """Sorted presentation timestamps of every video frame and of the keyframes.
+
+    Lets the app snap a time to the exact start of the frame shown at that
+    time, find the keyframe a seek has to start decoding from, and count
+    how many frames lie between two positions.
+    """
+
+    def __init__(self, frames_us, keyframes_us):
+        self.frames_us = frames_us
+        self.keyframes_us = keyframes_us
+
+    def __len__(self):
+        return len(self.frames_us)
+
+    def frame_at(self, t_ms):
+        """Index of the frame displayed at `t_ms` (clamped to the first/last frame)."""
+        i = bisect_right(self.frames_us, int(t_ms * 1000)) - 1
+        return min(max(i, 0), len(self.frames_us) - 1)
+
+    def frame_time_ms(self, i):
+        return self.frames_us[i] / 1000.0
+
+    def snap_ms(self, t_ms):
+        """Start time (ms) of the frame displayed at `t_ms`."""
+        return self.frame_time_ms(self.frame_at(t_ms))
+
+    def keyframe_before_ms(self, t_ms):
+        """Time (ms) of the last keyframe at or before `t_ms`."""
+        i = bisect_right(self.keyframes_us, int(t_ms * 1000)) - 1
+        return self.keyframes_us[max(i, 0)] / 1000.0 if self.keyframes_us else 0.0
+
+    def save(self, path):
+        outdir = os.path.dirname(path) or "."
+        os.makedirs(outdir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".index_", suffix=".tmp", dir=outdir)
+        with os.fdopen(fd, "wb") as f:
+            f.write(INDEX_MAGIC + _COUNTS.pack(len(self.frames_us), len(self.keyframes_us)))
+            self.frames_us.tofile(f)
+            self.keyframes_us.tofile(f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            if f.read(4) != INDEX_MAGIC:
+                raise ValueError(f"Not a seek index: {path}")
+            n_frames, n_keys = _COUNTS.unpack(f.read(_COUNTS.size))
+            frames_us = array("q")
+            frames_us.fromfile(f, n_frames)
+            keyframes_us = array("q")
+            keyframes_us.fromfile(f, n_keys)
+        return cls(frames_us, keyframes_us)
+
+
+def scan_with_ffprobe(path, ffprobe="ffprobe", cancel=None):
+    """Build a SeekIndex by demuxing (not decoding) the first video stream.
+
+    Streams ffprobe's packet list, so memory stays proportional to the
+    number of frames. `cancel` is an optional threading.Event; returns None
+    if it gets set.
+    """
+    cmd = [ffprobe, "-v", "error", "-select_streams", "v:0",
+           "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", path]
+    frames_us = array("q")
+    keyframes_us = array("q")
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, bufsize=1 << 16)
+    try:
+        for line in proc.stdout:
+            if cancel is not None and cancel.is_set():
+                proc.kill()
+                return None
+            pts, _, flags = line.strip().partition(",")
+            if not pts or pts == "N/A":
+                continue
+            t_us = int(round(float(pts) * 1e6))
+            frames_us.append(t_us)
+            if "K" in flags:
+                keyframes_us.append(t_us)
+    finally:
+        proc.stdout.close()
+        proc.wait()
+    if proc.returncode != 0 or not frames_us:
+        return None
+    # Packets come in decode order; B-frames make presentation times non-monotonic
+    return SeekIndex(array("q", sorted(frames_us)), array("q", sorted(keyframes_us)))
+
+
+class SeekIndexBuilder:
+    """Loads a video's SeekIndex from the cache, or scans and caches it, off the UI thread.
+
+    `on_ready(index)` is called from the worker thread when an index is
+    available. Nothing happens if ffprobe isn't installed.
+    """
+
+    def __init__(self, video_path, cache_path, on_ready):
+        self.video_path = video_path
+        self.cache_path = cache_path
+        self.on_ready = on_ready
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="seek-index", daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _run(self):
+        index = None
+        if os.path.exists(self.cache_path):
+            try:
+                index = SeekIndex.load(self.cache_path)
+            except (OSError, ValueError, EOFError):
+                index = None
+        if index is None:
+            ffprobe = shutil.which("ffprobe")
+            if ffprobe is None:
+                return
+            try:
+                index = scan_with_ffprobe(self.video_path, ffprobe, self._cancel)
+            except (OSError, ValueError):
+                index = None
+            if index is None:
+                return
+            try:
+                index.save(self.cache_path)
+            except OSError:
+                pass
+        if not self._cancel.is_set():
+            self.on_ready(index)
@@ -0,0 +1,163 @@
+import tkinter as tk
+from bisect import bisect_left
+
+
+class TimelineCanvas(tk.Canvas):
+    """Zoomable strip under the video: audio envelope, mark density, playhead.
+
+    Everything is drawn per pixel column: the envelope from the level of an
+    EnvelopePyramid matching the zoom, and the marks as counts per column
+    (one bisect per column edge on the sorted mark times). A redraw is
+    therefore O(width), whatever the video length or mark count, and is
+    deferred to idle time so a burst of marks or zoom steps costs one.
+    Moving the playhead only moves one line.
+
+    Click seeks (`on_seek(ms)`), the mouse wheel zooms around the pointer,
+    right-click shows the whole video again.
+    """
+
+    ENVELOPE_H = 0.65   # share of the height used by the envelope; marks go below
+
+    def __init__(self, master, get_mark_times, on_seek, height=64, **kwargs):
+        super().__init__(master, height=height, bg="gray12", highlightthickness=0, **kwargs)
+        self.get_mark_times = get_mark_times   # () -> sorted mark times (ms)
+        self.on_seek = on_seek
+        self.duration_ms = 0
+        self.view = (0, 0)        # visible range (ms); (0, 0) = whole video
+        self.envelope = None      # EnvelopePyramid, once computed
+        self.position_ms = 0
+        self.redraws = 0
+        self._redraw_id = None
+        self._playhead_x = None
+
+        self.bind("<Configure>", lambda e: self.request_redraw())
+        self.bind("<Button-1>", self._on_click)
+        self.bind("<B1-Motion>", self._on_click)
+        self.bind("<Button-3>", lambda e: self.reset_zoom())
+        self.bind("<MouseWheel>", lambda e: self._zoom_at(e.x, 0.8 if e.delta > 0 else 1.25))
+        self.bind("<Button-4>", lambda e: self._zoom_at(e.x, 0.8))
+        self.bind("<Button-5>", lambda e: self._zoom_at(e.x, 1.25))
+
+    # --- State ---
+    def set_duration(self, duration_ms):
+        if duration_ms != self.duration_ms:
+            self.duration_ms = duration_ms
+            self.view = (0, duration_ms)
+            self.request_redraw()
+
+    def set_envelope(self, envelope):
+        self.envelope = envelope
+        self.request_redraw()
+
+    def reset(self):
+        """Forget the previous video."""
+        self.duration_ms = 0
+        self.view = (0, 0)
+        self.envelope = None
+        self.position_ms = 0
+        self.request_redraw()
+
+    def marks_changed(self):
+        self.request_redraw()
+
+    def set_position(self, t_ms):
+        self.position_ms = t_ms
+        start, end = self.view
+        if end > start and not start <= t_ms <= end and end - start < self.duration_ms:
+            # Zoomed in and playback left the view: page along with it
+            span = end - start
+            new_start = min(max(0, t_ms - span // 10), self.duration_ms - span)
+            self.view = (new_start, new_start + span)
+            self.request_redraw()
+            return
+        self._move_playhead()
+
+    # --- Coordinates ---
+    def _x_to_ms(self, x):
+        start, end = self.view
+        width = max(1, self.winfo_width())
+        return int(start + (end - start) * min(max(x, 0), width) / width)
+
+    def _ms_to_x(self, t_ms):
+        start, end = self.view
+        if end <= start:
+            return None
+        return (t_ms - start) * self.winfo_width() / (end - start)
+
+    # --- Interaction ---
+    def _on_click(self, event):
+        if self.duration_ms > 0:
+            self.on_seek(self._x_to_ms(event.x))
+
+    def _zoom_at(self, x, factor):
+        start, end = self.view
+        if self.duration_ms <= 0 or end <= start:
+            return "break"
+        pivot = self._x_to_ms(x)
+        # Down to 1 s across the strip, up to the whole video
+        span = min(max(1000, int((end - start) * factor)), self.duration_ms)
+        frac = (pivot - start) / (end - start)
+        new_start = min(max(0, int(pivot - frac * span)), self.duration_ms - span)
+        self.view = (new_start, new_start + span)
+        self.request_redraw()
+        return "break"
+
+    def reset_zoom(self):
+        self.view = (0, self.duration_ms)
+        self.request_redraw()
+
+    # --- Drawing ---
+    def request_redraw(self):
+        if self._redraw_id is None:
+            self._redraw_id = self.after_idle(self._redraw)
+
+    def _redraw(self):
+        self._redraw_id = None
+        self.redraws += 1
+        self.delete("all")
+        self._playhead_x = None
+        width, height = self.winfo_width(), self.winfo_height()
+        start, end = self.view
+        if width <= 1 or end <= start:
+            return
+        env_h = int(height * self.ENVELOPE_H)
+
+        # Audio envelope: loudest (max) band with the quietest (min) inside it, mirrored around the middle
+        if self.envelope is not None and self.envelope.peak > 0:
+            columns = self.envelope.columns(start, end, width)
+            mid, scale = env_h / 2.0, (env_h / 2.0 - 1) / self.envelope.peak
+            for shade, pick in (("gray45", 1), ("gray70", 0)):
+                top = [(x, mid - c[pick] * scale) for x, c in enumerate(columns)]
+                bottom = [(x, mid + c[pick] * scale) for x, c in reversed(list(enumerate(columns)))]
+                self.create_polygon(*top, *bottom, fill=shade, outline="")
+
+        # Mark density: marks per pixel column
+        times = self.get_mark_times()
+        if len(times):
+            ms_per_px = (end - start) / width
+            edges = [bisect_left(times, start + x * ms_per_px) for x in range(width + 1)]
+            counts = [edges[x + 1] - edges[x] for x in range(width)]
+            peak = max(counts)
+            if peak:
+                base, bar_h = height - 1, height - env_h - 2
+                points = [(0, base)]
+                for x, n in enumerate(counts):
+                    # Any mark shows at least a few pixels; more marks make a taller bar
+                    y = base - (max(3, bar_h * n / peak) if n else 0)
+                    points += [(x, y), (x + 1, y)]
+                points.append((width, base))
+                self.create_polygon(*points, fill="orange", outline="")
+        self._move_playhead()
+
+    def _move_playhead(self):
+        x = self._ms_to_x(self.position_ms)
+        if x is None:
+            return
+        x = int(x)
+        if x == self._playhead_x:
+            return
+        self._playhead_x = x
+        if not self.find_withtag("playhead"):
+            self.create_line(x, 0, x, self.winfo_height(), fill="red", width=2, tags="playhead")
+        else:
+            self.coords("playhead", x, 0, x, self.winfo_height())
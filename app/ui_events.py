@@ -0,0 +1,121 @@
+import threading
+import time
+
+
+class CoalescingDispatcher:
+    """Hand player events from other threads to the Tk loop, coalesced per kind.
+
+    `post` is safe to call from any thread (e.g. libVLC's event thread) and
+    never touches Tk: it only stores the latest value per event kind. The
+    Tk thread drains pending events at most once per `frame_ms` and calls
+    `handler(events)` with a dict of kind -> latest value, so a burst of
+    TimeChanged events costs a single redraw.
+
+    The pump runs every frame only while `start()`ed (i.e. while playing).
+    When stopped it falls asleep once nothing is pending, with no timer
+    at all; the first `post` after that arms a single `after_idle` wake
+    (guarded by a flag under the lock, so a burst of posts from worker
+    threads makes one Tk call) and the results of media info, envelope or
+    local-copy workers still arrive while paused. `kick()` delivers what's
+    pending at the next frame (Tk thread only). `close()` ends the pump.
+    """
+
+    def __init__(self, master, handler, frame_ms=16):
+        self.master = master
+        self.handler = handler
+        self.frame_ms = frame_ms
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._running = False
+        self._closed = False
+        self._asleep = True      # no tick scheduled or armed: the next post must wake the pump
+        self._after_id = None
+        self._due_ns = 0
+
+        # Counters
+        self.posted = 0          # events received from the player
+        self.coalesced = 0       # events overwritten before being dispatched
+        self.dispatches = 0      # handler calls
+        self.dispatch_ns = 0     # total time spent in the handler
+        self.ticks = 0           # pump wake-ups (including empty ones)
+        self.wakes = 0           # wakes armed by a post while the pump was asleep
+
+    def post(self, kind, value=None):
+        with self._lock:
+            self.posted += 1
+            if kind in self._pending:
+                self.coalesced += 1
+            self._pending[kind] = value
+            wake = self._asleep and not self._closed
+            if wake:
+                self._asleep = False
+                self.wakes += 1
+        if wake:
+            self.master.after_idle(self._wake)
+
+    def start(self):
+        self._running = True
+        self._schedule(self.frame_ms)
+
+    def stop(self):
+        """Let the pump fall asleep once pending events are delivered (nothing runs while paused)."""
+        self._running = False
+
+    def kick(self):
+        """Deliver pending events at the next frame, even while the pump is stopped."""
+        self._schedule(self.frame_ms)
+
+    def close(self):
+        self._running = False
+        with self._lock:
+            self._closed = True
+        self._cancel()
+
+    def _wake(self):
+        self._schedule(0)
+
+    def _cancel(self):
+        if self._after_id is not None:
+            self.master.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _schedule(self, delay_ms):
+        if self._closed:
+            return
+        with self._lock:
+            self._asleep = False
+        if self._after_id is not None:
+            if self._due_ns <= time.perf_counter_ns() + delay_ms * 1_000_000:
+                return  # a tick is already due by then
+            self._cancel()
+        self._due_ns = time.perf_counter_ns() + delay_ms * 1_000_000
+        self._after_id = self.master.after(delay_ms, self._tick)
+
+    def _tick(self):
+        self._after_id = None
+        self.ticks += 1
+        with self._lock:
+            events, self._pending = self._pending, {}
+        if events:
+            t0 = time.perf_counter_ns()
+            self.handler(events)
+            self.dispatch_ns += time.perf_counter_ns() - t0
+            self.dispatches += 1
+        if not self._running:
+            with self._lock:
+                # Checked under the lock so a post racing with this tick either
+                # lands before (and is delivered next frame) or arms the wake
+                self._asleep = self._after_id is None and not self._pending
+            if self._asleep:
+                return
+        self._schedule(self.frame_ms)
+
+    def stats(self):
+        return {
+            "posted": self.posted,
+            "coalesced": self.coalesced,
+            "dispatches": self.dispatches,
+            "ticks": self.ticks,
+            "wakes": self.wakes,
+            "avg_dispatch_us": (self.dispatch_ns / self.dispatches / 1000.0) if self.dispatches else 0.0,
+        }
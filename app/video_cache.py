@@ -0,0 +1,143 @@
+import hashlib
+import mmap
+import os
+import shutil
+import sys
+import time
+
+
+def content_fingerprint(path, chunk_size=64 * 1024, samples=8):
+    """Identify a video by its content, independent of name and location.
+
+    Hashes the file size plus the first and last `chunk_size` bytes and
+    `samples` chunks spread evenly in between, read through a read-only
+    memory map. Only ~(samples + 2) * chunk_size bytes are touched, so this
+    takes milliseconds even for multi-GB files, and renamed or copied videos
+    get the same fingerprint.
+    """
+    size = os.path.getsize(path)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(size.to_bytes(8, "little"))
+    if size:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            if size <= chunk_size * (samples + 2):
+                h.update(m[:])
+            else:
+                stride = (size - chunk_size) // (samples + 1)
+                for k in range(samples + 2):
+                    offset = min(k * stride, size - chunk_size)
+                    h.update(m[offset:offset + chunk_size])
+    return h.hexdigest()
+
+
+def get_user_cache_dir():
+    """Platform cache directory for the app (safe to delete; everything there can be rebuilt)."""
+    if sys.platform.startswith('win'):
+        base = os.environ.get('LOCALAPPDATA', os.path.expanduser("~"))
+        return os.path.join(base, "VideoMarker", "Cache")
+    if sys.platform == "darwin":
+        return os.path.join(os.path.expanduser("~"), "Library", "Caches", "VideoMarker")
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "video_marker")
+
+
+class VideoCache:
+    """Size-bounded directory of per-video derived data, keyed by content fingerprint.
+
+    Each video gets one entry directory (`<root>/<fp[:2]>/<fp>/`) holding
+    named artifacts such as metadata, indexes or thumbnails. Using an entry
+    refreshes its mtime; `evict()` deletes least-recently-used entries until
+    the total size fits in `max_bytes`. Entries holding a file with one of
+    `pinned_suffixes` (e.g. an unfinished session journal) are never evicted.
+    """
+
+    def __init__(self, root=None, max_bytes=2 * 1024 ** 3, pinned_suffixes=(".vmj",)):
+        self.root = root or get_user_cache_dir()
+        self.max_bytes = max_bytes
+        self.pinned_suffixes = tuple(pinned_suffixes)
+
+    def entry_dir(self, fingerprint, create=True):
+        path = os.path.join(self.root, fingerprint[:2], fingerprint)
+        if create:
+            os.makedirs(path, exist_ok=True)
+            self.touch(fingerprint)
+        return path
+
+    def touch(self, fingerprint):
+        """Mark an entry as recently used."""
+        try:
+            os.utime(os.path.join(self.root, fingerprint[:2], fingerprint))
+        except OSError:
+            pass
+
+    def path(self, fingerprint, name):
+        """Path for artifact `name` of a video (the entry is created if needed)."""
+        return os.path.join(self.entry_dir(fingerprint), name)
+
+    def find(self, fingerprint, name):
+        """Path of an existing artifact, or None."""
+        path = os.path.join(self.entry_dir(fingerprint, create=False), name)
+        if os.path.exists(path):
+            self.touch(fingerprint)
+            return path
+        return None
+
+    def _entries(self):
+        """Yield (last_used, size_bytes, pinned, path) for each entry."""
+        try:
+            shards = os.listdir(self.root)
+        except OSError:
+            return
+        for shard in shards:
+            shard_path = os.path.join(self.root, shard)
+            if not os.path.isdir(shard_path):
+                continue
+            for name in os.listdir(shard_path):
+                entry = os.path.join(shard_path, name)
+                if not os.path.isdir(entry):
+                    continue
+                size = 0
+                pinned = False
+                for root, _, files in os.walk(entry):
+                    for f in files:
+                        if f.endswith(self.pinned_suffixes):
+                            pinned = True
+                        try:
+                            size += os.path.getsize(os.path.join(root, f))
+                        except OSError:
+                            pass
+                try:
+                    last_used = os.stat(entry).st_mtime
+                except OSError:
+                    continue
+                yield last_used, size, pinned, entry
+
+    def usage(self):
+        """Total bytes currently used by the cache."""
+        return sum(size for _, size, _, _ in self._entries())
+
+    def evict(self, keep=(), reserve_bytes=0):
+        """Delete least-recently-used entries until the cache fits, with `reserve_bytes` to spare.
+
+        Returns bytes freed.
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _, _ in entries)
+        keep_paths = {self.entry_dir(fp, create=False) for fp in keep}
+        freed = 0
+        for _, size, pinned, entry in entries:
+            if total + reserve_bytes <= self.max_bytes:
+                break
+            if pinned or entry in keep_paths:
+                continue
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            freed += size
+        return freed
+
+
+if __name__ == "__main__":
+    for video in sys.argv[1:]:
+        t0 = time.perf_counter()
+        fp = content_fingerprint(video)
+        print(f"{fp}  {(time.perf_counter() - t0) * 1000:.1f} ms  {video}")
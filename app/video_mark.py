@@ -1,18 +1,45 @@
 import argparse
-import csv
+import math
+import multiprocessing
 import os
+import shutil
 import sys
+import threading
+import time
 import tkinter as tk
+from bisect import bisect_left, bisect_right
 from datetime import datetime
 
 from pathlib import Path
 from tkinter import filedialog, messagebox
 
-try:
-    import vlc  # python-vlc
-except ImportError:
-    print("Missing dependency: python-vlc. Install with `pip install python-vlc`.")
-    sys.exit(1)
+import mark_merge
+from audio_envelope import EnvelopeBuilder
+from candidates import CACHE_DIR as CANDIDATES_DIR, CandidateDetector
+from frame_ring import FrameRing, FrameWindowLoader
+from categories import FLAG_BEGIN, FLAG_END, FLAG_NAMES, FLAG_POINT, default_categories, parse_categories
+from instrumentation import Heartbeat, Instruments, PlaybackStats
+from input_log import (IN_ACCEPT, IN_CLICK, IN_DELETE, IN_DELETE_RANGE, IN_FPS, IN_MOVE, IN_PRESS, IN_RELEASE,
+                       IN_UNDO, InputLog, categories_to_json, input_log_path)
+from local_copy import LocalCopies
+from mark_csv import read_csv_metadata, write_marks_csv
+from mark_columns import columns_path, write_marks_columns
+from mark_journal import MarkJournal, read_journal
+from marking import MarkingEngine
+from mark_view import VirtualMarkList
+from multiview import Stream, SyncGroup, load_offsets, parse_stream_arg, store_offsets
+from media_info import format_media_info, load_cached_media_info, store_media_info
+from players import BACKENDS, PROFILES, PlayerUnavailable, VlcBackend
+from playlist import Playlist, collect_playlist
+from proxies import ProxyBackend
+from seek_index import SeekIndexBuilder
+from timeline import TimelineCanvas
+from media_clock import MediaClock
+from ui_events import CoalescingDispatcher
+from video_cache import VideoCache, content_fingerprint
+
+
+APP_VERSION = "1.1"
 
 
 def resource_path(rel_path: str) -> str:
@@ -69,11 +96,8 @@ def get_desktop_path():
         return "."
 
 
-def get_default_csv_filename(video_path=None):
-    """Generate default CSV filename with current date, video name, and username, saved to Desktop."""
-    today = datetime.now().strftime("%Y-%m-%d")
-    
-    # Try to get username from various sources
+def get_username():
+    """Login name of the annotator, used in file names and CSV metadata."""
     username = "YOUR_NAME"  # fallback
     try:
         import getpass
@@ -83,13 +107,26 @@ def get_default_csv_filename(video_path=None):
             username = os.environ.get('USER', os.environ.get('USERNAME', 'YOUR_NAME'))
         except:
             pass
+    return username
+
+
+def get_default_csv_filename(video_path=None, fingerprint=None):
+    """Generate default CSV filename with current date, video name, and username, saved to Desktop.
+
+    The whole video name is used (playlist clips often share a long prefix);
+    with `fingerprint`, its first 8 characters are appended to the video name.
+    """
+    today = datetime.now().strftime("%Y-%m-%d")
+    username = get_username()
     
-    # Get video name (first 12 characters, sanitized)
+    # Get video name (sanitized)
     video_name = ""
     if video_path and os.path.exists(video_path):
         video_filename = os.path.basename(video_path)
-        # Remove extension and get first 12 characters
-        video_name = os.path.splitext(video_filename)[0][:12]
+        # Remove extension
+        video_name = os.path.splitext(video_filename)[0]
+        if fingerprint:
+            video_name += f"_{fingerprint[:8]}"
         # Sanitize filename (remove invalid characters)
         import re
         video_name = re.sub(r'[<>:"/\\|?*]', '_', video_name)
@@ -103,35 +140,110 @@ def get_default_csv_filename(video_path=None):
 
 
 class VideoMarkerApp:
-    def __init__(self, master, video_path=None, out_csv="marks.csv", min_gap_ms=250):
+    # While paused, targets at most this many frames ahead in the same GOP are
+    # reached with next_frame() instead of a seek
+    max_step_frames = 12
+    # Frames kept decoded behind/ahead of the frame-step position
+    step_window_back = 90
+    step_window_ahead = 24
+    # Playlist clips copied ahead to the local cache (--local-cache-gb)
+    local_prefetch = 2
+
+    def __init__(self, master, video_path=None, out_csv="marks.csv", min_gap_ms=250, use_journal=True,
+                 categories=None, playlist=None, cache=None, export_format="csv", use_input_log=True,
+                 backend=None, detect_candidates=False, streams=None, local_copies=None, streamer=None):
         self.master = master
         master.title("Video Timestamp Marker")
 
         # --- State ---
         self.video_path = video_path
         self.out_csv = out_csv
-        self.min_gap_ms = min_gap_ms      # debounce between marks
-        self.last_mark_ms = -10_000       # last mark time (video ms)
-        self.marks_ms = []                # collected marks in ms
+        self.export_format = export_format  # "csv", "binary" or "both"
+        self.min_gap_ms = min_gap_ms      # default debounce for categories without their own
+        self.categories = categories or default_categories(min_gap_ms)
+        self.category_names = {c.cid: c.name for c in self.categories}
+        # Marking rules; its MarkStore holds the collected marks (ms), kept sorted by time
+        self.engine = MarkingEngine(self.categories, on_op=self._journal_op)
+        self.use_input_log = use_input_log
+        self.input_log = None             # raw key/click log of the session, for replay
+        self._last_key = None             # (monotonic_ns, t_ms, raw_ms) of the key being handled
+        self.clock = MediaClock()         # interpolates between VLC time updates
+        self._time_text = ""
+        self.time_redraws = 0             # how often the time label was actually redrawn
+        self.backend = backend            # player backend (libVLC unless given)
         self.player = None
-        self.instance = None
-        self.media = None
         self._is_playing = False
         self._total_duration_ms = 0
+        self.media_info = None            # MediaInfo of the current video once parsed
+        self.fingerprint = None           # content fingerprint of the current video
+        self.seek_index = None            # SeekIndex (frame/keyframe times) once scanned
+        self._seek_index_builder = None
+        self._envelope_builder = None     # computes/loads the audio envelope shown in the timeline
+        self.frame_ring = FrameRing()     # decoded frames around the frame-step position
+        self._frame_loader = None
+        self._step_frame = None           # frame shown in frame-step mode (None = not stepping)
+        self._vlc_frame = None            # frame libVLC itself is paused on
+        self._overlay_image = None
+        self.cache = cache or VideoCache()  # per-video derived data (metadata, sessions, ...)
+        self.use_journal = use_journal    # crash-safe append-only session log
+        self.journal = None
+        self.playlist = playlist          # Playlist of clips, or None for single-video mode
+        self._standby_player = None       # second player, warmed up with the next clip
+        self._standby = None              # {"path", "local"} loaded into the standby player
+        self._standby_thread = None
+        self._load_t0 = None              # perf_counter() when the current clip was requested
+        self.local_copies = local_copies  # LocalCopies of videos on network shares, or None
+        self._playing_local = False       # the player reads the current video's local copy
+        self.streamer = streamer          # MarkStreamer sending marks to an aggregation server, or None
+        if local_copies is not None:
+            local_copies.on_progress = self._on_local_copy_progress
+        self.detect_candidates = detect_candidates  # scan each video for likely events in the background
+        self._candidate_detector = None
+        self.candidates = []              # [(t_ms, score, kind)] of the current video, sorted by time
+        self._candidate_at = None         # time of the candidate last jumped to
+        # Extra camera angles shown next to the main video, locked to its clock
+        self.streams = [Stream(sid, path, offset) for sid, (path, offset) in enumerate(streams or [], start=1)]
+        self.sync = None                  # SyncGroup driving the extra streams
+        self.selected_stream = 0          # stream new marks are attributed to (0 = main video)
 
         # --- UI Layout ---
         self._build_ui()
+        # VLC events arrive on libVLC's thread; this hands them to the Tk loop
+        self.ui_events = CoalescingDispatcher(master, self._on_player_events)
+
+        # Timing histograms (F12 shows them; dumped next to the output on save)
+        self.instruments = Instruments()
+        h = self.instruments.histogram
+        self._h_loop_lag = h("event_loop_lag", "How late a 100 ms Tk heartbeat fires")
+        self._h_key_to_mark = h("key_to_mark", "Key/click handler entry until the mark is stored and selected")
+        self._h_key_to_drawn = h("key_to_mark_drawn", "Key/click handler entry until the redraw after it finished")
+        self._h_time_stale = h("player_time_staleness", "Age of the player's reported time when marking while playing")
+        self._h_time_update = h("player_time_update_interval", "Interval between changes of the player's reported time")
+        self._h_save = h("save", "Writing the marks file(s), incl. background compaction")
+        self._h_clip_load = h("clip_load", "Opening a video (playlist: from pressing next) until its first frame plays")
+        self._key_t0 = None               # perf_counter_ns when the current key/click event arrived
+        self._time_changed_ns = None      # perf_counter_ns when the player's reported time last changed
+        self._last_reported_ms = None
+        self._debug_panel = None
+        self.heartbeat = Heartbeat(master, self._h_loop_lag)
+        self.heartbeat.start()
+        # CPU use and dropped frames, to pick a performance profile per station (F12, timing dump)
+        self.playback_stats = PlaybackStats()
+        self._stats_after = master.after(2000, self._sample_playback_stats)
 
-        # Keyboard bindings
-        master.bind("<space>", self.toggle_play_pause)
-        master.bind("<Key-m>", self.key_mark)
-        master.bind("<Key-M>", self.key_mark)
-        master.bind("<Key-u>", self.undo_last)
-        master.bind("<Key-U>", self.undo_last)
+        # Keyboard bindings: one dispatch table keyed by lower-case keysym
+        self._key_press_actions, self._key_release_actions = self._build_key_tables()
+        master.bind("<KeyPress>", self._on_key_press)
+        master.bind("<KeyRelease>", self._on_key_release)
         master.protocol("WM_DELETE_WINDOW", self.on_close)
 
+        # Trim the cache in the background; it never blocks startup
+        threading.Thread(target=self.cache.evict, name="cache-evict", daemon=True).start()
+
         # If a video path is provided, load it
-        if self.video_path:
+        if self.playlist:
+            self.load_video(self.playlist.current)
+        elif self.video_path:
             self.load_video(self.video_path)
 
     def _build_ui(self):
@@ -148,13 +260,36 @@ class VideoMarkerApp:
         self.btn_save = tk.Button(toolbar, text="Save CSV", command=self.save_csv)
         self.btn_save.pack(side=tk.LEFT, padx=4)
 
+        if self.playlist:
+            self.btn_next = tk.Button(toolbar, text="Next clip (PgDn)", command=self.next_clip)
+            self.btn_next.pack(side=tk.LEFT, padx=4)
+
         self.lbl_out = tk.Label(toolbar, text=f"Output: {self.out_csv}")
         self.lbl_out.pack(side=tk.LEFT, padx=12)
 
-        # Video canvas
-        self.video_panel = tk.Frame(self.master, bg="black", width=960, height=540)
-        self.video_panel.pack(fill=tk.BOTH, expand=True, padx=8, pady=6)
+        # Video canvas: two stacked panels so the next clip can be warmed up
+        # in a hidden player and swapped in by raising its panel
+        video_area = tk.Frame(self.master, bg="black", width=960, height=540)
+        video_area.pack(fill=tk.BOTH, expand=True, padx=8, pady=6)
+        # With extra camera streams the area is a grid: main video top-left, streams in the other cells
+        cells = 1 + len(self.streams)
+        cols = 1 if cells == 1 else 2
+        rows = -(-cells // cols)
+        grid = [dict(relx=(i % cols) / cols, rely=(i // cols) / rows, relwidth=1 / cols, relheight=1 / rows)
+                for i in range(cells)]
+        self._main_cell = grid[0]
+        self._standby_panel = tk.Frame(video_area, bg="black")
+        self._standby_panel.place(**self._main_cell)
+        self.video_panel = tk.Frame(video_area, bg="black")
+        self.video_panel.place(**self._main_cell)
+        self.stream_panels = []
+        for cell in grid[1:]:
+            panel = tk.Frame(video_area, bg="black")
+            panel.place(**cell)
+            self.stream_panels.append(panel)
         self.video_panel.update_idletasks()
+        # Shows buffered frames over the video while stepping backwards
+        self._overlay = tk.Label(video_area, bg="black")
 
         # Bottom controls
         controls = tk.Frame(self.master)
@@ -171,6 +306,11 @@ class VideoMarkerApp:
         self.lbl_status = tk.Label(controls, text="Ready")
         self.lbl_status.pack(side=tk.LEFT, padx=12)
 
+        # Timeline under the video: audio envelope, mark density, click to seek
+        self.timeline = TimelineCanvas(self.master, get_mark_times=lambda: self.marks.times,
+                                       on_seek=self.seek_to)
+        self.timeline.pack(side=tk.BOTTOM, fill=tk.X, padx=8)
+
         # Marks listbox
         right = tk.Frame(self.master)
         right.pack(side=tk.RIGHT, fill=tk.Y, padx=8, pady=6)
@@ -180,49 +320,655 @@ class VideoMarkerApp:
         time_frame.pack(fill=tk.X, pady=(0, 6))
         self.lbl_time = tk.Label(time_frame, text="00:00:00 / 00:00:00", font=("Courier", 10), fg="blue")
         self.lbl_time.pack(side=tk.LEFT)
+        self.lbl_info = tk.Label(right, text="", font=("Courier", 9), fg="gray25")
+        self.lbl_info.pack(fill=tk.X)
         
         tk.Label(right, text="Marks (s)").pack()
-        self.listbox = tk.Listbox(right, width=18, height=20)
-        self.listbox.pack(fill=tk.Y, expand=False)
+        if len(self.categories) > 1:
+            keys = "  ".join(f"{c.key}={c.name}{'*' if c.interval else ''}" for c in self.categories)
+            tk.Label(right, text=keys, wraplength=180, justify=tk.LEFT, fg="gray25").pack()
+        # Only the visible rows are rendered, so huge sessions stay responsive
+        self.mark_list = VirtualMarkList(
+            right, count=lambda: len(self.marks),
+            get_row=self._format_mark_row,
+            rows=20, width=24, on_activate=self._on_mark_activated,
+        )
+        self.mark_list.pack(fill=tk.Y, expand=False)
 
     # --- Video ---
-    def _ensure_vlc(self):
-        if self.instance is None:
-            self.instance = vlc.Instance()
+    def _ensure_player(self):
+        if self.backend is None:
+            self.backend = VlcBackend()
         if self.player is None:
-            self.player = self.instance.media_player_new()
-            # embed into Tk widget
-            self._embed_player()
+            self.player = self._new_player(self.video_panel)
+        if self.streams and self.sync is None:
+            self._start_streams()
 
-    def _embed_player(self):
+    def _new_player(self, panel):
+        """Create a player rendering into `panel` whose events feed the UI."""
+        player = None
+
+        def on_event(kind, value):
+            self._on_player_event(player, kind, value)
+
+        player = self.backend.new_player(on_event)
         self.master.update_idletasks()
-        hwnd = self.video_panel.winfo_id()
-        if sys.platform.startswith('win'):
-            self.player.set_hwnd(hwnd)
-        elif sys.platform == "darwin":
-            self.player.set_nsobject(hwnd)
-        else:
-            self.player.set_xwindow(hwnd)
+        player.embed(panel.winfo_id())
+        return player
+
+    # --- Extra camera streams ---
+    def _decode_threads(self):
+        """Decoder threads per player, so all streams together don't oversubscribe the CPU."""
+        if not self.streams:
+            return 0
+        return max(1, (os.cpu_count() or 2) // (1 + len(self.streams)))
+
+    def _start_streams(self):
+        self.sync = SyncGroup(self.master, self.get_time_ms, self.backend,
+                              drift_histogram=self.instruments.histogram(
+                                  "sync_drift", "Offset of extra camera streams from the main clock at each check"))
+        self.master.update_idletasks()
+        for stream, panel in zip(self.streams, self.stream_panels):
+            try:
+                stream.fingerprint = content_fingerprint(stream.path)
+            except (OSError, ValueError):
+                stream.fingerprint = None
+            self.sync.add(stream, panel.winfo_id(), threads=self._decode_threads())
+
+    def _offsets_path(self):
+        return self.cache.path(self.fingerprint, "stream_offsets.json") if self.fingerprint else None
+
+    def _apply_stream_offsets(self):
+        """Offsets from the command line, else as last calibrated for this main video, else 0."""
+        path = self._offsets_path()
+        calibrated = load_offsets(path) if path else {}
+        for stream in self.streams:
+            if stream.offset_ms is None:
+                stream.offset_ms = calibrated.get(stream.fingerprint or stream.name, 0)
+
+    def _save_stream_offsets(self):
+        path = self._offsets_path()
+        if path is None:
+            return
+        offsets = {s.fingerprint or s.name: s.offset_ms for s in self.streams}
+
+        def store():
+            try:
+                store_offsets(path, offsets)
+            except OSError:
+                pass
+
+        threading.Thread(target=store, name="stream-offsets", daemon=True).start()
+
+    def _stream_names(self):
+        if not self.streams:
+            return None
+        return [os.path.basename(self.video_path or "")] + [s.name for s in self.streams]
+
+    def _stream_metadata(self):
+        return {f"stream_{s.sid}": f"{s.name} (offset_ms={s.offset_ms})" for s in self.streams}
+
+    def select_next_stream(self, event=None):
+        """Tab: the stream new marks are attributed to and that -/= calibrate."""
+        if not self.streams:
+            return
+        self.selected_stream = (self.selected_stream + 1) % (1 + len(self.streams))
+        self.engine.source = self.selected_stream
+        self._show_stream_status()
+        return "break"
+
+    def _show_stream_status(self):
+        if self.selected_stream == 0:
+            self.lbl_status.config(text=f"Stream 0 (main): {os.path.basename(self.video_path or '')}")
+            return
+        s = self.streams[self.selected_stream - 1]
+        self.lbl_status.config(text=f"Stream {s.sid}: {s.name}, offset {s.offset_ms:+d} ms (-/= one frame, _/+ ten)")
+
+    def shift_stream_offset(self, frames):
+        """Calibrate: show the selected stream `frames` main-video frames further along (negative: back)."""
+        if self.selected_stream == 0 or self.sync is None:
+            return "break"
+        s = self.streams[self.selected_stream - 1]
+        s.offset_ms += int(round(frames * self._frame_ms()))
+        self.sync.seek(self.get_time_ms(), self._is_playing)
+        self._show_stream_status()
+        self._save_stream_offsets()
+        self._refresh_journal_export()
+        return "break"
+
+    def _on_player_event(self, player, kind, value):
+        # Runs on the backend's event thread: no Tk calls here, only clock + queue
+        if player is not self.player:
+            return  # the standby player warming up the next clip
+        if kind == "time":
+            self.clock.sample(value)
+            if value != self._last_reported_ms:
+                now = time.perf_counter_ns()
+                if self._time_changed_ns is not None and self._is_playing:
+                    self._h_time_update.record_ns(self._time_changed_ns, now)
+                self._time_changed_ns = now
+                self._last_reported_ms = value
+        self.ui_events.post(kind, value)
+
+    def _on_player_events(self, events):
+        """Apply a coalesced batch of player events (Tk thread)."""
+        if "length" in events and events["length"] > 0:
+            self._total_duration_ms = events["length"]
+        if "media_info" in events:
+            self._apply_media_info(events["media_info"])
+        if "envelope" in events:
+            self.timeline.set_envelope(events["envelope"])
+        if "candidates_progress" in events:
+            done, total = events["candidates_progress"]
+            self.lbl_status.config(text=f"Finding candidate events… {done}/{total} min")
+        if "candidates" in events:
+            self.lbl_status.config(text=f"{len(self.candidates)} candidate events (. / , to browse, Insert to accept)")
+        if "local_copy_progress" in events:
+            done, total = events["local_copy_progress"]
+            self.lbl_status.config(text=f"Copying to local disk… {done * 100 // max(1, total)}%")
+        if "local_copy" in events:
+            self._switch_to_local_copy(*events["local_copy"])
+        if "journal_error" in events:
+            self.lbl_status.config(text=f"Warning: marks file not written ({events['journal_error']}); "
+                                        f"marks are kept in the session journal")
+        state = events.get("state")
+        if self._load_t0 is not None and (state == "playing" or events.get("time", 0) > 0):
+            self._report_load_latency()
+        if state == "playing":
+            self._set_playing_ui(True)
+            if self._total_duration_ms == 0:
+                self._total_duration_ms = max(0, self.player.get_length() or 0)
+        elif state in ("paused", "stopped", "ended"):
+            self._set_playing_ui(False)
+            if self.sync is not None:
+                self.sync.pause(self.get_time_ms())
+            # Little changes until the next play/seek: let the pump fall asleep until something is posted
+            self.ui_events.stop()
+        self.update_time_display()
+
+    def _set_playing_ui(self, playing):
+        if playing != self._is_playing:
+            self.clock.set_playing(playing)
+        self._is_playing = playing
+        self.btn_play.config(text="⏸ Pause (Space)" if playing else "▶ Play (Space)")
 
     def load_video(self, path):
         if not os.path.exists(path):
             messagebox.showerror("Error", f"File not found:\n{path}")
             return
-        self._ensure_vlc()
-        self.media = self.instance.media_new(path)
-        self.player.set_media(self.media)
+        self._load_t0 = time.perf_counter()
+        self._ensure_player()
+        try:
+            fingerprint = content_fingerprint(path)
+        except (OSError, ValueError):
+            fingerprint = None
+        play_path = self._playback_path(path)
+        self.player.load(play_path, threads=self._decode_threads(), fingerprint=fingerprint)
+        self._playing_local = play_path != path
+        self._activate_clip(path, fingerprint)
+        self._load_media_info()
+        # Autoplay
+        self.play()
+        if self.playlist:
+            self._prepare_standby()
+
+    def _activate_clip(self, path, fingerprint):
+        """Point outputs, journal and display at a newly loaded video (`fingerprint` may be None)."""
         self.video_path = path
-        self.lbl_status.config(text=f"Loaded: {os.path.basename(path)}")
+        self.fingerprint = fingerprint
+        status = f"Loaded: {os.path.basename(path)}"
+        if self.playlist:
+            status += f" ({self.playlist.position_text()})"
+        self.lbl_status.config(text=status)
         
         # Update CSV filename to include video name
-        self.out_csv = get_default_csv_filename(path)
+        self.out_csv = self._clip_output(path)
         self.lbl_out.config(text=f"Output: {os.path.basename(self.out_csv)}")
+
+        self._close_input_log()
+        self.engine.reset()
+        self._apply_stream_offsets()
+        if self.use_journal:
+            self._open_journal(path)
+        if self.use_input_log:
+            self._open_input_log(resumed=bool(self.marks))
+        if self.streamer is not None:
+            # The server replaces whatever it had of this video from us, e.g. with a resumed session
+            self.streamer.post_reset(self._server_video_key(), os.path.basename(path), dict(self.category_names),
+                                     self.marks.copy())
+
+        if self._proxy_text():
+            self.lbl_status.config(text=f"{status} ({self._proxy_text()})")
+        self.timeline.reset()
+        self._start_seek_index(path)
+        self._start_envelope(path)
+        self._reset_frame_step()
+        self._stop_candidates()
+        self._request_local_copies(path)
         
         # Reset duration and update time display
         self._total_duration_ms = 0
+        self.media_info = None
+        self.lbl_info.config(text="")
+        self.clock.reset()
         self.update_time_display()
-        # Autoplay
+
+    # --- Media info ---
+    def _load_media_info(self):
+        """Fill `media_info` from the video cache, or parse the media in the background."""
+        fingerprint = self.fingerprint
+        if fingerprint is None:
+            return
+        cached = self.cache.find(fingerprint, "media_info.json")
+        info = load_cached_media_info(cached) if cached else None
+        if info is not None:
+            self._apply_media_info(info)
+            return
+        self.player.request_media_info(lambda info: self._on_media_parsed(info, fingerprint))
+
+    def _on_media_parsed(self, info, fingerprint):
+        # Usually runs on the backend's event thread
+        if fingerprint != self.fingerprint:
+            return
+
+        def store():
+            try:
+                store_media_info(self.cache.path(fingerprint, "media_info.json"), info)
+            except OSError:
+                pass
+
+        threading.Thread(target=store, name="media-info-cache", daemon=True).start()
+        self.ui_events.post("media_info", info)
+
+    def _apply_media_info(self, info):
+        self.media_info = info
+        if info.fps:
+            # Known only after the input log's header was written; replay takes the rate from here
+            self._log_input(IN_FPS, int(round(info.fps * 1000)))
+        self._refresh_journal_export()
+        if info.duration_ms > 0:
+            self._total_duration_ms = info.duration_ms
+        self.lbl_info.config(text=format_media_info(info))
+        self.update_time_display()
+        if self.detect_candidates and self._candidate_detector is None and info.duration_ms > 0:
+            self._start_candidates(info.duration_ms)
+
+    def _start_seek_index(self, path):
+        """Load or build the frame/keyframe index for `path` in the background."""
+        if self._seek_index_builder is not None:
+            self._seek_index_builder.cancel()
+            self._seek_index_builder = None
+        self.seek_index = None
+        fingerprint = self.fingerprint
+        if fingerprint is None:
+            return
+
+        def on_ready(index):
+            # Worker thread: only publish if the same video is still loaded
+            if fingerprint == self.fingerprint:
+                self.seek_index = index
+
+        self._seek_index_builder = SeekIndexBuilder(
+            path, self.cache.path(fingerprint, "seek_index.bin"), on_ready)
+
+    def _start_envelope(self, path):
+        """Load or compute the audio envelope of `path` for the timeline, in the background."""
+        if self._envelope_builder is not None:
+            self._envelope_builder.cancel()
+            self._envelope_builder = None
+        fingerprint = self.fingerprint
+        if fingerprint is None:
+            return
+
+        def on_ready(envelope):
+            if fingerprint == self.fingerprint:
+                self.ui_events.post("envelope", envelope)
+
+        self._envelope_builder = EnvelopeBuilder(
+            path, self.cache.path(fingerprint, "audio_envelope.bin"), on_ready)
+
+    # --- Candidate events ---
+    def _start_candidates(self, duration_ms):
+        """Scan the current video for likely events on a process pool (resumes from the cache)."""
+        fingerprint = self.fingerprint
+        if fingerprint is None:
+            return
+
+        def on_progress(done, total):
+            if fingerprint == self.fingerprint:
+                self.ui_events.post("candidates_progress", (done, total))
+
+        def on_done(candidates):
+            # Worker thread: only publish if the same video is still loaded
+            if fingerprint == self.fingerprint:
+                self.candidates = sorted(candidates)
+                self.ui_events.post("candidates", len(candidates))
+
+        self._candidate_detector = CandidateDetector(
+            self.video_path, duration_ms, self.cache.path(fingerprint, CANDIDATES_DIR), on_progress, on_done)
+
+    def _stop_candidates(self):
+        if self._candidate_detector is not None:
+            self._candidate_detector.cancel()
+            self._candidate_detector = None
+        self.candidates = []
+        self._candidate_at = None
+
+    def jump_next_candidate(self, event=None):
+        times = [c[0] for c in self.candidates]
+        i = bisect_right(times, self.get_time_ms() + 50)
+        if i < len(times):
+            self._jump_to_candidate(self.candidates[i])
+        return "break"
+
+    def jump_prev_candidate(self, event=None):
+        times = [c[0] for c in self.candidates]
+        i = bisect_left(times, self.get_time_ms() - 50)
+        if i > 0:
+            self._jump_to_candidate(self.candidates[i - 1])
+        return "break"
+
+    def _jump_to_candidate(self, candidate):
+        t_ms, score, kind = candidate
+        self.seek_to(t_ms)
+        self._candidate_at = t_ms
+        self.lbl_status.config(text=f"Candidate {kind} @ {t_ms/1000.0:.3f}s (score {score:.2f}) – Insert accepts")
+
+    def accept_candidate(self, event=None):
+        """Turn the candidate last jumped to into a mark of the first category."""
+        if self._candidate_at is None:
+            return "break"
+        self._mark_timing_start()
+        t_ms, self._candidate_at = self._candidate_at, None
+        self._log_input(IN_ACCEPT, t_ms, t_ms)
+        category = self.categories[0]
+        i = self.engine.mark(category, FLAG_POINT, (t_ms, t_ms))
+        self._show_mark_result(category, FLAG_POINT, i)
+        self._mark_timing_end(marked=i >= 0)
+        return "break"
+
+    def _server_video_key(self):
+        """How the aggregation server identifies the current video (as `merge` does)."""
+        return self.fingerprint or os.path.basename(self.video_path or "")
+
+    def _csv_metadata(self):
+        """Header lines identifying the video the marks belong to."""
+        metadata = {}
+        if self.video_path:
+            metadata["video"] = os.path.basename(self.video_path)
+        if self.fingerprint:
+            metadata["video_fingerprint"] = self.fingerprint
+        metadata["annotator"] = get_username()
+        return metadata
+
+    def _export_settings(self):
+        """What writing marks takes from the app, as a snapshot the journal's writer thread can use."""
+        return {"format": self.export_format, "fps": self._export_fps(), "category_names": dict(self.category_names),
+                "streams": self._stream_names(), "stream_metadata": self._stream_metadata(),
+                "duration_ms": self._total_duration_ms, "debounce_ms": self.min_gap_ms}
+
+    def _write_marks(self, out_csv, store, metadata, export=None):
+        """Write marks in the export format(s) of `export` (default: the current settings); returns the paths written."""
+        if export is None:
+            export = self._export_settings()
+        t0 = time.perf_counter_ns()
+        paths = []
+        # Offsets can be recalibrated during the session: always write the latest ones
+        metadata = dict(metadata, **export["stream_metadata"])
+        streams = export["streams"]
+        if export["format"] in ("csv", "both"):
+            write_marks_csv(out_csv, store, export["category_names"], export["fps"], metadata, streams)
+            paths.append(out_csv)
+        if export["format"] in ("binary", "both"):
+            session = dict(metadata, duration_ms=export["duration_ms"], fps=export["fps"],
+                           debounce_ms=export["debounce_ms"], app_version=APP_VERSION)
+            write_marks_columns(columns_path(out_csv), store, export["category_names"], session, streams)
+            paths.append(columns_path(out_csv))
+        self._h_save.record_ns(t0)
+        return paths
+
+    def _refresh_journal_export(self):
+        """Re-snapshot the export settings for background compaction (Tk thread; e.g. once the fps is known)."""
+        if self.journal is not None:
+            self._journal_export = self._export_settings()
+
+    def _saved_path(self):
+        return self.out_csv if self.export_format != "binary" else columns_path(self.out_csv)
+
+    def _export_fps(self):
+        return self.media_info.fps if self.media_info is not None else 0.0
+
+    # --- Local copies ---
+    def _playback_path(self, path):
+        """The local copy of `path` if one is complete, else `path` itself."""
+        if self.local_copies is None:
+            return path
+        return self.local_copies.lookup(path) or path
+
+    def _request_local_copies(self, path):
+        """Copy the current video (unless already playing from its copy), then prefetch the next clips."""
+        if self.local_copies is None:
+            return
+        if not self._playing_local:
+            self.local_copies.request(path, self._on_local_copy_done, first=True)
+        if self.playlist:
+            self.local_copies.prefetch(self.playlist.upcoming(self.local_prefetch))
+
+    def _on_local_copy_progress(self, path, done, total):
+        # Copy thread
+        if path == self.video_path and not self._playing_local:
+            self.ui_events.post("local_copy_progress", (done, total))
+
+    def _on_local_copy_done(self, path, local):
+        # Copy thread
+        self.ui_events.post("local_copy", (path, local))
+
+    def _switch_to_local_copy(self, path, local):
+        """Reopen the current video from its finished local copy, at the same spot and play state."""
+        if path != self.video_path or self._playing_local or self._proxy_text():
+            return  # moved on, or playing a proxy (already cheap to read)
+        t_ms = self.get_time_ms()
+        playing = self._is_playing
+        self.player.load(local, start_paused=not playing, threads=self._decode_threads(), start_ms=t_ms,
+                         fingerprint=self.fingerprint)
+        self._playing_local = True
+        if playing:
+            self.play()
+        else:
+            self.player.play()  # holds on the frame at t_ms
+            self.ui_events.kick()
+        self.lbl_status.config(text=f"Playing from local copy: {os.path.basename(path)}")
+
+    # --- Playlist ---
+    def _prepare_standby(self):
+        """Load the next playlist clip into the hidden player, paused on its first frame."""
+        path = self.playlist.peek_next()
+        if path is None or not os.path.exists(path):
+            self._standby = None
+            return
+        if self._standby_player is None:
+            self._standby_player = self._new_player(self._standby_panel)
+        player = self._standby_player
+        standby = self._standby = {"path": path, "local": False, "fingerprint": None}
+
+        def warm_up():
+            player.stop()  # may still hold the previous clip
+            try:
+                standby["fingerprint"] = content_fingerprint(path)
+            except (OSError, ValueError):
+                pass
+            play_path = self._playback_path(path)
+            standby["local"] = play_path != path
+            # Demux and decode the first frame now, then hold there until we switch
+            player.load(play_path, start_paused=True, fingerprint=standby["fingerprint"])
+            player.preparse()
+            player.set_mute(True)
+            player.play()
+
+        self._standby_thread = threading.Thread(target=warm_up, name="standby-warmup", daemon=True)
+        self._standby_thread.start()
+
+    def next_clip(self, event=None):
+        """Save the current clip and switch to the next one in the playlist."""
+        if not self.playlist:
+            return "break"
+        path = self.playlist.peek_next()
+        if path is None:
+            self.lbl_status.config(text="End of playlist")
+            return "break"
+        t0 = time.perf_counter()
+        self._finish_clip()
+        self.playlist.advance()
+
+        standby = self._standby
+        if standby is None or standby["path"] != path:
+            # Nothing warmed up (e.g. missing file): fall back to a cold load
+            self.load_video(path)
+            self._load_t0 = t0
+            return "break"
+
+        if self._standby_thread is not None:
+            self._standby_thread.join()
+        # Swap players and panels: the warmed-up player becomes the active one
+        self.player, self._standby_player = self._standby_player, self.player
+        self.video_panel, self._standby_panel = self._standby_panel, self.video_panel
+        self.video_panel.tkraise()
+        self._standby_player.set_mute(True)
+        self._standby_player.set_pause(True)
+        self._standby = None
+        self._load_t0 = t0
+        self._playing_local = standby["local"]
+        self._activate_clip(path, standby["fingerprint"])
+        # Usually already parsed by the warm-up, so this is immediate
+        self._load_media_info()
+        self.player.set_mute(False)
         self.play()
+        self._prepare_standby()
+        return "break"
+
+    def _clip_output(self, path):
+        """Default output CSV for `path`, never silently replacing the marks of a different video."""
+        out_csv = get_default_csv_filename(path)
+        try:
+            existing = read_csv_metadata(out_csv).get("video_fingerprint")
+        except (OSError, UnicodeDecodeError):
+            existing = None
+        if existing and self.fingerprint and existing != self.fingerprint:
+            overwrite = messagebox.askyesno(
+                "Output exists",
+                f"{os.path.basename(out_csv)} already holds marks of a different video.\n\n"
+                f"Overwrite it? (No: save this video's marks to a new file next to it)",
+            )
+            if not overwrite:
+                out_csv = get_default_csv_filename(path, self.fingerprint)
+        return out_csv
+
+    def _finish_clip(self):
+        """Write the current clip's CSV and drop its journal before moving on."""
+        if self.marks and self.save_csv_silent():
+            self._close_journal(remove=True)
+        else:
+            self._close_journal(remove=not self.marks)
+        self._close_input_log()
+        self.engine.reset()
+        self.mark_list.scroll_to(0)
+
+    def _report_load_latency(self):
+        latency_ms = (time.perf_counter() - self._load_t0) * 1000.0
+        self._load_t0 = None
+        self._h_clip_load.record(latency_ms * 1000.0)
+        name = os.path.basename(self.video_path or "")
+        if self.playlist:
+            self.playlist.load_latencies.append((self.video_path, latency_ms))
+            name += f" ({self.playlist.position_text()})"
+        self.lbl_status.config(text=f"Loaded: {name} in {latency_ms:.0f} ms")
+
+    def _open_journal(self, path):
+        """Start journaling marks for `path`, offering to resume an unfinished session."""
+        self._close_journal()
+        if self.fingerprint is None:
+            return
+        # Keyed by content, so a renamed or copied video still finds its session
+        journal_path = self.cache.path(self.fingerprint, "session.vmj")
+        if os.path.exists(journal_path):
+            try:
+                header, records = read_journal(journal_path)
+                resume = bool(records) and header.get("video_fingerprint") == self.fingerprint
+            except (OSError, ValueError):
+                resume = False
+            if resume:
+                resume = messagebox.askyesno(
+                    "Resume session",
+                    f"An unfinished session for this video was found "
+                    f"({header.get('out_csv', 'unknown output')}).\n\nResume it?",
+                )
+            if not resume:
+                # Keep the previous journal around instead of deleting it outright
+                try:
+                    os.replace(journal_path, journal_path + ".bak")
+                except OSError as e:
+                    self.lbl_status.config(text=f"Journal disabled: {e}")
+                    return
+
+        out_csv = self.out_csv
+        metadata = self._csv_metadata()
+        # Replaced as a whole (never mutated), so the writer thread reads no live app state
+        self._journal_export = self._export_settings()
+        try:
+            self.journal = MarkJournal(
+                journal_path,
+                header={"video_path": os.path.abspath(path), "video_fingerprint": self.fingerprint,
+                        "out_csv": out_csv},
+                compact_fn=lambda store: self._write_marks(out_csv, store, metadata, self._journal_export),
+                on_compact_error=lambda e: self.ui_events.post("journal_error", str(e)),
+            )
+        except OSError as e:
+            self.journal = None
+            self.lbl_status.config(text=f"Journal disabled: {e}")
+            return
+
+        self.engine.reset(self.journal.marks)
+        self.mark_list.scroll_to(len(self.marks))
+        if self.marks:
+            self.lbl_status.config(text=f"Resumed {len(self.marks)} marks")
+
+    def _close_journal(self, remove=False):
+        if self.journal is not None:
+            self.journal.close(remove=remove)
+            self.journal = None
+
+    def _journal_op(self, op, time_ms, arg_ms, category, flags, source=0):
+        if self.journal is not None:
+            self.journal.append(op, time_ms, arg_ms, category, flags, source)
+        if self.streamer is not None:
+            self.streamer.post_op(self._server_video_key(), op, time_ms, arg_ms, category, flags, source)
+        self.timeline.marks_changed()
+
+    def _open_input_log(self, resumed):
+        """Start recording raw inputs next to the output file (one session per load)."""
+        self._close_input_log()
+        header = dict(self._csv_metadata(), self._stream_metadata(), categories=categories_to_json(self.categories),
+                      min_gap_ms=self.min_gap_ms, resumed=resumed, app_version=APP_VERSION,
+                      started=datetime.now().isoformat(timespec="seconds"), streams=self._stream_names())
+        if resumed:
+            # Replay starts from these, not from whatever the log's earlier sessions left
+            header["resumed_marks"] = self.marks.in_added_order()
+        try:
+            os.makedirs(os.path.dirname(self.out_csv) or ".", exist_ok=True)
+            self.input_log = InputLog(input_log_path(self.out_csv), header)
+        except OSError as e:
+            self.input_log = None
+            self.lbl_status.config(text=f"Input log disabled: {e}")
+
+    def _close_input_log(self):
+        if self.input_log is not None:
+            self.input_log.close()
+            self.input_log = None
+
+    def _log_input(self, kind, a_ms=0, b_ms=0, category=0, flags=0, key="", now_ns=None):
+        if self.input_log is not None:
+            self.input_log.append(kind, a_ms, b_ms, category, flags, key, self._is_playing, now_ns,
+                                  self.engine.source)
 
     def open_video_dialog(self):
         path = filedialog.askopenfilename(
@@ -235,18 +981,23 @@ class VideoMarkerApp:
     def play(self):
         if self.player is None:
             return
+        self._leave_frame_step()
         self.player.play()
-        self._is_playing = True
-        self.btn_play.config(text="⏸ Pause (Space)")
-        # Start time display updates
-        self.update_time_display()
+        self._set_playing_ui(True)
+        if self.sync is not None:
+            self.sync.play(self.get_time_ms())
+        # Deliver player events to the UI while playing
+        self.ui_events.start()
 
     def pause(self):
         if self.player is None:
             return
         self.player.pause()
-        self._is_playing = False
-        self.btn_play.config(text="▶ Play (Space)")
+        self._set_playing_ui(False)
+        if self.sync is not None:
+            self.sync.pause(self.get_time_ms())
+        # The pump stops itself once the Paused event has been delivered
+        self.ui_events.kick()
 
     def toggle_play_pause(self, event=None):
         if self.player is None:
@@ -257,12 +1008,22 @@ class VideoMarkerApp:
             self.play()
         return "break"
 
-    def get_time_ms(self):
+    def get_raw_time_ms(self):
         if self.player is None:
             return 0
         t = self.player.get_time()  # milliseconds from start
         # Sometimes VLC returns -1 when not ready; clamp to 0
         return max(0, t if t is not None else 0)
+
+    def get_time_ms(self):
+        """Current media time, interpolated between VLC's coarse time updates."""
+        if self.player is None:
+            return 0
+        if self._step_frame is not None:
+            # Frame-step mode: the frame on screen may come from the buffer, not libVLC
+            return int(round(self.seek_index.frame_time_ms(self._step_frame)))
+        self.clock.sample(self.player.get_time())
+        return int(round(self.clock.now_ms()))
     
     def format_time(self, ms):
         """Convert milliseconds to HH:MM:SS format"""
@@ -275,59 +1036,442 @@ class VideoMarkerApp:
         return f"{hours:02d}:{minutes:02d}:{secs:02d}"
     
     def update_time_display(self):
-        """Update the time display with current position and total duration"""
+        """Update the time display with current position and total duration.
+
+        Driven by player events (see `_on_player_events`), not by polling.
+        """
         if self.player is None:
-            self.lbl_time.config(text="00:00:00 / 00:00:00")
+            text = "00:00:00 / 00:00:00"
+        else:
+            current_time = self.format_time(self.get_time_ms())
+            total_time = self.format_time(self._total_duration_ms)
+            text = f"{current_time} / {total_time}"
+        # Only touch the widget when the text actually changes
+        if text != self._time_text:
+            self._time_text = text
+            self.lbl_time.config(text=text)
+            self.time_redraws += 1
+        if self.player is not None:
+            self.timeline.set_duration(self._total_duration_ms)
+            self.timeline.set_position(self.get_time_ms())
+            if self.streamer is not None and self.video_path:
+                self.streamer.post_position(self._server_video_key(), self.get_time_ms(), self._total_duration_ms)
+
+    def ui_stats(self):
+        """Counters for the event-driven UI refresh (dispatch cost, redraws)."""
+        stats = self.ui_events.stats()
+        stats["time_redraws"] = self.time_redraws
+        stats["timeline_redraws"] = self.timeline.redraws
+        stats["frame_ring"] = self.frame_ring.stats()
+        return stats
+
+    # --- Instrumentation ---
+    def _dump_instruments(self):
+        """Write the timing histograms next to the output, with what's needed to correlate them."""
+        info = self.media_info
+        context = dict(self._csv_metadata(), backend=getattr(self.backend, "name", None), marks=len(self.marks),
+                       profile=getattr(self.backend, "profile", None), proxy=self._proxy_text(),
+                       playback=self.playback_stats.summary(),
+                       codec=info.codec if info else None, fps=info.fps if info else None,
+                       resolution=f"{info.width}x{info.height}" if info else None,
+                       server=self.streamer.stats() if self.streamer is not None else None,
+                       journal=self.journal.stats() if self.journal is not None else None,
+                       clip_loads=[{"video": os.path.basename(p), "ms": round(ms, 1)}
+                                   for p, ms in self.playlist.load_latencies] if self.playlist else None,
+                       app_version=APP_VERSION, ui=self.ui_stats())
+        try:
+            self.instruments.dump(os.path.splitext(self.out_csv)[0] + ".timing.json", context)
+        except OSError:
+            pass  # timings are a diagnostic, never a reason to fail a save
+
+    def _sample_playback_stats(self):
+        self._stats_after = self.master.after(2000, self._sample_playback_stats)
+        if self.player is not None:
+            self.playback_stats.sample(self.player.stats())
+
+    def _proxy_text(self):
+        """e.g. 'proxy 360p' while the current video plays from a proxy, else None."""
+        meta = getattr(self.player, "proxy_meta", None)
+        return f"proxy {meta.get('height')}p" if meta else None
+
+    def _mark_timing_start(self):
+        self._key_t0 = time.perf_counter_ns()
+
+    def _mark_timing_end(self, marked):
+        t0, self._key_t0 = self._key_t0, None
+        if t0 is None or not marked:
             return
-        
-        current_ms = self.get_time_ms()
-        current_time = self.format_time(current_ms)
-        
-        # Get total duration if not already set
-        if self._total_duration_ms == 0:
-            duration = self.player.get_length()
-            if duration and duration > 0:
-                self._total_duration_ms = duration
-        
-        total_time = self.format_time(self._total_duration_ms)
-        self.lbl_time.config(text=f"{current_time} / {total_time}")
-        
-        # Schedule next update
-        if self._is_playing:
-            self.master.after(1000, self.update_time_display)  # Update every second
+        if self._is_playing and self._time_changed_ns is not None:
+            self._h_time_stale.record_ns(self._time_changed_ns, t0)
+        self._h_key_to_mark.record_ns(t0)
+        # Idle callbacks run in order, so this one runs after the redraws the mark queued
+        self.master.after_idle(lambda: self._h_key_to_drawn.record_ns(t0))
+
+    def toggle_debug_panel(self, event=None):
+        """Hidden timing panel (F12)."""
+        if self._debug_panel is not None:
+            self._debug_panel.destroy()
+            self._debug_panel = None
+            return "break"
+        panel = tk.Toplevel(self.master)
+        panel.title("Timing")
+        text = tk.Text(panel, width=80, height=12, font=("Courier", 9))
+        text.pack(fill=tk.BOTH, expand=True)
+        self._debug_panel = panel
+
+        def refresh():
+            if self._debug_panel is not panel:
+                return
+            text.delete("1.0", tk.END)
+            text.insert(tk.END, self.instruments.format_table())
+            stats = self.ui_stats()
+            text.insert(tk.END, f"\n\nevents posted {stats['posted']}, coalesced {stats['coalesced']}, "
+                                f"dispatch {stats['avg_dispatch_us']:.0f} us, time redraws {stats['time_redraws']}")
+            text.insert(tk.END, f"\nprofile {getattr(self.backend, 'profile', None)}"
+                                f"{', ' + self._proxy_text() if self._proxy_text() else ''}; "
+                                f"{self.playback_stats.format_line()}")
+            if self.streamer is not None:
+                server = self.streamer.stats()
+                text.insert(tk.END, f"\nserver {'connected' if server['connected'] else 'offline'}, "
+                                    f"{server['unacked']} batches unacked, {server['reconnects']} reconnects")
+            panel.after(500, refresh)
+
+        panel.protocol("WM_DELETE_WINDOW", self.toggle_debug_panel)
+        refresh()
+        return "break"
+
+    # --- Keys ---
+    def _build_key_tables(self):
+        press = {
+            "space": self.toggle_play_pause,
+            "u": self.undo_last,
+            "delete": self.delete_selected,
+            "backspace": self.delete_selected,
+            "bracketleft": self.jump_prev_mark,
+            "bracketright": self.jump_next_mark,
+            "next": self.next_clip,  # Page Down
+            "left": self.step_backward,
+            "right": self.step_forward,
+            "return": self.nudge_selected_mark,
+            "f12": self.toggle_debug_panel,
+            "period": self.jump_next_candidate,
+            "comma": self.jump_prev_candidate,
+            "insert": self.accept_candidate,
+            "tab": self.select_next_stream,
+            "minus": lambda event: self.shift_stream_offset(-1),
+            "equal": lambda event: self.shift_stream_offset(1),
+            "underscore": lambda event: self.shift_stream_offset(-10),
+            "plus": lambda event: self.shift_stream_offset(10),
+        }
+        release = {}
+        for category in self.categories:
+            press[category.key] = lambda event, c=category: self._category_press(c)
+            if category.interval:
+                release[category.key] = lambda event, c=category: self._category_release(c)
+        return press, release
+
+    def _on_key_press(self, event):
+        key = event.keysym.lower()
+        # Every key goes into the input log, so marks can be re-derived under other settings
+        self._log_key(IN_PRESS, key)
+        action = self._key_press_actions.get(key)
+        if action is not None:
+            return action(event)
+
+    def _on_key_release(self, event):
+        key = event.keysym.lower()
+        self._log_key(IN_RELEASE, key)
+        action = self._key_release_actions.get(key)
+        if action is not None:
+            return action(event)
+
+    def _log_key(self, kind, key):
+        # Stamp once, so the log records exactly the times the marking rules see
+        self._last_key = (time.monotonic_ns(), self.get_time_ms(), self.get_raw_time_ms())
+        self._log_input(kind, self._last_key[1], self._last_key[2], key=key, now_ns=self._last_key[0])
+
+    def _key_stamp(self):
+        """(now_ns, (t_ms, raw_ms)) of the key event being handled, as written to the input log."""
+        if self._last_key is not None:
+            now_ns, t_ms, raw_ms = self._last_key
+            self._last_key = None
+            return now_ns, (t_ms, raw_ms)
+        return time.monotonic_ns(), (self.get_time_ms(), self.get_raw_time_ms())
 
     # --- Marking ---
+    @property
+    def marks(self):
+        return self.engine.marks
+
     def ignore_single_click(self):
         # The button's single-click is bound to this no-op so only double-click fires a mark.
         pass
 
     def double_click_mark(self, event=None):
-        self._mark_event()
+        self._mark_timing_start()
+        stamp = (self.get_time_ms(), self.get_raw_time_ms())
+        self._log_input(IN_CLICK, *stamp)
+        category = self.categories[0]
+        i = self.engine.mark(category, FLAG_POINT, stamp)
+        self._show_mark_result(category, FLAG_POINT, i)
+        self._mark_timing_end(marked=i >= 0)
 
-    def key_mark(self, event=None):
-        self._mark_event()
+    def _category_press(self, category):
+        self._mark_timing_start()
+        now_ns, stamp = self._key_stamp()
+        result = self.engine.press(category.key, stamp, now_ns)
+        if result is not None:
+            self._show_mark_result(*result)
+        self._mark_timing_end(marked=result is not None and result[2] >= 0)
+        return "break"
 
-    def _mark_event(self):
-        t_ms = self.get_time_ms()
-        # Debounce to avoid accidental duplicates (e.g., two near-identical events)
-        if (t_ms - self.last_mark_ms) < self.min_gap_ms:
-            self.lbl_status.config(text="(debounced)")
+    def _category_release(self, category):
+        # Stamp now, but only commit if no auto-repeat press follows right away
+        now_ns, stamp = self._key_stamp()
+        if self.engine.release(category.key, stamp, now_ns):
+            self.master.after(30, lambda: self._commit_release(category.key, now_ns))
+        return "break"
+
+    def _commit_release(self, key, release_ns):
+        result = self.engine.commit_release(key, release_ns)
+        if result is not None:
+            self._show_mark_result(*result)
+
+    def _show_mark_result(self, category, flags, i):
+        if i < 0:
+            self.lbl_status.config(text=f"({category.name} debounced)")
             return
-        self.last_mark_ms = t_ms
-        self.marks_ms.append(t_ms)
-        t_s = t_ms / 1000.0
-        self.listbox.insert(tk.END, f"{t_s:.3f}")
-        self.lbl_status.config(text=f"Marked @ {t_s:.3f}s")
+        self.mark_list.select(i)
+        t_ms = self.marks.times[i]
+        label = category.name if flags == FLAG_POINT else f"{category.name} {FLAG_NAMES[flags]}"
+        self.lbl_status.config(text=f"Marked {label} @ {t_ms/1000.0:.3f}s")
+
+    def _format_mark_row(self, i):
+        t_ms, _, cid, flags = self.marks[i]
+        suffix = {FLAG_BEGIN: " [", FLAG_END: " ]"}.get(flags, "")
+        if self.streams:
+            suffix += f"  #{self.marks.sources[i]}"
+        if len(self.categories) == 1:
+            return f"{t_ms/1000.0:.3f}{suffix}"
+        return f"{t_ms/1000.0:.3f}  {self.category_names.get(cid, cid)}{suffix}"
 
     def undo_last(self, event=None):
-        if not self.marks_ms:
+        # Logged here rather than as the U key press, so the Undo button is replayed too
+        self._log_input(IN_UNDO)
+        i = self.engine.undo()
+        if i < 0:
             return "break"
-        self.marks_ms.pop()
-        if self.listbox.size() > 0:
-            self.listbox.delete(self.listbox.size() - 1)
+        self.mark_list.see(min(i, max(0, len(self.marks) - 1)))
         self.lbl_status.config(text="Undid last mark")
         return "break"
 
+    def delete_selected(self, event=None):
+        """Delete the marks selected in the list (a selection spans a time range)."""
+        selection = self.mark_list.selected_range()
+        if selection is None:
+            return "break"
+        first, last = selection
+        if first == last:
+            start_ms, _, cid, flags = self.marks[first]
+            self._log_input(IN_DELETE, start_ms, category=cid, flags=flags)
+            removed = self.engine.delete_one(start_ms, cid, flags)
+        else:
+            start_ms, end_ms = self.marks.times[first], self.marks.times[last]
+            self._log_input(IN_DELETE_RANGE, start_ms, end_ms)
+            removed = self.engine.delete_range(start_ms, end_ms)
+        self.mark_list.clear_selection()
+        self.lbl_status.config(text=f"Deleted {removed} mark(s)")
+        return "break"
+
+    # --- Navigation ---
+    def seek_to(self, t_ms):
+        if self.player is None:
+            return
+        self._leave_frame_step(sync_player=False)
+        t_ms = max(0, t_ms)
+        index = self.seek_index
+        if index is not None:
+            # Land exactly on the frame displayed at t_ms
+            t_ms = index.snap_ms(t_ms)
+            if not self._is_playing and self._step_forward_to(index, t_ms):
+                return
+        # libVLC seeks to the preceding keyframe and decodes forward to the target.
+        # Round up so the target stays inside the intended frame.
+        self.player.set_time(int(math.ceil(t_ms)))
+        self._after_seek(t_ms)
+
+    def _step_forward_to(self, index, t_ms):
+        """Reach a target a few frames ahead in the same GOP by decoding forward, without seeking."""
+        current = index.frame_at(self.get_time_ms())
+        steps = index.frame_at(t_ms) - current
+        if not 0 < steps <= self.max_step_frames:
+            return False
+        if index.keyframe_before_ms(t_ms) > index.frame_time_ms(current):
+            return False  # a keyframe lies in between: seeking is cheaper
+        for _ in range(steps):
+            self.player.next_frame()
+        self._after_seek(t_ms)
+        return True
+
+    def _after_seek(self, t_ms):
+        # The clock's anchor is meaningless after a jump; restart from the target
+        self.clock.reset()
+        self.clock.sample(int(round(t_ms)))
+        if self.sync is not None:
+            self.sync.seek(t_ms, self._is_playing)
+        self.update_time_display()
+        self.ui_events.kick()
+
+    # --- Frame stepping ---
+    def _frame_ms(self):
+        fps = self._export_fps()
+        return 1000.0 / fps if fps else 40.0
+
+    def step_forward(self, event=None):
+        if self.player is None:
+            return "break"
+        if self._is_playing:
+            self.pause()
+        index = self.seek_index
+        if index is None:
+            # No frame index yet: let libVLC decode the next frame directly
+            self.player.next_frame()
+            self._after_seek(self.get_time_ms() + self._frame_ms())
+            return "break"
+        self._enter_frame_step(index)
+        if self._step_frame >= len(index) - 1:
+            return "break"
+        if self._step_frame == self._vlc_frame:
+            self.player.next_frame()
+            self._vlc_frame += 1
+        self._step_frame += 1
+        self._show_step_frame(index)
+        return "break"
+
+    def step_backward(self, event=None):
+        if self.player is None:
+            return "break"
+        if self._is_playing:
+            self.pause()
+        index = self.seek_index
+        if index is None:
+            self.seek_to(self.get_time_ms() - self._frame_ms())
+            return "break"
+        self._enter_frame_step(index)
+        if self._step_frame > 0:
+            self._step_frame -= 1
+            self._show_step_frame(index)
+        return "break"
+
+    def _enter_frame_step(self, index):
+        if self._step_frame is not None:
+            return
+        self._vlc_frame = self._step_frame = index.frame_at(self.get_time_ms())
+        # Buffered frames are decoded to fill the video cell; after a resize they no longer do
+        size = (max(self.video_panel.winfo_width(), 64), max(self.video_panel.winfo_height(), 64))
+        loader = self._frame_loader
+        if loader is not None and (loader.width, loader.height) != size:
+            loader.close()
+            self._frame_loader = None
+            self.frame_ring.clear()
+        ffmpeg = shutil.which("ffmpeg")
+        if self._frame_loader is None and ffmpeg is not None:
+            self._frame_loader = FrameWindowLoader(self.video_path, index, self.frame_ring, ffmpeg, *size)
+
+    def _step_window(self):
+        """(back, ahead) frames to buffer: the configured window, shrunk to what the ring holds at the cell size."""
+        loader = self._frame_loader
+        frame_bytes = loader.width * loader.height * 3
+        fits = self.frame_ring.max_bytes // frame_bytes
+        wanted = self.step_window_back + self.step_window_ahead + 1
+        if fits >= wanted:
+            return self.step_window_back, self.step_window_ahead
+        ahead = max(1, fits * self.step_window_ahead // wanted)
+        return max(0, fits - ahead - 1), ahead
+
+    def _show_step_frame(self, index):
+        frame = self._step_frame
+        self.frame_ring.set_position(frame)
+        if frame == self._vlc_frame:
+            self._overlay.place_forget()
+        else:
+            data = self.frame_ring.get(frame)
+            if data is not None:
+                self._overlay_image = tk.PhotoImage(data=data, format="PPM")
+                self._overlay.config(image=self._overlay_image)
+                self._overlay.place(**self._main_cell)
+                self._overlay.lift()
+            else:
+                # Not buffered yet: have libVLC seek there instead
+                self.player.set_time(int(math.ceil(index.frame_time_ms(frame))))
+                self._vlc_frame = frame
+                self._overlay.place_forget()
+        if self._frame_loader is not None:
+            back, ahead = self._step_window()
+            self._frame_loader.request(frame - back, frame + ahead)
+        if self.sync is not None:
+            self.sync.seek(index.frame_time_ms(frame), False)
+        self.update_time_display()
+        stats = self.frame_ring.stats()
+        self.lbl_status.config(
+            text=f"Frame {frame}  (buffer {stats['frames']} frames, {stats['bytes'] / 2**20:.0f}/"
+                 f"{stats['max_bytes'] / 2**20:.0f} MB, hit rate {stats['hit_rate']:.0%})")
+
+    def _leave_frame_step(self, sync_player=True):
+        """Hide the buffered frame; optionally move libVLC to the frame that was on screen."""
+        if self._step_frame is None:
+            return
+        if sync_player and self._step_frame != self._vlc_frame:
+            self.player.set_time(int(math.ceil(self.seek_index.frame_time_ms(self._step_frame))))
+        self._step_frame = self._vlc_frame = None
+        self._overlay.place_forget()
+
+    def _reset_frame_step(self):
+        """Drop frame-step state and buffered frames when a different video is loaded."""
+        self._step_frame = self._vlc_frame = None
+        self._overlay.place_forget()
+        if self._frame_loader is not None:
+            self._frame_loader.close()
+            self._frame_loader = None
+        self.frame_ring.clear()
+
+    def nudge_selected_mark(self, event=None):
+        """Move the selected mark to the frame currently shown."""
+        selection = self.mark_list.selected_range()
+        if selection is None:
+            return "break"
+        i = selection[0]
+        old_ms, _, cid, flags = self.marks[i]
+        new_ms = self.get_time_ms()
+        self._log_input(IN_MOVE, old_ms, new_ms, cid, flags)
+        j = self.engine.move(old_ms, cid, flags, new_ms)
+        self.mark_list.select(j)
+        self.lbl_status.config(text=f"Moved mark {old_ms/1000.0:.3f}s -> {new_ms/1000.0:.3f}s")
+        return "break"
+
+    def jump_prev_mark(self, event=None):
+        # Small tolerance so repeated presses step past the mark we just jumped to
+        t = self.marks.prev_mark(self.get_time_ms() - 50)
+        if t is not None:
+            self._jump_to_mark(t)
+        return "break"
+
+    def jump_next_mark(self, event=None):
+        t = self.marks.next_mark(self.get_time_ms() + 50)
+        if t is not None:
+            self._jump_to_mark(t)
+        return "break"
+
+    def _jump_to_mark(self, t_ms):
+        self.seek_to(t_ms)
+        i = self.marks.index_of(t_ms)
+        if i >= 0:
+            self.mark_list.select(i)
+        self.lbl_status.config(text=f"At mark {t_ms/1000.0:.3f}s")
+
+    def _on_mark_activated(self, index):
+        self._jump_to_mark(self.marks.times[index])
+
     # --- Saving ---
     def open_folder(self, folder_path):
         """Open the folder containing the saved file."""
@@ -404,15 +1548,9 @@ class VideoMarkerApp:
     def save_csv_silent(self):
         """Save CSV without showing dialog (for auto-save)."""
         try:
-            # Ensure directory exists
-            outdir = os.path.dirname(self.out_csv) or "."
-            os.makedirs(outdir, exist_ok=True)
-            with open(self.out_csv, "w", newline="") as f:
-                writer = csv.writer(f)
-                writer.writerow(["timestamp_seconds"])
-                for ms in self.marks_ms:
-                    writer.writerow([f"{ms/1000.0:.3f}"])
-            self.lbl_status.config(text=f"Saved: {self.out_csv}")
+            paths = self._write_marks(self.out_csv, self.marks, self._csv_metadata())
+            self.lbl_status.config(text=f"Saved: {', '.join(paths)}")
+            self._dump_instruments()
             return True
         except Exception as e:
             self.lbl_status.config(text=f"Save failed: {e}")
@@ -421,25 +1559,21 @@ class VideoMarkerApp:
     def save_csv(self):
         # Save as one column: timestamp_seconds
         try:
-            # Ensure directory exists
-            outdir = os.path.dirname(self.out_csv) or "."
-            os.makedirs(outdir, exist_ok=True)
-            with open(self.out_csv, "w", newline="") as f:
-                writer = csv.writer(f)
-                writer.writerow(["timestamp_seconds"])
-                for ms in self.marks_ms:
-                    writer.writerow([f"{ms/1000.0:.3f}"])
-            self.lbl_status.config(text=f"Saved: {self.out_csv}")
-            self.show_save_dialog(self.out_csv, len(self.marks_ms))
+            paths = self._write_marks(self.out_csv, self.marks, self._csv_metadata())
+            self.lbl_status.config(text=f"Saved: {', '.join(paths)}")
+            self._dump_instruments()
+            self.show_save_dialog(self._saved_path(), len(self.marks))
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save CSV:\n{e}")
 
     def on_close(self):
         # Auto-save on exit and show dialog if there are marks
-        if self.marks_ms:
+        if self.marks:
             try:
                 # Save silently first
                 if self.save_csv_silent():
+                    # Session is safely in the CSV; the journal is no longer needed
+                    self._close_journal(remove=True)
                     # Show dialog after successful save, but don't destroy main window yet
                     self.show_save_dialog_on_close()
                     return  # Don't destroy yet, let the dialog handle it
@@ -451,11 +1585,33 @@ class VideoMarkerApp:
     
     def _cleanup_and_close(self):
         """Clean up resources and close the application."""
-        if self.player is not None:
-            try:
-                self.player.stop()
-            except Exception:
-                pass
+        # Nothing was lost if there are no marks; otherwise keep the journal for recovery
+        self._close_journal(remove=not self.marks)
+        self._close_input_log()
+        self.heartbeat.stop()
+        self.master.after_cancel(self._stats_after)
+        self.ui_events.close()
+        if self._seek_index_builder is not None:
+            self._seek_index_builder.cancel()
+        if self._envelope_builder is not None:
+            self._envelope_builder.cancel()
+        self._stop_candidates()
+        if self.local_copies is not None:
+            self.local_copies.close()
+        if self.streamer is not None:
+            self.streamer.close()
+        if self.sync is not None:
+            self.sync.stop()
+        if self._frame_loader is not None:
+            self._frame_loader.close()
+        if self._standby_thread is not None:
+            self._standby_thread.join()
+        for player in (self.player, self._standby_player):
+            if player is not None:
+                try:
+                    player.stop()
+                except Exception:
+                    pass
         self.master.destroy()
     
     def show_save_dialog_on_close(self):
@@ -474,7 +1630,7 @@ class VideoMarkerApp:
         main_frame.pack(fill=tk.BOTH, expand=True)
         
         # Success message
-        success_label = tk.Label(main_frame, text=f"✓ Successfully saved {len(self.marks_ms)} marks!", 
+        success_label = tk.Label(main_frame, text=f"✓ Successfully saved {len(self.marks)} marks!", 
                                font=("Arial", 12, "bold"), fg="green")
         success_label.pack(pady=(0, 10))
         
@@ -488,7 +1644,7 @@ class VideoMarkerApp:
         
         path_text = tk.Text(path_frame, height=3, wrap=tk.WORD, font=("Courier", 9))
         path_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        path_text.insert(tk.END, self.out_csv)
+        path_text.insert(tk.END, self._saved_path())
         path_text.config(state=tk.DISABLED)
         
         scrollbar = tk.Scrollbar(path_frame, orient=tk.VERTICAL, command=path_text.yview)
@@ -516,21 +1672,113 @@ class VideoMarkerApp:
 
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "merge":
+        # Headless: `video_mark.py merge DIR` merges marks CSVs from many annotators
+        sys.exit(mark_merge.main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        # Headless: `video_mark.py serve` runs the live aggregation server (mark_server.py)
+        import mark_server
+        sys.exit(mark_server.main(sys.argv[2:]))
+
     parser = argparse.ArgumentParser(description="Simple video event marker → CSV")
     parser.add_argument("--video", type=str, default=None, help="Path to video file")
     parser.add_argument("--out", type=str, default=None, help="Output CSV path")
     parser.add_argument("--mingap", type=int, default=250, help="Debounce between marks (ms)")
+    parser.add_argument("--playlist", type=str, default=None,
+                        help="Directory of videos or playlist file (one path per line); PgDn goes to the next clip")
+    parser.add_argument("--cache-mb", type=int, default=2048,
+                        help="Size limit of the per-video cache directory (MB)")
+    parser.add_argument("--no-journal", action="store_true", help="Disable the crash-recovery session journal")
+    parser.add_argument("--no-input-log", action="store_true",
+                        help="Don't record raw key presses (.vml next to the CSV) for later replay")
+    parser.add_argument("--format", choices=("csv", "binary", "both"), default="csv",
+                        help="Marks file format: CSV, columnar binary (.vmc, NumPy-mappable) or both")
+    parser.add_argument("--player", choices=sorted(BACKENDS), default="vlc",
+                        help="Player backend: libVLC, or a simulated clock without video (for testing)")
+    parser.add_argument("--profile", choices=PROFILES, default="default",
+                        help="libVLC performance profile for slower machines: low-cpu or minimal "
+                             "(F12 shows CPU use and dropped frames)")
+    parser.add_argument("--proxy", action="store_true",
+                        help="Play low-resolution proxies made with `python app/proxies.py` where they exist; "
+                             "marks stay on the original's timeline")
+    parser.add_argument("--categories", type=str, default=None,
+                        help="Event categories: JSON file or 'key:name[:interval][:gap=MS],...' "
+                             "(e.g. '1:reach,2:grasp,3:groom:interval')")
+    parser.add_argument("--sync", action="append", default=[], metavar="VIDEO[@OFFSET_MS]",
+                        help="Extra camera angle of the same trial, played in sync next to --video (repeat, up to 3). "
+                             "OFFSET_MS: time in this video when the main video starts; Tab selects a stream, "
+                             "-/= calibrate its offset")
+    parser.add_argument("--candidates", action="store_true",
+                        help="Find likely events (motion onsets, scene cuts) in the background with ffmpeg; "
+                             ". and , browse them, Insert accepts one as a mark")
+    parser.add_argument("--server", type=str, default=None, metavar="HOST[:PORT]",
+                        help="Also stream marks live to an aggregation server (`python app/mark_server.py`); "
+                             "marks made while it's unreachable are queued on disk and sent later")
+    parser.add_argument("--local-cache-gb", type=float, default=0,
+                        help="For videos on network shares: copy each video (and the next playlist clips) to a "
+                             "local cache of this size in the background and play from the copy once it's there")
     args = parser.parse_args()
+
+    try:
+        backend = VlcBackend(profile=args.profile) if args.player == "vlc" else BACKENDS[args.player]()
+    except PlayerUnavailable as e:
+        print(e)
+        sys.exit(1)
+    if args.proxy:
+        backend = ProxyBackend(backend)
+
+    categories = None
+    if args.categories:
+        try:
+            categories = parse_categories(args.categories, args.mingap)
+        except (OSError, ValueError, KeyError) as e:
+            parser.error(f"--categories: {e}")
+
+    streams = [parse_stream_arg(value) for value in args.sync]
+    if streams:
+        if args.playlist or not args.video:
+            parser.error("--sync needs --video (and can't be combined with --playlist)")
+        if len(streams) > 3:
+            parser.error("--sync: at most 3 extra streams")
+        for path, _ in streams:
+            if not os.path.exists(path):
+                parser.error(f"--sync: file not found: {path}")
+
+    playlist = None
+    if args.playlist:
+        try:
+            playlist = Playlist(collect_playlist(args.playlist))
+        except OSError as e:
+            parser.error(f"--playlist: {e}")
+        if not playlist:
+            parser.error(f"--playlist: no videos found in {args.playlist}")
+        args.video = playlist.current
     
     # Generate default output filename if not provided
     if args.out is None:
         args.out = get_default_csv_filename(args.video)
 
+    streamer = None
+    if args.server:
+        # Imported here: asyncio adds ~30 ms to startup, which only --server needs
+        from mark_client import MarkStreamer, default_spool_path, parse_server_arg
+        host, port = parse_server_arg(args.server)
+        annotator = get_username()
+        streamer = MarkStreamer(host, port, annotator, default_spool_path(annotator))
+    local_copies = LocalCopies(max_bytes=int(args.local_cache_gb * 1024 ** 3)) if args.local_cache_gb > 0 else None
+
     root = tk.Tk()
-    app = VideoMarkerApp(root, video_path=args.video, out_csv=args.out, min_gap_ms=args.mingap)
+    app = VideoMarkerApp(root, video_path=args.video, out_csv=args.out, min_gap_ms=args.mingap,
+                          use_journal=not args.no_journal, categories=categories, playlist=playlist,
+                          cache=VideoCache(max_bytes=args.cache_mb * 1024 * 1024), export_format=args.format,
+                          use_input_log=not args.no_input_log, backend=backend,
+                          detect_candidates=args.candidates, streams=streams, local_copies=local_copies,
+                          streamer=streamer)
     root.geometry("1100x800")
     root.mainloop()
 
 
 if __name__ == "__main__":
+    # The merge command uses a process pool; needed in PyInstaller builds on Windows
+    multiprocessing.freeze_support()
     main()
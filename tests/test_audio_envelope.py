@@ -0,0 +1,30 @@
+from array import array
+
+from audio_envelope import EnvelopePyramid
+
+
+def test_levels_keep_min_and_max_of_each_pair():
+    rms = array("H", [5, 1, 7, 3, 9])
+    pyramid = EnvelopePyramid.from_rms(rms, base_ms=10)
+    assert [(list(mins), list(maxs)) for mins, maxs in pyramid.levels] == [
+        ([5, 1, 7, 3, 9], [5, 1, 7, 3, 9]),
+        ([1, 3, 9], [5, 7, 9]),     # the odd last bucket is carried over
+        ([1, 9], [7, 9]),
+        ([1], [9]),
+    ]
+    assert pyramid.peak == 9 and pyramid.duration_ms == 50
+
+
+def test_columns_read_the_level_just_finer_than_a_pixel(tmp_path):
+    rms = array("H", (i % 100 for i in range(1000)))
+    pyramid = EnvelopePyramid.from_rms(rms, base_ms=10)
+    # 1 px per bucket: the raw values
+    assert pyramid.columns(0, 50, 5) == [(0, 0), (1, 1), (2, 2), (3, 3), (4, 4)]
+    # 1 s per px: each column spans a full 0..99 ramp
+    assert pyramid.columns(0, 10_000, 10) == [(0, 99)] * 10
+    assert pyramid.columns(9_990, 20_000, 2)[1] == (0, 0)   # past the end
+
+    path = str(tmp_path / "envelope.bin")
+    pyramid.save(path)
+    loaded = EnvelopePyramid.load(path)
+    assert loaded.levels == pyramid.levels and loaded.base_ms == 10
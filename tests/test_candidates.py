@@ -0,0 +1,24 @@
+from candidates import ANALYSIS_FPS, pick_candidates
+
+FRAME_MS = 1000 // ANALYSIS_FPS
+
+
+def test_motion_onsets_above_the_noise_and_scene_changes():
+    motion = [0.01 + 0.001 * (i % 3) for i in range(300)]
+    scene = [0.0] * 300
+    for i in range(50, 60):
+        motion[i] = 0.5      # one burst of motion: a single onset
+    scene[150] = 0.8
+    motion[250] = 0.015      # within median + 6 MAD
+    picked = pick_candidates(motion, scene)
+    assert [(t, kind) for t, _, kind in picked] == [(50 * FRAME_MS, "motion"), (150 * FRAME_MS, "scene")]
+    assert all(0.5 <= score <= 1.0 for _, score, _ in picked)
+
+
+def test_only_the_strongest_within_the_gap_is_kept():
+    motion = [0.0] * 100
+    scene = [0.0] * 100
+    scene[10], scene[20], scene[60] = 0.4, 0.9, 0.5
+    picked = pick_candidates(motion, scene, min_gap_ms=2000)
+    assert [(t, s) for t, s, _ in picked] == [(20 * FRAME_MS, 0.9), (60 * FRAME_MS, 0.5)]
+    assert pick_candidates([], []) == []
@@ -0,0 +1,97 @@
+import csv
+
+from categories import FLAG_POINT, parse_categories
+from input_log import (IN_CLICK, IN_DELETE, IN_FPS, IN_MOVE, IN_PRESS, IN_RELEASE, IN_UNDO, InputLog,
+                       _replay_to_csv, categories_to_json, read_input_log, replay_input_log)
+from marking import REPEAT_WINDOW_NS, MarkingEngine
+
+MS = 1_000_000
+
+
+def _live_session(log, categories, marks=None):
+    """Drive a MarkingEngine the way the app does, logging every input; returns the engine."""
+    engine = MarkingEngine(categories, marks)
+
+    def key(kind, name, t_ms, now_ms):
+        now = now_ms * MS
+        log.append(kind, t_ms, t_ms, key=name, now_ns=now)
+        engine.commit_due(now)
+        if kind == IN_PRESS:
+            engine.press(name, (t_ms, t_ms), now)
+        elif engine.release(name, (t_ms, t_ms), now):
+            # The app confirms the release 30 ms later unless an auto-repeat press cancels it
+            engine.commit_due(now + REPEAT_WINDOW_NS + 1)
+
+    key(IN_PRESS, "1", 1000, 0)
+    key(IN_PRESS, "1", 1100, 100)             # debounced
+    key(IN_PRESS, "3", 2000, 1000)            # interval begin
+    key(IN_RELEASE, "3", 2500, 1500)          # interval end
+    log.append(IN_CLICK, 4000, 4000, now_ns=3000 * MS)
+    engine.mark(categories[0], FLAG_POINT, (4000, 4000))
+    key(IN_PRESS, "2", 5000, 4000)
+    log.append(IN_UNDO, now_ns=4100 * MS)
+    engine.undo()
+    log.append(IN_MOVE, 4000, 4200, 0, FLAG_POINT, now_ns=5000 * MS)
+    engine.move(4000, 0, FLAG_POINT, 4200)
+    log.append(IN_DELETE, 1000, 0, 0, FLAG_POINT, now_ns=6000 * MS)
+    engine.delete_one(1000, 0, FLAG_POINT)
+    key(IN_PRESS, "2", 7000, 7000)
+    return engine
+
+
+def test_replay_reproduces_a_live_session(tmp_path):
+    path = str(tmp_path / "marks.vml")
+    categories = parse_categories("1:reach,2:grasp,3:groom:interval")
+    log = InputLog(path, {"categories": categories_to_json(categories), "resumed": False})
+    live = _live_session(log, categories)
+    log.append(IN_FPS, 25000)
+    log.close()
+
+    header, replayed = replay_input_log(path)
+    assert list(replayed.marks.times) == list(live.marks.times) == [2000, 2500, 4200, 7000]
+    assert list(replayed.marks.flags) == list(live.marks.flags)
+    assert header["fps"] == 25.0
+
+    # Other settings: without debounce the second press of "1" becomes a mark (and is then deleted instead)
+    _, loose = replay_input_log(path, min_gap_ms=0)
+    assert list(loose.marks.times) == [1100, 2000, 2500, 4200, 7000]
+
+
+def test_resumed_session_starts_from_its_recorded_marks(tmp_path):
+    path = str(tmp_path / "marks.vml")
+    categories = parse_categories("1:reach,2:grasp,3:groom:interval")
+    header = {"categories": categories_to_json(categories), "resumed": False}
+    log = InputLog(path, header)
+    first = _live_session(log, categories)
+    log.close()
+
+    # The journal had one more mark than this log knows about (e.g. a crash before the log was flushed)
+    resumed_from = first.marks.copy()
+    resumed_from.add(9000, 9000, 1, FLAG_POINT, 0)
+    log = InputLog(path, dict(header, resumed=True, resumed_marks=resumed_from.in_added_order()))
+    log.append(IN_UNDO, now_ns=10_000 * MS)
+    log.append(IN_UNDO, now_ns=10_100 * MS)
+    log.close()
+
+    assert len(list(read_input_log(path))) == 2
+    _, engine = replay_input_log(path)
+    # Undo follows the recorded addition order: 9000, then 7000
+    assert list(engine.marks.times) == [2000, 2500, 4200]
+
+
+def test_replay_to_csv_writes_frame_indices(tmp_path):
+    path = str(tmp_path / "marks.vml")
+    categories = parse_categories("1:reach,2:grasp,3:groom:interval")
+    log = InputLog(path, {"categories": categories_to_json(categories), "resumed": False, "annotator": "ann"})
+    _live_session(log, categories)
+    log.append(IN_FPS, 25000)
+    log.close()
+
+    out = str(tmp_path / "replayed.csv")
+    assert _replay_to_csv((path, out, None, None)) == (path, out, 4, None)
+    with open(out, newline="") as f:
+        rows = [row for row in csv.reader(f) if not row[0].startswith("#")]
+    assert rows[0][:5] == ["timestamp_seconds", "category", "kind", "vlc_time_seconds", "frame_index"]
+    assert [(r[0], r[1], r[2], r[4]) for r in rows[1:]] == [
+        ("2.000", "groom", "begin", "50"), ("2.500", "groom", "end", "62"),
+        ("4.200", "reach", "point", "105"), ("7.000", "grasp", "point", "175")]
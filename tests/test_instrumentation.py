@@ -0,0 +1,29 @@
+import pytest
+
+from instrumentation import _BOUNDS, Histogram
+
+
+def test_buckets_are_within_a_fifth_of_the_value():
+    h = Histogram("key_to_mark")
+    for value in (1.0, 3.0, 150.0, 12_345.0, 9e7):
+        h.record(value)
+    for i, n in enumerate(h.counts):
+        if n:
+            assert i == 0 or _BOUNDS[i - 1] < _BOUNDS[i] <= _BOUNDS[i - 1] * 1.19
+    assert h.count == 5 and h.max == 9e7
+
+
+def test_percentiles_use_bucket_upper_bounds_capped_at_the_max():
+    h = Histogram("save")
+    assert h.percentile(50) == 0.0
+    for _ in range(90):
+        h.record(100.0)
+    for _ in range(10):
+        h.record(5000.0)
+    assert 100.0 <= h.percentile(50) < 120.0
+    assert h.percentile(90) == h.percentile(50)
+    assert h.percentile(95) == h.percentile(100) == 5000.0
+    summary = h.summary()
+    assert summary["mean_us"] == pytest.approx(590.0)
+    assert summary["p99_us"] == 5000.0
+    assert sum(n for _, n in h.to_dict()["buckets"]) == 100
@@ -0,0 +1,100 @@
+import os
+import threading
+
+from local_copy import LocalCopies, copy_key, throttled_opener
+
+KB = 1024
+
+
+def _video(tmp_path, name, size):
+    path = tmp_path / "share" / name
+    path.parent.mkdir(exist_ok=True)
+    path.write_bytes(os.urandom(size))
+    return str(path)
+
+
+class _Done:
+    def __init__(self):
+        self.order = []
+        self._event = threading.Event()
+        self.expected = 1
+
+    def __call__(self, path, local):
+        self.order.append((path, local))
+        if len(self.order) >= self.expected:
+            self._event.set()
+
+    def wait(self):
+        assert self._event.wait(20)
+
+
+def _same_bytes(a, b):
+    with open(a, "rb") as fa, open(b, "rb") as fb:
+        return fa.read() == fb.read()
+
+
+def test_interrupted_copy_resumes_from_the_part_file(tmp_path):
+    video = _video(tmp_path, "clip.mp4", 64 * KB)
+    root = str(tmp_path / "copies")
+    opener = throttled_opener(mbps=16, latency_ms=1)
+    interrupted = threading.Event()
+
+    def stop_halfway(path, done, total):
+        if done >= total // 2:
+            copies.close()
+            interrupted.set()
+
+    copies = LocalCopies(root, chunk_bytes=4 * KB, open_source=opener, on_progress=stop_halfway)
+    copies.request(video)
+    assert interrupted.wait(20)
+    copies._thread.join(10)    # the .part is closed
+    assert copies.lookup(video) is None
+    part_bytes = copies.copied_bytes
+
+    done = _Done()
+    copies = LocalCopies(root, chunk_bytes=4 * KB, open_source=opener)
+    copies.request(video, done)
+    done.wait()
+    assert copies.copied_bytes == 64 * KB - part_bytes
+    local = copies.lookup(video)
+    assert local == done.order[0][1] and _same_bytes(local, video)
+    assert not os.path.exists(local + ".part")
+
+
+def test_watched_video_preempts_a_prefetch_which_then_resumes(tmp_path):
+    prefetch = _video(tmp_path, "next.mp4", 128 * KB)
+    watched = _video(tmp_path, "now.mp4", 32 * KB)
+    done = _Done()
+    done.expected = 2
+
+    def watch_once_started(path, copied, total):
+        if path == prefetch and copied == 8 * KB:
+            copies.request(watched, done, first=True)
+
+    copies = LocalCopies(str(tmp_path / "copies"), chunk_bytes=8 * KB, open_source=throttled_opener(16, 1),
+                         on_progress=watch_once_started)
+    copies.request(prefetch, done)
+    done.wait()
+    assert [path for path, _ in done.order] == [watched, prefetch]
+    for path, local in done.order:
+        assert copies.lookup(path) == local and _same_bytes(local, path)
+    # Nothing was copied twice
+    assert copies.copied_bytes == 160 * KB
+
+
+def test_eviction_never_removes_the_copy_in_use(tmp_path):
+    a, b, c = (_video(tmp_path, name, 40 * KB) for name in ("a.mp4", "b.mp4", "c.mp4"))
+    copies = LocalCopies(str(tmp_path / "copies"), max_bytes=100 * KB, chunk_bytes=16 * KB)
+    for path, first in ((a, True), (b, False)):
+        done = _Done()
+        copies.request(path, done, first=first)
+        done.wait()
+    assert copies.lookup(a)
+    # a is the least recently used entry, but it is the one being watched
+    os.utime(copies.cache.entry_dir(copy_key(a)[0], create=False), (0, 0))
+
+    done = _Done()
+    copies.request(c, done)
+    done.wait()
+    assert copies.lookup(a) and copies.lookup(c)
+    assert copies.lookup(b) is None
@@ -0,0 +1,49 @@
+from array import array
+
+from categories import FLAG_BEGIN, FLAG_END, FLAG_POINT
+from mark_columns import (_write_columns, columns_to_csv, csv_to_columns, read_columns_header, read_marks_columns,
+                          write_marks_columns)
+from mark_csv import write_marks_csv
+from mark_store import MarkStore
+
+
+def _store():
+    store = MarkStore()
+    store.add(1234, 1200, 0, FLAG_POINT, 0)
+    store.add(2000, 1990, 1, FLAG_BEGIN, 1)
+    store.add(2500, 2490, 1, FLAG_END, 1)
+    return store
+
+
+def test_binary_file_holds_the_store(tmp_path):
+    path = str(tmp_path / "marks.vmc")
+    store = _store()
+    write_marks_columns(path, store, {0: "reach", 1: "groom"}, {"fps": 25}, stream_names=["main", "side"])
+    header, columns = read_marks_columns(path)
+    assert header["count"] == 3
+    assert header["stream_names"] == ["main", "side"]
+    assert list(columns["time_ms"]) == list(store.times)
+    assert list(columns["vlc_time_ms"]) == list(store.raw_times)
+    assert list(columns["flags"]) == list(store.flags)
+    assert list(columns["stream"]) == list(store.sources)
+    # Columns are aligned for memory mapping
+    assert all(col["offset"] % 8 == 0 for col in read_columns_header(path)["columns"])
+
+
+def test_csv_round_trip(tmp_path):
+    csv_path, vmc_path, back_path = (str(tmp_path / name) for name in ("marks.csv", "marks.vmc", "back.csv"))
+    write_marks_csv(csv_path, _store(), {0: "reach", 1: "groom"}, 25.0, {"annotator": "ann", "fps": 25.0},
+                    ["main", "side"])
+    assert csv_to_columns(csv_path, vmc_path) == 3
+    assert columns_to_csv(vmc_path, back_path) == 3
+    with open(csv_path) as a, open(back_path) as b:
+        assert b.read() == a.read()
+
+
+def test_csv_export_of_a_file_with_only_times(tmp_path):
+    path, out = str(tmp_path / "marks.vmc"), str(tmp_path / "marks.csv")
+    _write_columns(path, {"time_ms": array("q", [500, 1500])}, {}, {"fps": 10})
+    columns_to_csv(path, out)
+    with open(out) as f:
+        lines = f.read().splitlines()
+    assert lines[-2:] == ["0.500,0,point,0.500,5", "1.500,0,point,1.500,15"]
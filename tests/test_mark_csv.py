@@ -0,0 +1,11 @@
+from categories import FLAG_POINT
+from mark_csv import read_csv_metadata, write_marks_csv
+from mark_store import MarkStore
+
+
+def test_metadata_reads_back_without_the_rows(tmp_path):
+    path = str(tmp_path / "marks.csv")
+    store = MarkStore()
+    store.add(1000, 1000, 0, FLAG_POINT, 0)
+    write_marks_csv(path, store, {0: "reach"}, 25.0, {"video": "trial: 1.mp4", "video_fingerprint": "f00d"})
+    assert read_csv_metadata(path) == {"video": "trial: 1.mp4", "video_fingerprint": "f00d"}
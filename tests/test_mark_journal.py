@@ -0,0 +1,101 @@
+import os
+import threading
+
+from categories import FLAG_POINT, Category
+from mark_journal import _RECORD, OP_ADD, OP_DELETE_RANGE, OP_UNDO, MarkJournal, read_journal, replay_records
+from marking import MarkingEngine
+
+
+def _write_session(path, compact_fn=None):
+    journal = MarkJournal(path, header={"video_fingerprint": "abc"}, compact_fn=compact_fn)
+    for t in (1000, 2000, 3000, 4000):
+        journal.append(OP_ADD, t, t)
+    journal.append(OP_UNDO)
+    journal.append(OP_DELETE_RANGE, 900, 1100)
+    journal.close()
+
+
+def test_journal_replays_the_session(tmp_path):
+    path = str(tmp_path / "session.vmj")
+    _write_session(path)
+    header, records = read_journal(path)
+    assert header["video_fingerprint"] == "abc"
+    assert list(replay_records(records).times) == [2000, 3000]
+
+
+def test_truncated_journal_drops_only_the_torn_record(tmp_path):
+    path = str(tmp_path / "session.vmj")
+    _write_session(path)
+    size = os.path.getsize(path)
+    # Crash in the middle of writing the last record (the range delete)
+    with open(path, "r+b") as f:
+        f.truncate(size - _RECORD.size // 2)
+    _, records = read_journal(path)
+    assert len(records) == 5
+    assert list(replay_records(records).times) == [1000, 2000, 3000]
+
+    # Resuming cuts the torn bytes off so new records stay aligned
+    journal = MarkJournal(path)
+    assert list(journal.marks.times) == [1000, 2000, 3000]
+    journal.append(OP_ADD, 5000, 5000)
+    journal.close()
+    _, records = read_journal(path)
+    assert list(replay_records(records).times) == [1000, 2000, 3000, 5000]
+
+
+def test_compaction_runs_on_close_and_backs_off_with_session_size(tmp_path):
+    compacted = []
+    done = threading.Event()
+
+    def compact(store):
+        compacted.append(len(store))
+        done.set()
+
+    path = str(tmp_path / "session.vmj")
+    journal = MarkJournal(path, compact_fn=compact, compact_interval=60.0, compact_scale=1000)
+    for t in range(5000):
+        journal.append(OP_ADD, t * 10, t * 10)
+    journal.request_compact()
+    assert done.wait(10)
+    assert journal.compact_due_after() == 300.0
+    journal.close(remove=True)
+    assert compacted[-1] == 5000
+    assert not os.path.exists(path)
+
+
+def test_ops_replay_to_the_same_marks():
+    ops = []
+    a = Category(0, "a", "1", debounce_ms=0)
+    engine = MarkingEngine([a], on_op=lambda *op: ops.append(op))
+    for t in (1000, 2000, 3000):
+        engine.mark(a, FLAG_POINT, (t, t))
+    engine.undo()
+    engine.move(1000, 0, FLAG_POINT, 1500)
+    engine.delete_one(1500, 0, FLAG_POINT)
+    assert ops[0][0] == OP_ADD and ops[3][0] == OP_UNDO
+    records = [(op, flags, category, source, time_ms, arg_ms, 0)
+               for op, time_ms, arg_ms, category, flags, source in ops]
+    assert list(replay_records(records).times) == list(engine.marks.times) == [2000]
+
+
+def test_failed_compaction_is_reported_and_retried(tmp_path):
+    errors = []
+    failed = threading.Event()
+
+    def compact(store):
+        if not errors:
+            raise OSError("disk full")
+
+    def on_error(e):
+        errors.append(e)
+        failed.set()
+
+    path = str(tmp_path / "session.vmj")
+    journal = MarkJournal(path, compact_fn=compact, compact_interval=60.0, on_compact_error=on_error)
+    journal.append(OP_ADD, 1000, 1000)
+    journal.request_compact()
+    assert failed.wait(10)
+    assert journal.stats()["last_compact_error"] == "disk full"
+    journal.close()    # still dirty: closing retries
+    assert [str(e) for e in errors] == ["disk full"]
+    assert journal.stats() == {"compactions": 1, "compact_errors": 1, "last_compact_error": None}
@@ -0,0 +1,66 @@
+import csv
+import os
+from array import array
+
+import pytest
+
+from mark_merge import consensus_events, match_count, merge_marks, read_marks_csv
+
+
+def test_match_count_pairs_each_mark_at_most_once():
+    a = array("q", [1000, 1100, 5000])
+    b = array("q", [1050, 4400, 5400])
+    assert match_count(a, b, 500) == 2        # 1000-1050, 5000-5400; 1100 has no partner left
+    assert match_count(a, b, 10) == 0
+    assert match_count(a, array("q"), 500) == 0
+    assert match_count(a, a, 0) == 3
+
+
+def test_consensus_needs_votes_and_one_mark_per_annotator():
+    marks = {
+        "ann": array("q", [1000, 1100, 8000]),
+        "bob": array("q", [1200, 5000]),
+        "cy": array("q", [1300, 8100]),
+    }
+    events = consensus_events(marks, 500, min_votes=2)
+    # ann's 1100 is a second mark from the same annotator: it starts a new cluster, leaving 1000 alone
+    assert events == [(1200, 3), (8050, 2)]
+    assert consensus_events(marks, 500, min_votes=1) == [(1000, 1), (1200, 3), (5000, 1), (8050, 2)]
+
+
+def _write_marks(path, rows, metadata=None):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", newline="") as f:
+        for key, value in (metadata or {}).items():
+            f.write(f"# {key}: {value}\n")
+        writer = csv.writer(f)
+        writer.writerow(["timestamp_seconds", "category", "kind", "vlc_time_seconds", "frame_index"])
+        writer.writerows(rows)
+
+
+def test_merge_is_repeatable_with_the_output_inside_the_input(tmp_path):
+    root = tmp_path / "marks"
+    for who, times in (("ann", [1.0, 2.0, 9.0]), ("bob", [1.1, 2.2]), ("cy", [0.9, 5.0])):
+        _write_marks(str(root / who / f"2024-05-01_clip_marks_{who}.csv"),
+                     [[f"{t:.3f}", "reach", "", f"{t:.3f}", ""] for t in times],
+                     {"video": "clip.mp4", "video_fingerprint": "f00d"})
+    # Same name, but no fingerprint: reported, never merged by name
+    _write_marks(str(root / "dan" / "2024-05-01_clip_marks_dan.csv"), [["1.000", "reach", "", "1.000", ""]],
+                 {"video": "clip.mp4"})
+    out = str(root / "merged")
+    reported = []
+    first = merge_marks(str(root), out, tolerance_ms=500, jobs=1, progress=reported.append)
+    second = merge_marks(str(root), out, tolerance_ms=500, jobs=1)
+    assert first == second == {"files": 3, "skipped": 0, "unidentified": 1, "videos": 1}
+    assert len(reported) == 1 and "2024-05-01_clip_marks_dan.csv" in reported[0]
+    with open(os.path.join(out, "consensus.csv"), newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [(r["timestamp_seconds"], r["votes"]) for r in rows] == [("1.000", "3"), ("2.100", "2")]
+
+
+def test_only_marks_csvs_are_read(tmp_path):
+    path = str(tmp_path / "consensus.csv")
+    with open(path, "w") as f:
+        f.write("video_key,video,category,timestamp_seconds,votes,annotators\n")
+    with pytest.raises(ValueError):
+        read_marks_csv(path)
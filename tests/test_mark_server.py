@@ -0,0 +1,159 @@
+import asyncio
+import json
+import socket
+import threading
+import time
+
+from categories import FLAG_POINT
+from mark_client import MarkStreamer
+from mark_journal import OP_ADD, OP_UNDO
+from mark_server import AggregationServer, fetch_status
+from mark_store import MarkStore
+
+
+class _Running:
+    """An AggregationServer serving on localhost from its own thread."""
+
+    def __init__(self, data_dir, port=0, out_dir=None):
+        self.server = AggregationServer(str(data_dir), out_dir and str(out_dir), export_interval=0.0)
+        self.loop = asyncio.new_event_loop()
+        listening = threading.Event()
+
+        def ready(server):
+            self.port = server.sockets[0].getsockname()[1]
+            listening.set()
+
+        self.task = self.loop.create_task(self.server.serve("127.0.0.1", port, ready))
+        self.thread = threading.Thread(
+            target=lambda: self.loop.run_until_complete(asyncio.gather(self.task, return_exceptions=True)),
+            daemon=True)
+        self.thread.start()
+        assert listening.wait(10)
+
+    def status(self):
+        return asyncio.run_coroutine_threadsafe(asyncio.sleep(0, self.server.status()), self.loop).result(10)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.task.cancel)
+        self.thread.join(10)
+        self.loop.close()
+
+
+def _wait_for(condition, timeout=10.0):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def _marks(status):
+    return {a["annotator"]: a["marks"] for v in status["videos"] for a in v["annotators"]}
+
+
+def test_streamed_marks_survive_a_server_restart(tmp_path):
+    running = _Running(tmp_path / "data", out_dir=tmp_path / "out")
+    streamers = [MarkStreamer("127.0.0.1", running.port, who, str(tmp_path / f"{who}.spool"), batch_ms=20)
+                 for who in ("ann", "bob")]
+    try:
+        resumed = MarkStore()
+        resumed.add(500, 500, 0, FLAG_POINT, 0)
+        streamers[0].post_reset("clip", "clip.mp4", {0: "reach"}, resumed)
+        for t in (1000, 2000, 3000):
+            for streamer in streamers:
+                streamer.post_op("clip", OP_ADD, t, t, 0, FLAG_POINT, 0)
+        streamers[1].post_op("clip", OP_UNDO, 0, 0, 0, 0, 0)
+        assert _wait_for(lambda: all(s.acked and not s.stats()["unacked"] for s in streamers))
+        assert _marks(running.status()) == {"ann": 4, "bob": 2}
+        status = asyncio.run(fetch_status("127.0.0.1", running.port))
+        assert status["videos"][0]["label"] == "clip.mp4"
+    finally:
+        for streamer in streamers:
+            streamer.close()
+        running.stop()
+    assert (tmp_path / "out" / "ann").is_dir()
+
+    replayed = _Running(tmp_path / "data")
+    try:
+        assert _marks(replayed.status()) == {"ann": 4, "bob": 2}
+    finally:
+        replayed.stop()
+
+
+def test_offline_marks_are_delivered_once_after_reconnecting(tmp_path):
+    running = _Running(tmp_path / "data")
+    port = running.port
+    running.stop()
+
+    spool = str(tmp_path / "ann.spool")
+    streamer = MarkStreamer("127.0.0.1", port, "ann", spool, batch_ms=20)
+    for t in range(0, 10000, 1000):
+        streamer.post_op("clip", OP_ADD, t, t, 0, FLAG_POINT, 0)
+    assert _wait_for(lambda: streamer.stats()["unacked"] > 0)
+    streamer.close()
+
+    # A new app run picks the spooled batches up, and the server comes back
+    running = _Running(tmp_path / "data", port=port)
+    streamer = MarkStreamer("127.0.0.1", port, "ann", spool, batch_ms=20)
+    try:
+        assert _wait_for(lambda: streamer.acked and not streamer.stats()["unacked"], timeout=20)
+        assert _marks(running.status()) == {"ann": 10}
+    finally:
+        streamer.close()
+        running.stop()
+
+
+def test_resent_batch_is_acked_but_applied_once(tmp_path):
+    running = _Running(tmp_path / "data")
+    try:
+        with socket.create_connection(("127.0.0.1", running.port), timeout=10) as sock:
+            f = sock.makefile("rwb")
+
+            def send(msg):
+                f.write(json.dumps(msg).encode("utf-8") + b"\n")
+                f.flush()
+                return json.loads(f.readline())
+
+            assert send({"hello": {"client": "c1", "annotator": "ann"}}) == {"welcome": 0}
+            batch = {"batch": 1, "items": [["op", "clip", OP_ADD, 1000, 1000, 0, FLAG_POINT, 0]]}
+            assert send(batch) == {"ack": 1}
+            assert send(batch) == {"ack": 1}
+            assert send({"hello": {"client": "c1", "annotator": "ann"}}) == {"welcome": 1}
+        assert _marks(running.status()) == {"ann": 1}
+        assert running.server.batches == 1
+    finally:
+        running.stop()
+    with open(tmp_path / "data" / "batches.jsonl") as f:
+        assert len(f.readlines()) == 1
+
+
+def test_in_added_order_rebuilds_the_undo_history():
+    store = MarkStore()
+    for t in (5000, 1000, 3000):
+        store.add(t, t, 0, FLAG_POINT, 0)
+    store.remove(1000)
+    copy = MarkStore()
+    for mark in store.in_added_order():
+        copy.add(*mark)
+    assert list(copy.times) == list(store.times)
+    assert copy.undo_last() == store.undo_last()
+
+
+def test_large_batches_are_split_under_the_line_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr("mark_client.LINE_LIMIT", 400)
+    running = _Running(tmp_path / "data")
+    streamer = MarkStreamer("127.0.0.1", running.port, "ann", str(tmp_path / "ann.spool"), batch_ms=20)
+    try:
+        resumed = MarkStore()
+        for t in range(0, 50000, 1000):
+            resumed.add(t, t, 0, FLAG_POINT, 0)
+        streamer.post_reset("clip", "clip.mp4", {0: "reach"}, resumed)   # one item over the limit: sent alone
+        for t in range(100, 3000, 100):
+            streamer.post_op("clip", OP_ADD, t, t, 0, FLAG_POINT, 0)
+        assert _wait_for(lambda: streamer.acked and not streamer.stats()["unacked"])
+        assert _marks(running.status()) == {"ann": 79}
+        assert running.server.batches > 2
+    finally:
+        streamer.close()
+        running.stop()
@@ -0,0 +1,20 @@
+from mark_store import MarkStore
+
+
+def test_store_stays_sorted_and_undo_removes_the_latest_addition():
+    store = MarkStore()
+    for t in (3000, 1000, 2000):
+        store.add(t, t)
+    assert list(store.times) == [1000, 2000, 3000]
+    assert store.undo_last() == 1  # 2000 was added last
+    assert list(store.times) == [1000, 3000]
+
+
+def test_store_move_keeps_undo_on_the_moved_mark():
+    store = MarkStore()
+    store.add(1000)
+    store.add(2000)
+    store.move(store.index_of(2000), 500)
+    assert list(store.times) == [500, 1000]
+    store.undo_last()
+    assert list(store.times) == [1000]
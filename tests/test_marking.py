@@ -0,0 +1,44 @@
+from categories import FLAG_BEGIN, FLAG_END, FLAG_POINT, Category
+from marking import REPEAT_WINDOW_NS, MarkingEngine
+
+MS = 1_000_000
+
+
+def test_point_marks_are_debounced_per_category():
+    a, b = Category(0, "a", "1", debounce_ms=250), Category(1, "b", "2", debounce_ms=250)
+    engine = MarkingEngine([a, b])
+    assert engine.mark(a, FLAG_POINT, (1000, 1000)) >= 0
+    assert engine.mark(a, FLAG_POINT, (1200, 1200)) == -1
+    assert engine.mark(b, FLAG_POINT, (1200, 1200)) >= 0  # other category
+    # Debounce looks both ways: marks may arrive out of order after a seek
+    assert engine.mark(a, FLAG_POINT, (800, 800)) == -1
+    assert engine.mark(a, FLAG_POINT, (1250, 1250)) >= 0
+    assert list(engine.marks.times) == [1000, 1200, 1250]
+
+
+def test_interval_ignores_auto_repeat_with_releases():
+    groom = Category(0, "groom", "g", interval=True)
+    engine = MarkingEngine([groom])
+    assert engine.press("g", (1000, 1000), 0)[1] == FLAG_BEGIN
+    # X11 auto-repeat: release immediately followed by a press
+    now = 0
+    for t in range(1030, 2000, 30):
+        now += 30 * MS
+        assert engine.release("g", (t, t), now)
+        assert engine.press("g", (t, t), now + MS) is None
+    assert engine.commit_release("g", now) is None  # cancelled by the repeat press
+    now += 30 * MS
+    engine.release("g", (2000, 2000), now)
+    engine.commit_due(now + REPEAT_WINDOW_NS + 1)
+    assert list(engine.marks.times) == [1000, 2000]
+    assert list(engine.marks.flags) == [FLAG_BEGIN, FLAG_END]
+
+
+def test_interval_ignores_auto_repeat_without_releases():
+    groom = Category(0, "groom", "g", interval=True)
+    engine = MarkingEngine([groom])
+    engine.press("g", (1000, 1000), 0)
+    assert engine.press("g", (1100, 1100), 100 * MS) is None
+    engine.release("g", (1500, 1500), 500 * MS)
+    assert engine.commit_release("g", 500 * MS)[1] == FLAG_END
+    assert list(engine.marks.times) == [1000, 1500]
@@ -0,0 +1,41 @@
+from media_clock import MediaClock, SimulatedPlayer, measure_timestamp_error
+
+
+def test_output_never_goes_backwards():
+    now = [0]
+    player = SimulatedPlayer(lambda: now[0], update_period_ms=250, jitter_ms=40, seed=1)
+    clock = MediaClock(clock_ns=lambda: now[0])
+    clock.set_playing(True)
+    last = 0.0
+    for step in range(20000):
+        now[0] = step * 3_000_000  # 3 ms
+        clock.sample(player.get_time())
+        t = clock.now_ms()
+        assert t >= last
+        last = t
+
+
+def test_extrapolation_is_capped_when_the_player_stalls():
+    now = [0]
+    clock = MediaClock(max_extrapolation_ms=1000, clock_ns=lambda: now[0])
+    clock.set_playing(True)
+    clock.sample(5000)
+    now[0] = 10_000_000_000  # 10 s without a new player time
+    assert clock.now_ms() == 6000
+
+
+def test_paused_clock_reports_the_player_time():
+    now = [0]
+    clock = MediaClock(clock_ns=lambda: now[0])
+    clock.sample(1234)
+    now[0] = 500_000_000
+    assert clock.now_ms() == 1234.0
+
+
+def test_interpolation_beats_raw_player_time():
+    result = measure_timestamp_error(duration_s=120, marks=500, seed=3)
+    raw, interpolated = result["raw"], result["interpolated"]
+    assert interpolated["mean_ms"] < raw["mean_ms"] / 4
+    # Bounded by how late a change of the player time is noticed (the 15 ms poll), not by its 250 ms updates
+    assert interpolated["max_ms"] <= 20
+    assert interpolated["repeated_stamps"] == 0
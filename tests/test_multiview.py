@@ -0,0 +1,69 @@
+from media_clock import MediaClock, SimulatedPlayer
+from multiview import Stream, SyncGroup
+
+
+class _VirtualClock:
+    def __init__(self):
+        self.ns = 0
+
+    def __call__(self):
+        return self.ns
+
+
+class _Player:
+    """Records the calls SyncGroup makes."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name,) + args)
+
+
+class _Backend:
+    def new_player(self, on_event):
+        return _Player()
+
+
+class _NoTk:
+    def after(self, delay_ms, fn):
+        return "after#1"
+
+    def after_cancel(self, after_id):
+        pass
+
+
+def _run(clock, stream, sim, until_ms):
+    """Advance virtual time, delivering the simulated player's stepped time events."""
+    while clock.ns < until_ms * 1_000_000:
+        clock.ns += 5_000_000
+        stream.on_event("time", sim.get_time())
+
+
+def test_small_drift_nudges_the_rate_and_large_drift_seeks():
+    clock = _VirtualClock()
+    group = SyncGroup(_NoTk(), lambda: clock.ns / 1e6, _Backend(),
+                      check_ms=500, tolerance_ms=20, hard_ms=250, max_rate_change=0.05)
+    stream = Stream(1, "side.mp4", offset_ms=0)
+    stream.clock = MediaClock(clock_ns=clock)
+    group.add(stream, window_id=0)
+    group.play(0)
+    player = stream.player
+
+    # The stream's decoder runs 3% fast: ~30 ms ahead after a second
+    sim = SimulatedPlayer(clock, update_period_ms=250, jitter_ms=0, rate=1.03)
+    _run(clock, stream, sim, 1000)
+    group._check()
+    assert (group.rate_nudges, group.seeks) == (1, 0)
+    assert player.calls[-1] == ("set_rate", 0.95)    # clamped to max_rate_change
+
+    # The corrected stream reports the master's position again: normal speed
+    stream.on_event("time", 1000)
+    group._check()
+    assert player.calls[-1] == ("set_rate", 1.0)
+
+    # A decoding stall leaves it far behind: hard re-sync with a seek
+    stream.on_event("time", 600)
+    group._check()
+    assert (group.rate_nudges, group.seeks) == (1, 1)
+    assert player.calls[-1] == ("set_time", 1000)
@@ -0,0 +1,60 @@
+import json
+import os
+
+from proxies import ProxyMapping, ProxyPlayer, proxy_paths
+from video_cache import content_fingerprint
+
+
+def test_mapping_round_trips():
+    same = ProxyMapping()
+    assert same.to_original(1234) == same.to_proxy(1234) == 1234
+    shifted = ProxyMapping(offset_ms=-40.0, scale=0)    # a scale of 0 (unknown) means 1
+    assert shifted.to_original(1040) == 1000 and shifted.to_proxy(1000) == 1040
+    stretched = ProxyMapping(offset_ms=12.5, scale=1.001)
+    for t in range(0, 3_600_000, 997):
+        assert abs(stretched.to_proxy(stretched.to_original(t)) - t) <= 1
+
+
+class _Inner:
+    def __init__(self, on_event):
+        self.on_event = on_event
+        self.loaded = self.time = None
+
+    def load(self, path, start_paused, light, threads, start_ms):
+        self.loaded = (path, start_ms)
+
+    def get_time(self):
+        return self.time
+
+    def set_time(self, ms):
+        self.time = ms
+
+
+class _Backend:
+    def new_player(self, on_event):
+        self.player = _Inner(on_event)
+        return self.player
+
+
+def test_player_shows_the_proxy_on_the_original_timeline(tmp_path):
+    video = tmp_path / "clip.mp4"
+    video.write_bytes(b"original")
+    proxy, sidecar = proxy_paths(str(video))
+    os.makedirs(os.path.dirname(proxy))
+    open(proxy, "wb").close()
+    with open(sidecar, "w") as f:
+        json.dump({"source_fingerprint": content_fingerprint(str(video)), "offset_ms": 500.0, "scale": 2.0}, f)
+
+    backend, events = _Backend(), []
+    player = ProxyPlayer(backend, lambda kind, value: events.append((kind, value)))
+    player.load(str(video), start_ms=2500)
+    assert backend.player.loaded == (proxy, 1000)
+    player.set_time(4500)
+    assert backend.player.time == 2000 and player.get_time() == 4500
+    backend.player.on_event("time", 1500)
+    assert events == [("time", 3500)]
+
+    # A changed original no longer matches its proxy
+    video.write_bytes(b"re-encoded")
+    player.load(str(video))
+    assert backend.player.loaded == (str(video), 0)
@@ -0,0 +1,34 @@
+import os
+from array import array
+
+import pytest
+
+from seek_index import SeekIndex, scan_with_ffprobe
+
+
+@pytest.mark.skipif(os.name == "nt", reason="fake ffprobe is a shell script")
+def test_scan_parses_packets_in_decode_order(tmp_path):
+    # ffprobe -show_entries packet=pts_time,flags -of csv=p=0 (B-frames: decode order)
+    ffprobe = tmp_path / "ffprobe"
+    ffprobe.write_text("#!/bin/sh\ncat <<'EOF'\n"
+                       "0.000000,K_\n0.120000,__\n0.040000,__\n0.080000,__\nN/A,__\n"
+                       "0.160000,K_\n0.200000,__\nEOF\n")
+    ffprobe.chmod(0o755)
+    index = scan_with_ffprobe("clip.mp4", str(ffprobe))
+    assert list(index.frames_us) == [0, 40000, 80000, 120000, 160000, 200000]
+    assert list(index.keyframes_us) == [0, 160000]
+
+
+def test_frame_and_keyframe_lookup(tmp_path):
+    index = SeekIndex(array("q", [0, 40000, 80000, 120000, 160000]), array("q", [0, 80000]))
+    assert index.frame_at(79.9) == 1
+    assert index.frame_at(80) == 2
+    assert index.frame_at(-5) == 0 and index.frame_at(10_000) == 4
+    assert index.snap_ms(150) == 120.0
+    assert index.keyframe_before_ms(79) == 0.0
+    assert index.keyframe_before_ms(500) == 80.0
+
+    path = str(tmp_path / "index.bin")
+    index.save(path)
+    loaded = SeekIndex.load(path)
+    assert loaded.frames_us == index.frames_us and loaded.keyframes_us == index.keyframes_us
@@ -0,0 +1,52 @@
+import threading
+
+from ui_events import CoalescingDispatcher
+
+
+class _FakeTk:
+    """Collects `after` callbacks instead of running an event loop."""
+
+    def __init__(self):
+        self.calls = []
+        self._ids = 0
+
+    def after(self, delay_ms, fn):
+        self._ids += 1
+        self.calls.append((self._ids, fn))
+        return self._ids
+
+    def after_idle(self, fn):
+        return self.after(0, fn)
+
+    def after_cancel(self, after_id):
+        self.calls = [c for c in self.calls if c[0] != after_id]
+
+    def run(self):
+        while self.calls:
+            self.calls.pop(0)[1]()
+
+
+def test_paused_pump_sleeps_until_a_worker_posts():
+    tk = _FakeTk()
+    delivered = []
+    pump = CoalescingDispatcher(tk, delivered.append)
+    assert tk.calls == []    # nothing scheduled while idle
+
+    workers = [threading.Thread(target=pump.post, args=("envelope", i)) for i in range(8)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    assert len(tk.calls) == 1 and pump.wakes == 1
+    tk.run()
+    assert len(delivered) == 1 and delivered[0]["envelope"] in range(8)
+    assert tk.calls == []    # asleep again
+
+    pump.start()
+    pump.post("time", 1)
+    pump.stop()
+    tk.run()
+    assert delivered[-1] == {"time": 1} and pump.wakes == 1
+    pump.close()
+    pump.post("media_info", None)
+    assert tk.calls == []
@@ -0,0 +1,41 @@
+import os
+import shutil
+
+from video_cache import VideoCache, content_fingerprint
+
+
+def test_fingerprint_follows_content_not_name(tmp_path):
+    video = tmp_path / "clip.mp4"
+    video.write_bytes(os.urandom(2 * 1024 * 1024))
+    fp = content_fingerprint(str(video))
+    copy = tmp_path / "copy" / "renamed.mp4"
+    copy.parent.mkdir()
+    shutil.copyfile(video, copy)
+    assert content_fingerprint(str(copy)) == fp
+
+    # A change inside one of the sampled chunks, and a change of size
+    with open(copy, "r+b") as f:
+        f.seek(0)
+        f.write(b"\0" * 16)
+    assert content_fingerprint(str(copy)) != fp
+    with open(video, "ab") as f:
+        f.write(b"\0")
+    assert content_fingerprint(str(video)) != fp
+
+
+def test_evict_drops_least_recently_used_and_spares_pinned(tmp_path):
+    cache = VideoCache(str(tmp_path / "cache"), max_bytes=2500)
+    for age, fp in enumerate(("cc" * 16, "bb" * 16, "aa" * 16, "dd" * 16)):
+        with open(cache.path(fp, "index.bin"), "wb") as f:
+            f.write(b"x" * 1000)
+        os.utime(cache.entry_dir(fp, create=False), (1000 - age * 100,) * 2)
+    # "dd" is the oldest but holds an unfinished session
+    open(cache.path("dd" * 16, "session.vmj"), "wb").close()
+    os.utime(cache.entry_dir("dd" * 16, create=False), (0, 0))
+
+    assert cache.evict(keep=["aa" * 16]) == 2000
+    assert cache.find("aa" * 16, "index.bin")    # kept although it is the least recently used
+    assert cache.find("dd" * 16, "session.vmj")  # pinned
+    assert cache.find("bb" * 16, "index.bin") is None
+    assert cache.find("cc" * 16, "index.bin") is None
+    assert cache.usage() == 2000